@@ -17,7 +17,9 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.typing import UNDEFINED
 from slugify import slugify
 
+from .client import connection_handover
 from .client.modbus_client import ModbusClient
+from .client.modbus_client import load_pymodbus
 from .common.types import HassData
 from .common.types import HassDataEntry
 from .const import ADAPTER_ID
@@ -29,6 +31,7 @@ from .const import FRIENDLY_NAME
 from .const import HOST
 from .const import INVERTER_CONN
 from .const import INVERTERS
+from .const import MAX_CONNECTIONS
 from .const import MAX_READ
 from .const import MODBUS_SLAVE
 from .const import MODBUS_TYPE
@@ -41,9 +44,12 @@ from .const import TCP
 from .const import UDP
 from .const import UNIQUE_ID_PREFIX
 from .inverter_adapters import ADAPTERS
+from .inverter_adapters import InverterAdapter
 from .inverter_profiles import inverter_connection_type_profile_from_config
 from .modbus_controller import ModbusController
+from .services import capture_traffic_service
 from .services import read_registers_service
+from .services import scan_registers_service
 from .services import update_charge_period_service
 from .services import websocket_api
 from .services import write_registers_service
@@ -82,8 +88,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     controllers: list[ModbusController] = []
 
-    # {(modbus_type, host): client}
-    clients: dict[tuple[str, str], ModbusClient] = {}
+    inverters: list[tuple[dict[str, Any], InverterAdapter]] = []
     for inverter_id, inverter in entry_data[INVERTERS].items():
         # Remember that there might not be any options
         options = entry_options.get(INVERTERS, {}).get(inverter_id, {})
@@ -101,9 +106,30 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if options:
             inverter.update(options)
 
+        inverters.append((inverter, adapter))
+
+    # Inverters which share a connection share a client, which needs to be big enough for all of them
+    # {(modbus_type, host): max_connections}
+    client_max_connections: dict[tuple[str, str], int] = {}
+    for inverter, _adapter in inverters:
+        client_key = (inverter[MODBUS_TYPE], inverter[HOST])
+        client_max_connections[client_key] = max(
+            client_max_connections.get(client_key, 1), inverter.get(MAX_CONNECTIONS, 1)
+        )
+
+    # {(modbus_type, host): client}
+    clients: dict[tuple[str, str], ModbusClient] = {}
+    for inverter, adapter in inverters:
         client_key = (inverter[MODBUS_TYPE], inverter[HOST])
         client = clients.get(client_key)
         if client is None:
+            # If this inverter has just been added, the config flow may have left its connection open for us
+            client = connection_handover.take_over(
+                hass, inverter[MODBUS_TYPE], inverter[HOST], client_max_connections[client_key]
+            )
+        if client is None:
+            # pymodbus is only imported when it's first needed, and that mustn't happen on the event loop
+            await hass.async_add_import_executor_job(load_pymodbus, inverter[MODBUS_TYPE])
             if inverter[MODBUS_TYPE] in [TCP, UDP, RTU_OVER_TCP]:
                 host_parts = inverter[HOST].split(":")
                 params = {"host": host_parts[0], "port": int(host_parts[1])}
@@ -111,11 +137,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                 params = {"port": inverter[HOST], "baudrate": 9600}
             else:
                 raise AssertionError()
-            client = ModbusClient(hass, inverter[MODBUS_TYPE], adapter, params)
-            clients[client_key] = client
+            client = ModbusClient(
+                hass, inverter[MODBUS_TYPE], adapter, params, max_connections=client_max_connections[client_key]
+            )
+        clients[client_key] = client
         create_controller(client, inverter)
 
+    capture_traffic_service.register(hass, controllers)
     read_registers_service.register(hass, controllers)
+    scan_registers_service.register(hass, controllers)
     write_registers_service.register(hass, controllers)
     update_charge_period_service.register(hass, controllers)
     websocket_api.register(hass)
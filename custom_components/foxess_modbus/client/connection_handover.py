@@ -0,0 +1,78 @@
+"""
+Lets a connection which the config flow opened (to autodetect the inverter) be reused once the integration is set up.
+
+Connecting is slow: LAN connections wait a second after connecting (see ModbusClient), and adapters can take a while to
+accept a new TCP connection. Handing over the connection which autodetect used means that the first poll doesn't have
+to pay for that again.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from homeassistant.core import HomeAssistant
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util.hass_dict import HassKey
+
+from ..const import DOMAIN
+from .modbus_client import ModbusClient
+
+_LOGGER = logging.getLogger(__name__)
+
+# If nothing takes over a connection within this time (e.g. the user abandoned the config flow), close it
+_HANDOVER_TIMEOUT_SECONDS = 10 * 60
+
+# {(protocol, host): handover}
+_DATA_KEY: HassKey[dict[tuple[str, str], "_Handover"]] = HassKey(f"{DOMAIN}_connection_handover")
+
+
+@dataclass
+class _Handover:
+    client: ModbusClient
+    cancel_expiry: Callable[[], None]
+
+
+@callback
+def hand_over(hass: HomeAssistant, protocol: str, host: str, client: ModbusClient) -> None:
+    """Offer an open client up to be taken over by take_over, replacing (and closing) any existing offer"""
+
+    @callback
+    def _expire(_now: datetime) -> None:
+        handover = handovers.get(key)
+        if handover is not None and handover.client is client:
+            del handovers[key]
+            _LOGGER.debug("Nothing took over the connection to %s, closing it", client)
+            hass.async_create_task(client.close())
+
+    handovers = hass.data.setdefault(_DATA_KEY, {})
+    key = (protocol, host)
+    existing = handovers.get(key)
+    if existing is not None:
+        existing.cancel_expiry()
+        hass.async_create_task(existing.client.close())
+    handovers[key] = _Handover(client, async_call_later(hass, _HANDOVER_TIMEOUT_SECONDS, _expire))
+
+
+@callback
+def take_over(hass: HomeAssistant, protocol: str, host: str, max_connections: int) -> ModbusClient | None:
+    """
+    Take over a client passed to hand_over with the given protocol and host, if there is one.
+
+    The client is only returned if it has the number of connections asked for: otherwise it's closed.
+    """
+    handovers: dict[tuple[str, str], _Handover] | None = hass.data.get(_DATA_KEY)
+    handover = handovers.pop((protocol, host), None) if handovers is not None else None
+    if handover is None:
+        return None
+
+    handover.cancel_expiry()
+    client = handover.client
+    # ModbusClient caps max_connections depending on the protocol, so compare against a client built the same way
+    if client.max_connections != ModbusClient.effective_max_connections(protocol, max_connections):
+        hass.async_create_task(client.close())
+        return None
+
+    _LOGGER.debug("Taking over the connection to %s", client)
+    return client
@@ -1,10 +1,16 @@
 """The client used to talk Modbus"""
 
 import asyncio
+import functools
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
 from typing import Any
+from typing import AsyncIterator
 from typing import Callable
+from typing import Sequence
 from typing import Type
 from typing import TypeVar
 from typing import cast
@@ -13,70 +19,87 @@ import serial
 from homeassistant.core import HomeAssistant
 
 from .. import client
+from ..common.stats import TransactionStats
 from ..common.types import ConnectionType
 from ..common.types import RegisterType
 from ..const import RTU_OVER_TCP
 from ..const import SERIAL
 from ..const import TCP
 from ..const import UDP
+from ..inverter_adapters import ADAPTERS
 from ..inverter_adapters import InverterAdapter
-from ..vendor.pymodbus import ModbusResponse
-from ..vendor.pymodbus import ModbusRtuFramer
-from ..vendor.pymodbus import ModbusSerialClient
-from ..vendor.pymodbus import ModbusSocketFramer
-from ..vendor.pymodbus import ModbusUdpClient
-from ..vendor.pymodbus import ReadHoldingRegistersResponse
-from ..vendor.pymodbus import ReadInputRegistersResponse
-from ..vendor.pymodbus import WriteMultipleRegistersResponse
-from ..vendor.pymodbus import WriteSingleRegisterResponse
-from .custom_modbus_tcp_client import CustomModbusTcpClient
+from ..vendor import pymodbus
+from .traffic_capture import TrafficCapture
+from .traffic_capture import TrafficRecorder
+from .traffic_capture import record_calls
 
 _LOGGER = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
 
-_CLIENTS: dict[str, dict[str, Any]] = {
-    SERIAL: {
-        "client": ModbusSerialClient,
-        "framer": ModbusRtuFramer,
-    },
-    TCP: {
-        "client": CustomModbusTcpClient,
-        "framer": ModbusSocketFramer,
-    },
-    UDP: {
-        "client": ModbusUdpClient,
-        "framer": ModbusSocketFramer,
-    },
-    RTU_OVER_TCP: {
-        "client": CustomModbusTcpClient,
-        "framer": ModbusRtuFramer,
-    },
+# The pymodbus client and framer for each protocol. These are looked up the first time each protocol is used, see
+# load_pymodbus, so that we only import the bits of pymodbus which we need.
+_CLIENTS: dict[str, tuple[str, str]] = {
+    SERIAL: ("ModbusSerialClient", "ModbusRtuFramer"),
+    TCP: ("CustomModbusTcpClient", "ModbusSocketFramer"),
+    UDP: ("ModbusUdpClient", "ModbusSocketFramer"),
+    RTU_OVER_TCP: ("CustomModbusTcpClient", "ModbusRtuFramer"),
 }
 
 _NUM_RETRIES = 3
 
+# Protocols where we can open several connections to the same device
+_POOLABLE_PROTOCOLS = [TCP, RTU_OVER_TCP]
+
 serial.protocol_handler_packages.append(client.__name__)
 
 
+@functools.cache
+def load_pymodbus(protocol: str) -> tuple[Any, Any]:
+    """
+    Returns the pymodbus client and framer classes for the given protocol.
+
+    This imports pymodbus the first time it's called, so call it in the import executor before creating a ModbusClient
+    from the event loop.
+    """
+    client_name, framer_name = _CLIENTS[protocol]
+    if client_name == "CustomModbusTcpClient":
+        # This subclasses the pymodbus client, so importing it imports pymodbus
+        from .custom_modbus_tcp_client import CustomModbusTcpClient
+
+        return CustomModbusTcpClient, getattr(pymodbus, framer_name)
+    return getattr(pymodbus, client_name), getattr(pymodbus, framer_name)
+
+
 class ModbusClient:
     """Modbus"""
 
-    def __init__(self, hass: HomeAssistant, protocol: str, adapter: InverterAdapter, config: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        protocol: str,
+        adapter: InverterAdapter,
+        config: dict[str, Any],
+        max_connections: int = 1,
+        *,
+        pymodbus_client_factory: Callable[..., Any] | None = None,
+    ) -> None:
         """Init"""
         self._hass = hass
         self._config = config
-        self._lock = asyncio.Lock()
         self._protocol = protocol
+        self._adapter = adapter
+
+        self._max_connections = ModbusClient.effective_max_connections(protocol, max_connections)
 
-        client = _CLIENTS[protocol]
+        client_class, framer = load_pymodbus(protocol)
 
         # Delaying for a second after establishing a connection seems to help the inverter stability,
         # see https://github.com/nathanmarlor/foxess_modbus/discussions/132
         config = {
             **config,
-            "framer": client["framer"],
+            "framer": framer,
             "delay_on_connect": 1 if adapter.connection_type == ConnectionType.LAN else None,
             "retries": _NUM_RETRIES,
             # See https://github.com/nathanmarlor/foxess_modbus/discussions/792
@@ -95,12 +118,84 @@ class ModbusClient:
         # in case it helps.
         self._poll_delay = 30 / 1000 if protocol == SERIAL or adapter.connection_type == ConnectionType.LAN else 0
 
-        self._client = client["client"](**config)
+        # Each pymodbus client owns a single socket, so the pool is a set of clients. Clients which aren't currently
+        # being used by a transaction sit in this queue, and a transaction takes one out for its duration. With a single
+        # connection this behaves exactly like a lock around the client.
+        self._idle_clients: asyncio.Queue[Any] = asyncio.Queue()
+        factory = pymodbus_client_factory or client_class
+        for _ in range(self._max_connections):
+            pymodbus_client = _instrument(factory(**config))
+            record_calls(pymodbus_client, lambda: self.recorder)
+            self._idle_clients.put_nowait(pymodbus_client)
+
+        self.stats = TransactionStats()
+        # Set while traffic is being captured, see start_capture
+        self.recorder: TrafficRecorder | None = None
+
+    @staticmethod
+    def from_capture(hass: HomeAssistant, capture: TrafficCapture, speed: float = 1.0) -> "ModbusClient":
+        """
+        Create a client which replays a capture made with start_capture, rather than talking to a real device.
+
+        speed scales the time which each transaction takes: 1 replays in real time, and 0 as fast as possible.
+        """
+        protocol = capture.metadata["protocol"]
+        adapter = ADAPTERS[capture.metadata["adapter_id"]]
+        config = {"host": "replay", "port": 0} if protocol != SERIAL else {"port": "replay", "baudrate": 9600}
+        return ModbusClient(
+            hass,
+            protocol,
+            adapter,
+            config,
+            capture.metadata["max_connections"],
+            pymodbus_client_factory=capture.client_factory(speed),
+        )
+
+    @staticmethod
+    def effective_max_connections(protocol: str, max_connections: int) -> int:
+        """The number of connections which a client for the given protocol will actually open"""
+        # Only TCP-based protocols can open more than one connection to the same device: UDP is connectionless (and the
+        # adapters which support it reply to whoever asked last), and a serial port can only be opened once.
+        if protocol not in _POOLABLE_PROTOCOLS:
+            return 1
+        return max(max_connections, 1)
+
+    @property
+    def protocol(self) -> str:
+        return self._protocol
+
+    @property
+    def max_connections(self) -> int:
+        """The number of transactions which can be in flight at the same time"""
+        return self._max_connections
+
+    async def start_capture(self, path: Path) -> None:
+        """Start recording every transaction to the given capture file, replacing any capture in progress"""
+        metadata = {
+            "protocol": self._protocol,
+            "adapter_id": self._adapter.adapter_id,
+            "max_connections": self._max_connections,
+        }
+        recorder = await self._hass.async_add_executor_job(TrafficRecorder, path, metadata)
+        await self.stop_capture()
+        self.recorder = recorder
+        _LOGGER.info("Capturing traffic on %s to %s", self, path)
+
+    async def stop_capture(self) -> None:
+        """Stop any capture in progress, and flush it to disk"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            await self._hass.async_add_executor_job(recorder.close)
+            _LOGGER.info("Captured %s transactions on %s", recorder.num_records, self)
 
     async def close(self) -> None:
         """Close connection"""
         _LOGGER.debug("Closing connection to modbus on %s", self)
-        await self._async_pymodbus_call(self._client.close, auto_connect=False)
+        await self.stop_capture()
+        # Wait for every connection to become idle, so that we don't close a socket underneath a transaction
+        async with self._acquire_all_clients() as pymodbus_clients:
+            for pymodbus_client in pymodbus_clients:
+                await self._hass.async_add_executor_job(pymodbus_client.close)
 
     async def read_registers(
         self,
@@ -113,24 +208,19 @@ class ModbusClient:
         expected_response_type: Type[Any]
         if register_type == RegisterType.HOLDING:
             response = await self._async_pymodbus_call(
-                self._client.read_holding_registers,
-                start_address,
-                num_registers,
-                slave,
+                lambda c: c.read_holding_registers(start_address, num_registers, slave)
             )
-            expected_response_type = ReadHoldingRegistersResponse
+            expected_response_type = pymodbus.ReadHoldingRegistersResponse
         elif register_type == RegisterType.INPUT:
             response = await self._async_pymodbus_call(
-                self._client.read_input_registers,
-                start_address,
-                num_registers,
-                slave,
+                lambda c: c.read_input_registers(start_address, num_registers, slave)
             )
-            expected_response_type = ReadInputRegistersResponse
+            expected_response_type = pymodbus.ReadInputRegistersResponse
         else:
             raise AssertionError()
 
         if response.isError():
+            self.stats.errors += 1
             message = (
                 f"Error reading registers. Type: {register_type}; start: {start_address}; count: {num_registers}; "
                 f"slave: {slave}"
@@ -160,26 +250,51 @@ class ModbusClient:
 
     async def write_registers(self, register_address: int, register_values: list[int], slave: int) -> None:
         """Write registers"""
+        async with self._acquire_client() as pymodbus_client:
+            await self._write_registers(pymodbus_client, register_address, register_values, slave)
+
+    async def write_register_groups(
+        self, groups: Sequence[tuple[int, list[int]]], slave: int
+    ) -> list[Exception | None]:
+        """
+        Write each group of (start address, values) in turn, back-to-back on a single connection. Every other pooled
+        connection is held for the duration, so that no other transactions can happen in between. Groups of more than
+        one register are written with Write Multiple Registers, and single registers with Write Single Register. Stops
+        at the first write which fails.
+
+        :returns: For each group which was attempted, None if it was written or the error if it failed. Groups after a
+            failure aren't attempted, and aren't in the result
+        """
+        results: list[Exception | None] = []
+        async with self._acquire_all_clients() as pymodbus_clients:
+            for register_address, register_values in groups:
+                try:
+                    await self._write_registers(pymodbus_clients[0], register_address, register_values, slave)
+                except Exception as ex:
+                    results.append(ex)
+                    break
+                results.append(None)
+        return results
+
+    async def _write_registers(
+        self, pymodbus_client: Any, register_address: int, register_values: list[int], slave: int
+    ) -> None:
         expected_response_type: Type[Any]
         if len(register_values) > 1:
             register_values = [int(i) for i in register_values]
             response = await self._async_pymodbus_call(
-                self._client.write_registers,
-                register_address,
-                register_values,
-                slave,
+                lambda c: c.write_registers(register_address, register_values, slave), pymodbus_client=pymodbus_client
             )
-            expected_response_type = WriteMultipleRegistersResponse
+            expected_response_type = pymodbus.WriteMultipleRegistersResponse
         else:
+            value = int(register_values[0])
             response = await self._async_pymodbus_call(
-                self._client.write_register,
-                register_address,
-                int(register_values[0]),
-                slave,
+                lambda c: c.write_register(register_address, value, slave), pymodbus_client=pymodbus_client
             )
-            expected_response_type = WriteSingleRegisterResponse
+            expected_response_type = pymodbus.WriteSingleRegisterResponse
 
         if response.isError():
+            self.stats.errors += 1
             message = f"Error writing registers. Start: {register_address}; values: {register_values}; slave: {slave}"
             if isinstance(response, Exception):
                 raise ModbusClientFailedError(message, self, response) from response
@@ -200,25 +315,79 @@ class ModbusClient:
                 response,
             )
 
-    async def _async_pymodbus_call(self, call: Callable[..., T], *args: Any, auto_connect: bool = True) -> T:
-        """Convert async to sync pymodbus call."""
+    @asynccontextmanager
+    async def _acquire_client(self) -> AsyncIterator[Any]:
+        """Take a pooled pymodbus client for the duration of one or more transactions"""
+        pymodbus_client = await self._idle_clients.get()
+        try:
+            yield pymodbus_client
+        finally:
+            self._idle_clients.put_nowait(pymodbus_client)
+
+    @asynccontextmanager
+    async def _acquire_all_clients(self) -> AsyncIterator[list[Any]]:
+        """Take every pooled pymodbus client, waiting for any transactions in progress to finish"""
+        pymodbus_clients = [await self._idle_clients.get() for _ in range(self._max_connections)]
+        try:
+            yield pymodbus_clients
+        finally:
+            for pymodbus_client in pymodbus_clients:
+                self._idle_clients.put_nowait(pymodbus_client)
+
+    async def _async_pymodbus_call(
+        self, call: Callable[[Any], T], *, auto_connect: bool = True, pymodbus_client: Any = None
+    ) -> T:
+        """
+        Convert async to sync pymodbus call.
+
+        call is invoked with pymodbus_client, which must have come from _acquire_client, or if that's None with
+        whichever pooled pymodbus client is free.
+        """
+        if pymodbus_client is None:
+            async with self._acquire_client() as pymodbus_client:
+                return await self._async_pymodbus_call(call, auto_connect=auto_connect, pymodbus_client=pymodbus_client)
+
+        # Set by _call once connected, so that connection time (and delay_on_connect) isn't counted as round-trip time
+        call_started_at: float | None = None
+        # Set by _call if it had to connect. Stats are only touched on the event loop, so it's counted below
+        connected = False
 
         def _call() -> T:
+            nonlocal call_started_at, connected
             # When using pollserial://, connected calls into serial.serial_for_url, which calls importlib.import_module,
             # which HA doesn't like (see https://github.com/nathanmarlor/foxess_modbus/issues/618).
             # Therefore we need to do this check inside the executor job
-            if auto_connect and not self._client.connected:
-                self._client.connect()
+            if auto_connect and not pymodbus_client.connected:
+                connected = True
+                pymodbus_client.connect()
+            call_started_at = time.perf_counter()
             # If the connection failed, this call will throw an appropriate error
-            return call(*args)
-
-        async with self._lock:
+            return call(pymodbus_client)
+
+        # This client is only used by one transaction at a time, so any change in its counters is down to us
+        counters: _TrafficCounters = pymodbus_client.foxess_counters
+        sends_before, bytes_sent_before, bytes_received_before = (
+            counters.sends,
+            counters.bytes_sent,
+            counters.bytes_received,
+        )
+        try:
             result = await self._hass.async_add_executor_job(_call)
-            # This seems to be required for serial devices, otherwise subsequent reads fail
-            # The HA modbus integration does the same
-            if self._poll_delay > 0:
-                await asyncio.sleep(self._poll_delay)
-            return result
+        finally:
+            if connected:
+                self.stats.connects += 1
+            # pymodbus sends the request once per attempt
+            if counters.sends > sends_before and call_started_at is not None:
+                self.stats.transactions += 1
+                self.stats.retries += counters.sends - sends_before - 1
+                self.stats.round_trip_ms.record((time.perf_counter() - call_started_at) * 1000)
+            self.stats.bytes_sent += counters.bytes_sent - bytes_sent_before
+            self.stats.bytes_received += counters.bytes_received - bytes_received_before
+        # This seems to be required for serial devices, otherwise subsequent reads fail
+        # The HA modbus integration does the same
+        if self._poll_delay > 0:
+            await asyncio.sleep(self._poll_delay)
+        return result
 
     def __str__(self) -> str:
         if self._protocol == SERIAL:
@@ -226,10 +395,46 @@ class ModbusClient:
         return f"{self._protocol}://{self._config['host']}:{self._config['port']}"
 
 
+class _TrafficCounters:
+    __slots__ = ("bytes_received", "bytes_sent", "sends")
+
+    def __init__(self) -> None:
+        self.sends = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def _instrument(pymodbus_client: Any) -> Any:
+    """
+    Wrap the send/recv methods of a pymodbus client so that we can count the traffic it generates.
+
+    pymodbus retries transactions internally and doesn't tell us about it, but it does call send() once per attempt.
+    """
+    counters = _TrafficCounters()
+    send = pymodbus_client.send
+    recv = pymodbus_client.recv
+
+    def _send(request: bytes) -> Any:
+        counters.sends += 1
+        counters.bytes_sent += len(request)
+        return send(request)
+
+    def _recv(size: int | None) -> Any:
+        data = recv(size)
+        if isinstance(data, bytes):
+            counters.bytes_received += len(data)
+        return data
+
+    pymodbus_client.send = _send
+    pymodbus_client.recv = _recv
+    pymodbus_client.foxess_counters = counters
+    return pymodbus_client
+
+
 class ModbusClientFailedError(Exception):
     """Raised when the ModbusClient fails to read/write"""
 
-    def __init__(self, message: str, client: ModbusClient, response: ModbusResponse | Exception) -> None:
+    def __init__(self, message: str, client: ModbusClient, response: "pymodbus.ModbusResponse | Exception") -> None:
         super().__init__(f"{message} from {client}: {response}")
         self.message = message
         self.client = client
@@ -0,0 +1,328 @@
+"""
+Records the Modbus traffic to and from an inverter, and replays it later.
+
+A capture file starts with a header (magic, format version, and a JSON blob describing the connection), followed by
+one record per transaction:
+
+    timestamp (f64, seconds since the capture started)
+    function code (u8)
+    slave (u8)
+    status (u8, see CaptureStatus)
+    start address (u16)
+    count (u16)
+    duration (f32, milliseconds)
+    number of values (u16)
+    values (u16 each: registers read or written, or the exception code)
+
+All fields are little-endian. This is small enough to leave running for a few hours against a busy inverter.
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+
+from ..vendor import pymodbus
+
+_LOGGER = logging.getLogger(__name__)
+
+_MAGIC = b"FXMBCAP"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<7sBH")
+_RECORD = struct.Struct("<dBBBHHfH")
+
+READ_HOLDING_REGISTERS = 3
+READ_INPUT_REGISTERS = 4
+WRITE_SINGLE_REGISTER = 6
+WRITE_MULTIPLE_REGISTERS = 16
+
+# The pymodbus client methods which we record, and the function code of the request they send
+RECORDED_CALLS = {
+    "read_holding_registers": READ_HOLDING_REGISTERS,
+    "read_input_registers": READ_INPUT_REGISTERS,
+    "write_register": WRITE_SINGLE_REGISTER,
+    "write_registers": WRITE_MULTIPLE_REGISTERS,
+}
+
+
+class CaptureStatus(IntEnum):
+    """How a recorded transaction ended"""
+
+    OK = 0
+    # The device replied with a Modbus exception. The only value is the exception code
+    EXCEPTION = 1
+    # The device didn't reply (pymodbus returned a ModbusIOException)
+    NO_RESPONSE = 2
+    # We couldn't connect, or the connection dropped
+    CONNECTION_ERROR = 3
+
+
+@dataclass(frozen=True, slots=True)
+class CaptureRecord:
+    timestamp: float
+    function_code: int
+    slave: int
+    status: CaptureStatus
+    address: int
+    count: int
+    duration_ms: float
+    values: tuple[int, ...]
+
+
+class TrafficRecorder:
+    """
+    Appends transactions to a capture file.
+
+    record() is called from executor threads, possibly several at once if the client has a connection pool, so must be
+    constructed and closed from the executor too.
+    """
+
+    def __init__(self, path: Path, metadata: dict[str, Any]) -> None:
+        encoded_metadata = json.dumps(metadata).encode("utf-8")
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._file: BinaryIO | None = path.open("wb")
+        self._file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(encoded_metadata)))
+        self._file.write(encoded_metadata)
+        self.num_records = 0
+
+    def record(
+        self, function_code: int, slave: int, address: int, request: Any, response: Any, duration_ms: float
+    ) -> None:
+        """
+        Record a transaction.
+
+        request is the count for reads, or the value(s) for writes. response is whatever pymodbus returned, or the
+        exception which it raised.
+        """
+        timestamp = time.monotonic() - self._started_at
+        values: list[int]
+        if isinstance(request, int) and function_code in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            count, values = request, []
+        else:
+            values = [int(x) for x in request] if isinstance(request, list) else [int(request)]
+            count = len(values)
+
+        if isinstance(response, pymodbus.ExceptionResponse):
+            status, values = CaptureStatus.EXCEPTION, [response.exception_code]
+        elif isinstance(response, pymodbus.ConnectionException):
+            status, values = CaptureStatus.CONNECTION_ERROR, []
+        elif isinstance(response, Exception):
+            status, values = CaptureStatus.NO_RESPONSE, []
+        else:
+            status = CaptureStatus.OK
+            if hasattr(response, "registers"):
+                values = list(response.registers)
+
+        data = _RECORD.pack(timestamp, function_code, slave, status, address, count, duration_ms, len(values))
+        data += struct.pack(f"<{len(values)}H", *values)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(data)
+                self.num_records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TrafficCapture:
+    """A capture file which has been loaded into memory"""
+
+    def __init__(self, metadata: dict[str, Any], records: list[CaptureRecord]) -> None:
+        self.metadata = metadata
+        self.records = records
+
+    @staticmethod
+    def load(path: Path) -> "TrafficCapture":
+        """Load a capture file. This does blocking I/O"""
+        data = path.read_bytes()
+        magic, version, metadata_len = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported capture format version {version}")
+
+        offset = _HEADER.size
+        metadata = json.loads(data[offset : offset + metadata_len].decode("utf-8"))
+        offset += metadata_len
+
+        records = []
+        while offset < len(data):
+            timestamp, function_code, slave, status, address, count, duration_ms, num_values = _RECORD.unpack_from(
+                data, offset
+            )
+            offset += _RECORD.size
+            values = struct.unpack_from(f"<{num_values}H", data, offset)
+            offset += num_values * 2
+            records.append(
+                CaptureRecord(
+                    timestamp, function_code, slave, CaptureStatus(status), address, count, duration_ms, values
+                )
+            )
+
+        return TrafficCapture(metadata, records)
+
+    def client_factory(self, speed: float = 1.0) -> Callable[..., "ReplayPymodbusClient"]:
+        """
+        Returns a factory for pymodbus clients which replay this capture, suitable for passing to ModbusClient.
+
+        speed scales the time which each transaction takes: 1 replays in real time, 10 ten times faster, and 0 as fast
+        as possible.
+        """
+        state = _ReplayState(self.records, speed)
+        return lambda **_kwargs: ReplayPymodbusClient(state)
+
+
+class _ReplayState:
+    """Shared between all of the ReplayPymodbusClients in a ModbusClient's pool"""
+
+    def __init__(self, records: list[CaptureRecord], speed: float) -> None:
+        self.speed = speed
+        self.lock = threading.Lock()
+        # Requests are matched to responses by what they asked for, in the order they were recorded, so that we cope
+        # with the controller ordering its reads differently (e.g. because it's polling from a connection pool)
+        self._recorded: dict[tuple[int, int, int, int], list[CaptureRecord]] = {}
+        self._pending: dict[tuple[int, int, int, int], deque[CaptureRecord]] = {}
+        # The last value read from each register, to answer requests which the capture doesn't contain verbatim
+        self._registers: dict[tuple[int, int, int], int] = {}
+        for record in records:
+            self._recorded.setdefault((record.function_code, record.slave, record.address, record.count), []).append(
+                record
+            )
+            if record.status == CaptureStatus.OK and record.function_code in (
+                READ_HOLDING_REGISTERS,
+                READ_INPUT_REGISTERS,
+            ):
+                for i, value in enumerate(record.values):
+                    self._registers[(record.function_code, record.slave, record.address + i)] = value
+
+    def next_record(self, function_code: int, slave: int, address: int, count: int) -> CaptureRecord | None:
+        key = (function_code, slave, address, count)
+        with self.lock:
+            recorded = self._recorded.get(key)
+            if recorded is None:
+                return None
+            pending = self._pending.get(key)
+            # Once we've run out, go round again, so that a replay can run for as long as the caller likes
+            if not pending:
+                pending = self._pending[key] = deque(recorded)
+            return pending.popleft()
+
+    def read_registers(self, function_code: int, slave: int, address: int, count: int) -> list[int] | None:
+        with self.lock:
+            values = [self._registers.get((function_code, slave, x)) for x in range(address, address + count)]
+        if any(x is None for x in values):
+            return None
+        return [x for x in values if x is not None]
+
+
+class ReplayPymodbusClient:
+    """Stands in for a pymodbus sync client, answering requests from a capture"""
+
+    def __init__(self, state: _ReplayState) -> None:
+        self._state = state
+        self.connected = False
+
+    def connect(self) -> bool:
+        self.connected = True
+        return True
+
+    def close(self) -> None:
+        self.connected = False
+
+    def send(self, request: bytes) -> int:
+        # Called once per transaction, so that ModbusClient's traffic stats work. We don't have the real bytes
+        return len(request)
+
+    def recv(self, _size: int | None) -> bytes:
+        return b""
+
+    def read_holding_registers(self, address: int, count: int, slave: int) -> Any:
+        return self._replay(READ_HOLDING_REGISTERS, address, count, slave, pymodbus.ReadHoldingRegistersResponse)
+
+    def read_input_registers(self, address: int, count: int, slave: int) -> Any:
+        return self._replay(READ_INPUT_REGISTERS, address, count, slave, pymodbus.ReadInputRegistersResponse)
+
+    def write_register(self, address: int, value: int, slave: int) -> Any:
+        return self._replay(
+            WRITE_SINGLE_REGISTER, address, 1, slave, lambda _: pymodbus.WriteSingleRegisterResponse(address, value)
+        )
+
+    def write_registers(self, address: int, values: list[int], slave: int) -> Any:
+        return self._replay(
+            WRITE_MULTIPLE_REGISTERS,
+            address,
+            len(values),
+            slave,
+            lambda _: pymodbus.WriteMultipleRegistersResponse(address, len(values)),
+        )
+
+    def _replay(
+        self, function_code: int, address: int, count: int, slave: int, ok_response: Callable[[list[int]], Any]
+    ) -> Any:
+        if not self.connected:
+            raise pymodbus.ConnectionException("Replay client is not connected")
+        self.send(b"")
+
+        record = self._state.next_record(function_code, slave, address, count)
+        if record is None:
+            # The capture doesn't have this exact request (e.g. the read plan has changed since it was recorded), but
+            # we may well know the registers it asks for
+            _LOGGER.debug("No recorded transaction for fc %s, %s registers at %s", function_code, count, address)
+            if function_code in (WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_REGISTERS):
+                return ok_response([])
+            values = self._state.read_registers(function_code, slave, address, count)
+            if values is None:
+                return pymodbus.ExceptionResponse(function_code, pymodbus.ModbusExceptions.IllegalAddress)
+            return ok_response(values)
+
+        if self._state.speed > 0:
+            time.sleep(record.duration_ms / 1000 / self._state.speed)
+
+        if record.status == CaptureStatus.EXCEPTION:
+            return pymodbus.ExceptionResponse(function_code, record.values[0])
+        if record.status == CaptureStatus.NO_RESPONSE:
+            return pymodbus.ModbusIOException("No response recorded", function_code)
+        if record.status == CaptureStatus.CONNECTION_ERROR:
+            raise pymodbus.ConnectionException("Connection error recorded")
+        return ok_response(list(record.values))
+
+
+def record_calls(pymodbus_client: Any, get_recorder: Callable[[], TrafficRecorder | None]) -> None:
+    """
+    Wrap the request methods of a pymodbus client, so that each transaction is passed to whatever recorder
+    get_recorder returns at the time
+    """
+    for name, function_code in RECORDED_CALLS.items():
+        setattr(pymodbus_client, name, _recorded_call(getattr(pymodbus_client, name), function_code, get_recorder))
+
+
+def _recorded_call(
+    call: Callable[[int, Any, int], Any], function_code: int, get_recorder: Callable[[], TrafficRecorder | None]
+) -> Callable[[int, Any, int], Any]:
+    def _call(address: int, request: Any, slave: int) -> Any:
+        recorder = get_recorder()
+        if recorder is None:
+            return call(address, request, slave)
+
+        start = time.perf_counter()
+        try:
+            response = call(address, request, slave)
+        except Exception as ex:
+            recorder.record(function_code, slave, address, request, ex, (time.perf_counter() - start) * 1000)
+            raise
+        recorder.record(function_code, slave, address, request, response, (time.perf_counter() - start) * 1000)
+        return response
+
+    return _call
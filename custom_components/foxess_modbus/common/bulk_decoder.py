@@ -0,0 +1,106 @@
+"""Decodes many entities' registers at once, to work out which entities' values have changed after a poll"""
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Mapping
+from typing import Sequence
+
+from .register_decoder import RegisterDecoder
+
+# NumPy is optional: HA installs it, but we don't require it. Without it, we fall back to decoding each entity in turn.
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+# Stands in for a value which we can't decode, because not all of its registers have been read. Decoded values are at
+# most 32 bits wide, so this can't clash with a real one.
+_MISSING = 1 << 40
+
+
+class BulkDecoder:
+    """
+    Decodes the raw (unscaled) value of every entity's registers in one go, and remembers them, so that we can tell
+    which entities' values have changed since last time.
+
+    With NumPy this is a handful of array operations over all entities, rather than one Python-level decode per entity.
+    Entities whose values span more than 2 registers (rare) are always decoded one at a time.
+    """
+
+    def __init__(self, decoders: Sequence[RegisterDecoder], *, use_numpy: bool = True) -> None:
+        self._decoders = decoders
+        self._use_numpy = use_numpy and np is not None
+        self._previous: Any = None
+
+        if self._use_numpy:
+            self._init_arrays()
+        else:
+            self._slow_indices = list(range(len(decoders)))
+
+    def _init_arrays(self) -> None:
+        assert np is not None
+        vectorised = [i for i, x in enumerate(self._decoders) if len(x.addresses) <= 2]
+        self._slow_indices = [i for i, x in enumerate(self._decoders) if len(x.addresses) > 2]
+
+        # Every address which a vectorised entity reads. Slot 0 is never read, and always holds 0: entities which only
+        # read one register take their high word from there
+        self._addresses = sorted({a for i in vectorised for a in self._decoders[i].addresses})
+        slots = {address: slot for slot, address in enumerate(self._addresses, start=1)}
+
+        self._vectorised_indices: npt.NDArray[np.intp] = np.array(vectorised, dtype=np.intp)
+        self._low_slots = np.array([slots[self._decoders[i].addresses[0]] for i in vectorised], dtype=np.intp)
+        self._high_slots = np.array(
+            [slots[self._decoders[i].addresses[1]] if len(self._decoders[i].addresses) == 2 else 0 for i in vectorised],
+            dtype=np.intp,
+        )
+        self._sign_bits = np.array(
+            [(1 << (len(self._decoders[i].addresses) * 16 - 1)) if self._decoders[i].signed else 0 for i in vectorised],
+            dtype=np.int64,
+        )
+
+    def changed(self, registers: Mapping[int, int]) -> list[int]:
+        """
+        Decode every entity's value from the given register values, and return the indices (into the decoders passed to
+        the constructor) of those whose values have changed since the last call. Everything has changed on the first
+        call.
+        """
+        values: Any
+        if self._use_numpy:
+            values = self._decode_vectorised(registers)
+        else:
+            values = [self._decoders[i].raw(registers) for i in self._slow_indices]
+
+        previous, self._previous = self._previous, values
+        if previous is None:
+            return list(range(len(self._decoders)))
+
+        if self._use_numpy:
+            assert np is not None
+            vectorised, slow = values
+            previous_vectorised, previous_slow = previous
+            changed: list[int] = self._vectorised_indices[np.flatnonzero(vectorised != previous_vectorised)].tolist()
+            changed.extend(i for i, x, y in zip(self._slow_indices, slow, previous_slow, strict=True) if x != y)
+            return changed
+
+        return [i for i, x, y in zip(self._slow_indices, values, previous, strict=True) if x != y]
+
+    def _decode_vectorised(self, registers: Mapping[int, int]) -> tuple[Any, list[int | None]]:
+        assert np is not None
+        # -1 marks registers which haven't been read
+        raw = np.fromiter(
+            (registers.get(address, -1) for address in self._addresses), dtype=np.int64, count=len(self._addresses)
+        )
+        raw = np.concatenate((np.zeros(1, dtype=np.int64), raw))
+
+        low = raw[self._low_slots]
+        high = raw[self._high_slots]
+        values = low | (high << 16)
+        # Two's complement, for the signed ones. This is a no-op for the unsigned ones, whose sign bit is 0
+        values = (values & (self._sign_bits - 1)) - (values & self._sign_bits)
+        values[(low < 0) | (high < 0)] = _MISSING
+
+        slow = [self._decoders[i].raw(registers) for i in self._slow_indices]
+        return values, slow
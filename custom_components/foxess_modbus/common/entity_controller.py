@@ -5,9 +5,14 @@ from abc import ABC
 from abc import abstractmethod
 from enum import Enum
 from typing import Any
+from typing import Mapping
+from typing import Sequence
 
 from homeassistant.core import HomeAssistant
 
+from .register_decoder import RegisterDecoder
+from .stats import PollStats
+from .stats import TransactionStats
 from .types import RegisterPollType
 
 _LOGGER = logging.getLogger(__name__)
@@ -25,6 +30,27 @@ class ModbusControllerEntity(ABC):
     def register_poll_type(self) -> RegisterPollType:
         return RegisterPollType.PERIODICALLY
 
+    @property
+    def register_decoder(self) -> RegisterDecoder | None:
+        """
+        If set, this entity's state depends only on the value decoded by this decoder, and the controller only calls
+        update_callback when that value changes
+        """
+        return None
+
+    @property
+    def entity_key(self) -> str | None:
+        """The key of this entity's description, which other entities can use to find it"""
+        return None
+
+    @property
+    def source_entity_keys(self) -> Sequence[str]:
+        """
+        Keys of the entities (of this inverter) whose values this entity's value is derived from. The controller calls
+        this entity's update_callback after theirs
+        """
+        return ()
+
     @abstractmethod
     def update_callback(self, changed_addresses: set[int]) -> None:
         """Notify listeners that the given addresses have changed"""
@@ -114,6 +140,21 @@ class EntityController(ABC):
     def inverter_details(self) -> dict[str, Any]:
         """Fetches the inverter details"""
 
+    @property
+    @abstractmethod
+    def poll_stats(self) -> PollStats:
+        """Fetches statistics about the polls made by this controller"""
+
+    @property
+    @abstractmethod
+    def transaction_stats(self) -> TransactionStats:
+        """Fetches statistics about the transactions sent over this controller's connection"""
+
+    @property
+    @abstractmethod
+    def last_poll_time(self) -> float | None:
+        """The time.monotonic() at which the last successful poll read the inverter's registers, if any"""
+
     @abstractmethod
     def register_modbus_entity(self, listener: ModbusControllerEntity) -> None:
         """Register a modbus entity with the ModbusController"""
@@ -122,6 +163,10 @@ class EntityController(ABC):
     def remove_modbus_entity(self, listener: ModbusControllerEntity) -> None:
         """Removes a modbus entity from the ModbusController"""
 
+    @abstractmethod
+    def get_modbus_entity(self, key: str) -> ModbusControllerEntity | None:
+        """Fetch the registered modbus entity with the given entity_key, if any"""
+
     @abstractmethod
     async def write_register(self, address: int, value: int) -> None:
         """Write a single value to a register"""
@@ -133,3 +178,12 @@ class EntityController(ABC):
     @abstractmethod
     def read(self, address: int | list[int], *, signed: bool) -> int | None:
         """Fetch the last-read value for the given address, or None if none is avaiable"""
+
+    @abstractmethod
+    def register_values(self) -> Mapping[int, int]:
+        """
+        Fetch the current value of every register which has one, keyed by address, as used by read.
+
+        This is for decoding lots of values at once (see RegisterDecoder): the result mustn't be modified, or kept
+        beyond the current update.
+        """
@@ -0,0 +1,56 @@
+"""Integrates a series of samples over time, e.g. power into energy"""
+
+LEFT = "left"
+RIGHT = "right"
+TRAPEZOIDAL = "trapezoidal"
+
+
+class Integrator:
+    """
+    Accumulates the Riemann sum of a series of (time, value) samples.
+
+    Samples are integrated between the times at which they were actually taken. If there's a gap of more than max_gap
+    between two samples (e.g. because the inverter was unreachable), or a sample has no value, we don't know what
+    happened in between, so nothing is added for that interval.
+    """
+
+    __slots__ = ("_last_time", "_last_value", "_max_gap", "_method", "_unit_seconds", "total")
+
+    def __init__(self, method: str, *, unit_seconds: float, max_gap: float, total: float = 0.0) -> None:
+        """
+        method is LEFT, RIGHT or TRAPEZOIDAL. Values are multiplied by the number of seconds between samples divided by
+        unit_seconds, so e.g. a unit_seconds of 3600 integrates kW into kWh.
+        """
+        if method not in (LEFT, RIGHT, TRAPEZOIDAL):
+            raise ValueError(f"Unknown integration method '{method}'")
+        self._method = method
+        self._unit_seconds = unit_seconds
+        self._max_gap = max_gap
+        self._last_time: float | None = None
+        self._last_value: float | None = None
+        self.total = total
+
+    def add(self, time: float, value: float | None) -> bool:
+        """
+        Add a sample taken at the given time (in seconds, e.g. from time.monotonic()). Returns True if this added to
+        the total.
+
+        A sample taken at the same time as the last one is ignored.
+        """
+        last_time, last_value = self._last_time, self._last_value
+        if last_time is not None and time <= last_time:
+            return False
+
+        self._last_time = time
+        self._last_value = value
+        if last_time is None or last_value is None or value is None or time - last_time > self._max_gap:
+            return False
+
+        if self._method == TRAPEZOIDAL:
+            height = (last_value + value) / 2
+        elif self._method == LEFT:
+            height = last_value
+        else:
+            height = value
+        self.total += height * (time - last_time) / self._unit_seconds
+        return True
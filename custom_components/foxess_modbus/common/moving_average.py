@@ -0,0 +1,62 @@
+"""A moving average over a fixed number of samples"""
+
+DEFAULT_WINDOW = 6
+
+
+class MovingAverage:
+    """
+    Moving average over the last `window` values, kept in a ring buffer with a running sum, so that adding a value and
+    reading the average are O(1) however large the window.
+
+    An empty filter fills itself with the first value it's given, so the average is never taken over fewer than `window`
+    values.
+    """
+
+    __slots__ = ("_index", "_sum", "_values", "window")
+
+    def __init__(self, window: int = DEFAULT_WINDOW) -> None:
+        if window < 1:
+            raise ValueError(f"Window must be at least 1, not {window}")
+        self.window = window
+        self._values: list[float] = [0.0] * window
+        self._index = 0
+        # None when the filter is empty
+        self._sum: float | None = None
+
+    def __len__(self) -> int:
+        return 0 if self._sum is None else self.window
+
+    def clear(self) -> None:
+        """Empty the filter"""
+        self._sum = None
+
+    def fill(self, value: float) -> None:
+        """Replace every value in the filter with the given value"""
+        values = self._values
+        for i in range(self.window):
+            values[i] = value
+        self._index = 0
+        self._sum = value * self.window
+
+    def add(self, value: float) -> float:
+        """Add a value, replacing the oldest, and return the new average"""
+        if self._sum is None:
+            self.fill(value)
+            return value
+
+        index = self._index
+        self._sum += value - self._values[index]
+        self._values[index] = value
+        index += 1
+        if index == self.window:
+            index = 0
+            # Adding and subtracting floats accumulates rounding errors in the running sum, so re-total it once per
+            # trip round the buffer. This keeps the cost per value O(1)
+            self._sum = sum(self._values)
+        self._index = index
+        return self._sum / self.window
+
+    @property
+    def average(self) -> float | None:
+        """The current average, or None if the filter is empty"""
+        return None if self._sum is None else self._sum / self.window
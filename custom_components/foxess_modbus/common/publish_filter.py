@@ -0,0 +1,136 @@
+"""Decides which of a sensor's new values are worth writing to HA's state machine (and so to the recorder)"""
+
+import time
+from typing import Any
+
+# The keys of the publish filter settings for an entity class, in the PUBLISH_FILTERS option
+ABSOLUTE_DEADBAND = "absolute_deadband"
+# In percent
+RELATIVE_DEADBAND = "relative_deadband"
+# The rest are in seconds
+MIN_INTERVAL = "min_interval"
+MAX_INTERVAL = "max_interval"
+HEARTBEAT = "heartbeat"
+
+FILTER_SETTINGS = [ABSOLUTE_DEADBAND, RELATIVE_DEADBAND, MIN_INTERVAL, MAX_INTERVAL, HEARTBEAT]
+
+# The classes of entity which can be given their own filter settings. These are sensor device classes, except for
+# OTHER_ENTITY_CLASS, which covers the sensors which don't have one of the others
+OTHER_ENTITY_CLASS = "other"
+ENTITY_CLASSES = ["power", "energy", "voltage", "current", "temperature", "frequency", "battery", OTHER_ENTITY_CLASS]
+
+
+class PublishFilter:
+    """
+    Filters the values of a sensor, so that only values which have changed by a meaningful amount are published.
+
+    A new value is published if it differs from the last published value by at least the absolute deadband, or by at
+    least the relative deadband (a fraction of the last published value). If neither deadband is set, any change is
+    published. On top of that:
+    - min_interval: never publish changes more often than this
+    - max_interval: publish a changed value which has been held back by the deadbands for this long
+    - heartbeat: re-publish the value after this long, even if it hasn't changed
+
+    Changes to or from a non-numeric value (e.g. None) ignore the deadbands.
+    """
+
+    __slots__ = (
+        "_absolute_deadband",
+        "_heartbeat",
+        "_max_interval",
+        "_min_interval",
+        "_published",
+        "_published_at",
+        "_relative_deadband",
+    )
+
+    def __init__(
+        self,
+        *,
+        absolute_deadband: float | None = None,
+        relative_deadband: float | None = None,
+        min_interval: float | None = None,
+        max_interval: float | None = None,
+        heartbeat: float | None = None,
+    ) -> None:
+        self._absolute_deadband = absolute_deadband
+        self._relative_deadband = relative_deadband
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._heartbeat = heartbeat
+        self._published: Any = None
+        # None until the first value has been published
+        self._published_at: float | None = None
+
+    @staticmethod
+    def from_settings(settings: dict[str, Any]) -> "PublishFilter":
+        """Create a filter from a dict of FILTER_SETTINGS, as stored in the options"""
+        relative_deadband = settings.get(RELATIVE_DEADBAND)
+        return PublishFilter(
+            absolute_deadband=settings.get(ABSOLUTE_DEADBAND),
+            relative_deadband=relative_deadband / 100 if relative_deadband is not None else None,
+            min_interval=settings.get(MIN_INTERVAL),
+            max_interval=settings.get(MAX_INTERVAL),
+            heartbeat=settings.get(HEARTBEAT),
+        )
+
+    def update(self, value: Any, now: float) -> bool:
+        """
+        Called with the sensor's latest value, at the given time (from time.monotonic()). Returns True if the value
+        should be published.
+
+        This needs calling on every poll, not just when the value changes, for max_interval and heartbeat to work.
+        """
+        published_at = self._published_at
+        if published_at is None:
+            return self._publish(value, now)
+
+        elapsed = now - published_at
+        published = self._published
+        if value == published:
+            return self._heartbeat is not None and elapsed >= self._heartbeat and self._publish(value, now)
+
+        if self._min_interval is not None and elapsed < self._min_interval:
+            return False
+
+        if (
+            not isinstance(value, int | float)
+            or not isinstance(published, int | float)
+            or (self._absolute_deadband is None and self._relative_deadband is None)
+        ):
+            return self._publish(value, now)
+
+        delta = abs(value - published)
+        if (
+            (self._absolute_deadband is not None and delta >= self._absolute_deadband)
+            or (self._relative_deadband is not None and delta >= self._relative_deadband * abs(published))
+            or (self._max_interval is not None and elapsed >= self._max_interval)
+        ):
+            return self._publish(value, now)
+
+        return False
+
+    def _publish(self, value: Any, now: float) -> bool:
+        self._published = value
+        self._published_at = now
+        return True
+
+
+def create_publish_filter(publish_filters: dict[str, dict[str, Any]], device_class: str | None) -> PublishFilter | None:
+    """
+    Create the filter for a sensor with the given device class, from the PUBLISH_FILTERS option (entity class ->
+    settings), or None if it shouldn't be filtered
+    """
+    entity_class = device_class if device_class in ENTITY_CLASSES else OTHER_ENTITY_CLASS
+    settings = publish_filters.get(entity_class)
+    return PublishFilter.from_settings(settings) if settings else None
+
+
+def should_publish(publish_filter: PublishFilter | None, value: Any, published: Any) -> bool:
+    """
+    Whether a sensor should publish its new value, given the value it last published: only if it has changed, or as
+    publish_filter (if any) decides
+    """
+    if publish_filter is not None:
+        return publish_filter.update(value, time.monotonic())
+    return bool(value != published)
@@ -0,0 +1,85 @@
+"""Turns raw register values into the values which entities show"""
+
+import functools
+import operator
+import struct
+from typing import Callable
+from typing import Mapping
+from typing import Sequence
+
+
+@functools.cache
+def register_decoder(num_registers: int, signed: bool) -> Callable[[Sequence[int]], int]:
+    """
+    Returns a function which combines num_registers register values (lowest-order register first, as passed to
+    EntityController.read) into a single int.
+
+    Decoders are cached, so every entity with the same width and signedness shares one.
+    """
+    if num_registers == 1:
+        if signed:
+            return _decode_int16
+        return operator.itemgetter(0)
+
+    # Registers are lowest-order first, so packing them little-endian gives the little-endian bytes of the whole value
+    pack = struct.Struct(f"<{num_registers}H").pack
+    value_format = {2: "i", 4: "q"}.get(num_registers)
+    if value_format is not None:
+        unpack = struct.Struct("<" + (value_format if signed else value_format.upper())).unpack
+        return lambda values: unpack(pack(*values))[0]
+
+    return lambda values: int.from_bytes(pack(*values), "little", signed=signed)
+
+
+def _decode_int16(values: Sequence[int]) -> int:
+    value = values[0]
+    return value - 0x10000 if value & 0x8000 else value
+
+
+class RegisterDecoder:
+    """
+    Decodes a numeric entity's value straight from the controller's register store.
+
+    This is built once when the entity is created, with everything about the entity's registers (addresses, width,
+    signedness, scale, post-processing) baked in, so that decoding is a dict lookup or two, a struct unpack and a
+    multiply, rather than re-deriving all of that on every poll.
+    """
+
+    __slots__ = ("_decode", "_get", "_post_process", "_scale", "addresses", "signed")
+
+    def __init__(
+        self,
+        addresses: Sequence[int],
+        *,
+        signed: bool,
+        scale: float | None = None,
+        post_process: Callable[[float], float] | None = None,
+    ) -> None:
+        self.addresses = tuple(addresses)
+        self.signed = signed
+        # itemgetter returns a bare value rather than a tuple when given a single key, so wrap that case
+        getter = operator.itemgetter(*self.addresses)
+        self._get: Callable[[Mapping[int, int]], Sequence[int]] = (
+            getter if len(self.addresses) > 1 else lambda registers: (getter(registers),)
+        )
+        self._decode = register_decoder(len(self.addresses), signed)
+        self._scale = scale
+        self._post_process = post_process
+
+    def raw(self, registers: Mapping[int, int]) -> int | None:
+        """Decode the int held in the entity's registers, before scaling, or None if they haven't all been read"""
+        try:
+            return self._decode(self._get(registers))
+        except KeyError:
+            return None
+
+    def __call__(self, registers: Mapping[int, int]) -> int | float | None:
+        """Decode the entity's value, or None if its registers haven't all been read"""
+        value: int | float | None = self.raw(registers)
+        if value is None:
+            return None
+        if self._scale is not None:
+            value = value * self._scale
+        if self._post_process is not None:
+            value = self._post_process(float(value))
+        return value
@@ -0,0 +1,84 @@
+"""Keeps the recent values of a set of registers in memory"""
+
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from typing import Iterable
+from typing import Mapping
+from typing import Sequence
+
+# Stored in place of a register which didn't have a value when the sample was taken. Registers are 16 bits, so this
+# can't clash with a real value
+_MISSING = -1
+
+
+class RegisterHistory:
+    """
+    A fixed-size ring buffer of timestamped samples of a set of registers.
+
+    Each register's values are kept in their own array, so a sample costs 4 bytes per register (plus 8 for its
+    timestamp), and memory use is fixed up front: a day of 5-second polls of 10 registers is under 1MB.
+    """
+
+    def __init__(self, addresses: Iterable[int], capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError(f"Capacity must be at least 1, not {capacity}")
+        self.addresses: tuple[int, ...] = tuple(sorted(set(addresses)))
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._values = {address: array("i", [_MISSING]) * capacity for address in self.addresses}
+        # Index of the slot which the next sample goes into
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def record(self, timestamp: float, registers: Mapping[int, int]) -> None:
+        """
+        Record a sample of the registers, taken at the given time (seconds since the epoch).
+
+        query relies on the timestamps being in order, so if the clock has gone backwards (e.g. NTP stepped it), the
+        sample is recorded at the same time as the previous one
+        """
+        index = self._next
+        if self._count > 0:
+            timestamp = max(timestamp, self._timestamps[(index - 1) % self.capacity])
+        self._timestamps[index] = timestamp
+        for address, values in self._values.items():
+            values[index] = registers.get(address, _MISSING)
+        self._next = (index + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def query(
+        self, addresses: Sequence[int], start: float | None = None, end: float | None = None
+    ) -> tuple[list[float], dict[int, list[int | None]]]:
+        """
+        Fetch the samples taken between start and end (inclusive, seconds since the epoch), oldest first, as
+        (timestamps, {address: values}). Values are None where the register didn't have a value.
+
+        Raises KeyError if any of the addresses aren't recorded.
+        """
+        missing = [x for x in addresses if x not in self._values]
+        if missing:
+            raise KeyError(f"Registers {missing} are not recorded")
+
+        # The samples in order are slots [oldest, capacity) followed by [0, oldest)
+        oldest = (self._next - self._count) % self.capacity
+        order = self._slots(oldest, self._count)
+        timestamps = [self._timestamps[i] for i in order]
+        first = bisect_left(timestamps, start) if start is not None else 0
+        last = bisect_right(timestamps, end) if end is not None else len(timestamps)
+        order = order[first:last]
+
+        values = {}
+        for address in addresses:
+            column = self._values[address]
+            values[address] = [x if x != _MISSING else None for x in (column[i] for i in order)]
+        return timestamps[first:last], values
+
+    def _slots(self, oldest: int, count: int) -> list[int]:
+        end = oldest + count
+        if end <= self.capacity:
+            return list(range(oldest, end))
+        return [*range(oldest, self.capacity), *range(end - self.capacity)]
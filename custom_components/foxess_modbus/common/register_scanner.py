@@ -0,0 +1,194 @@
+"""Maps out which registers in an address range can be read"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Awaitable
+from typing import Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+# Reads num_registers registers from start_address, returning None if the device rejects the read with IllegalAddress
+ReadFunc = Callable[[int, int], Awaitable[list[int] | None]]
+
+# Give up after this many reads in a row fail with something other than IllegalAddress: the inverter is probably
+# offline, and carrying on would mean waiting for a timeout on every remaining block
+_MAX_CONSECUTIVE_FAILURES = 3
+
+
+@dataclass
+class ScanResult:
+    # (start address, values) of each run of readable registers, in address order
+    valid_ranges: list[tuple[int, list[int]]] = field(default_factory=list)
+    # Inclusive (start, end) of each run of registers which the inverter rejected with IllegalAddress, in address order.
+    # This is the format of SpecialRegisterConfig.invalid_register_ranges
+    invalid_ranges: list[tuple[int, int]] = field(default_factory=list)
+    # Inclusive (start, end) of the registers which were skipped over between unreadable registers, rather than read one
+    # at a time. These are probably unreadable, but could contain readable registers
+    unconfirmed_ranges: list[tuple[int, int]] = field(default_factory=list)
+    # Inclusive (start, end) of each run of registers whose reads failed with something other than IllegalAddress (e.g.
+    # a timeout), so which may or may not be readable
+    unknown_ranges: list[tuple[int, int]] = field(default_factory=list)
+    transactions: int = 0
+    # Set if the scan gave up before reaching the end of the range. The registers which weren't scanned are in
+    # unknown_ranges
+    error: str | None = None
+
+
+@dataclass
+class _ScanState:
+    consecutive_failures: int = 0
+
+
+async def scan_register_range(
+    read: ReadFunc,
+    start_address: int,
+    end_address: int,
+    *,
+    max_block: int,
+    concurrency: int = 1,
+    confirm_invalid: bool = False,
+) -> ScanResult:
+    """
+    Find out which registers between start_address and end_address (inclusive) can be read, and read them.
+
+    The range is split between `concurrency` workers. Each reads blocks which double in size (up to max_block) while
+    reads succeed, and halve when a read fails with IllegalAddress, until the first unreadable register is found. It
+    then finds the end of the run of unreadable registers by probing single registers at exponentially increasing
+    distances, and binary-searching back to the first readable one. This assumes that unreadable registers come in
+    runs: a readable register which sits between two probes inside an unreadable run is missed, so the registers which
+    weren't probed are reported in unconfirmed_ranges rather than invalid_ranges. If confirm_invalid is set, every
+    unreadable register is read on its own instead, which is slower but leaves nothing unconfirmed.
+
+    Reads which fail for any other reason are reported in unknown_ranges, and the scan carries on after them, unless
+    several fail in a row: the scan then gives up, and sets error.
+    """
+    result = ScanResult()
+    count = end_address - start_address + 1
+    if count <= 0:
+        return result
+    concurrency = max(min(concurrency, count // max_block), 1)
+    segment_size = -(-count // concurrency)
+    segments = [
+        (start, min(start + segment_size - 1, end_address))
+        for start in range(start_address, end_address + 1, segment_size)
+    ]
+    state = _ScanState()
+    await asyncio.gather(
+        *[_scan_segment(read, start, end, max_block, confirm_invalid, result, state) for start, end in segments]
+    )
+
+    # Runs which cross a segment boundary are found in two halves
+    result.valid_ranges = _merge_valid(sorted(result.valid_ranges, key=lambda x: x[0]))
+    result.invalid_ranges = _merge_invalid(sorted(result.invalid_ranges))
+    result.unconfirmed_ranges = _merge_invalid(sorted(result.unconfirmed_ranges))
+    result.unknown_ranges = _merge_invalid(sorted(result.unknown_ranges))
+    return result
+
+
+async def _scan_segment(
+    read: ReadFunc,
+    start_address: int,
+    end_address: int,
+    max_block: int,
+    confirm_invalid: bool,
+    result: ScanResult,
+    state: _ScanState,
+) -> None:
+    async def _read(address: int, num_registers: int) -> list[int] | None:
+        result.transactions += 1
+        try:
+            values = await read(address, num_registers)
+        except Exception as ex:
+            state.consecutive_failures += 1
+            if state.consecutive_failures >= _MAX_CONSECUTIVE_FAILURES and result.error is None:
+                result.error = f"Gave up after {state.consecutive_failures} reads in a row failed: {ex}"
+            raise
+        state.consecutive_failures = 0
+        return values
+
+    async def _is_readable(address: int) -> bool | None:
+        """Whether a single register can be read, or None if the read failed for some other reason"""
+        try:
+            return await _read(address, 1) is not None
+        except Exception as ex:
+            _LOGGER.debug("Failed to probe register %s: %s", address, ex)
+            return None
+
+    address = start_address
+    block = max_block
+    while address <= end_address:
+        if result.error is not None:
+            result.unknown_ranges.append((address, end_address))
+            return
+        size = min(block, end_address - address + 1)
+        try:
+            values = await _read(address, size)
+        except Exception as ex:
+            _LOGGER.warning("Failed to read %s registers from %s, skipping them: %s", size, address, ex)
+            result.unknown_ranges.append((address, address + size - 1))
+            address += size
+            continue
+        if values is not None:
+            result.valid_ranges.append((address, values))
+            address += size
+            block = min(block * 2, max_block)
+            continue
+        if size > 1:
+            block = size // 2
+            continue
+
+        # address is unreadable. Probe further and further ahead for a readable register. A probe which fails for some
+        # other reason ends the run, and is read again (and reported if it fails again) by the loop above
+        probed_invalid = [address]
+        first_valid: int | None = None
+        step = 1
+        while probed_invalid[-1] < end_address and result.error is None:
+            probe = min(probed_invalid[-1] + step, end_address)
+            readable = await _is_readable(probe)
+            if readable is False:
+                probed_invalid.append(probe)
+                if not confirm_invalid:
+                    step *= 2
+            else:
+                first_valid = probe
+                break
+
+        # The run ends somewhere between the last invalid probe and first_valid: binary search for it
+        if first_valid is not None:
+            while first_valid - probed_invalid[-1] > 1 and result.error is None:
+                mid = (probed_invalid[-1] + first_valid) // 2
+                if await _is_readable(mid) is False:
+                    probed_invalid.append(mid)
+                else:
+                    first_valid = mid
+
+        result.invalid_ranges.extend((x, x) for x in probed_invalid)
+        result.unconfirmed_ranges.extend(
+            (previous + 1, probe - 1)
+            for previous, probe in zip(probed_invalid, probed_invalid[1:])
+            if probe - previous > 1
+        )
+        address = probed_invalid[-1] + 1
+        block = 1
+
+
+def _merge_valid(ranges: list[tuple[int, list[int]]]) -> list[tuple[int, list[int]]]:
+    merged: list[tuple[int, list[int]]] = []
+    for start, values in ranges:
+        if merged and merged[-1][0] + len(merged[-1][1]) == start:
+            merged[-1][1].extend(values)
+        else:
+            merged.append((start, list(values)))
+    return merged
+
+
+def _merge_invalid(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and merged[-1][1] + 1 == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,141 @@
+"""Performance statistics collected by the ModbusClient and ModbusController"""
+
+import bisect
+from typing import Any
+from typing import Sequence
+
+# Upper bounds (inclusive) of the histogram buckets used for durations, in milliseconds. There's an implicit final
+# bucket for anything larger than the last bound.
+DURATION_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    """
+    Histogram with a fixed set of buckets.
+
+    This doesn't keep individual samples, so it has a constant size however long we run for. Percentiles are therefore
+    approximate: they return the upper bound of the bucket which contains the requested sample.
+    """
+
+    __slots__ = ("_bounds", "_counts", "count", "max", "min", "total")
+
+    def __init__(self, bounds: Sequence[float] = DURATION_BUCKETS_MS) -> None:
+        self._bounds = tuple(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def record(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count > 0 else None
+
+    def percentile(self, percentile: float) -> float | None:
+        """Returns the approximate value below which the given percentage (0-100) of samples fall"""
+        if self.count == 0:
+            return None
+
+        target = percentile / 100 * self.count
+        cumulative = 0
+        for i, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target and count > 0:
+                # The overflow bucket has no upper bound, so use the largest value we've seen. Likewise, don't claim
+                # that a value was larger than anything we actually recorded
+                assert self.max is not None
+                return self.max if i == len(self._bounds) else min(self._bounds[i], self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Summary of this histogram, suitable for exposing as entity attributes"""
+        return {
+            "count": self.count,
+            "min": _round(self.min),
+            "mean": _round(self.mean),
+            "p50": _round(self.percentile(50)),
+            "p90": _round(self.percentile(90)),
+            "p99": _round(self.percentile(99)),
+            "max": _round(self.max),
+            "buckets": {
+                **{f"<={bound}": count for bound, count in zip(self._bounds, self._counts, strict=False)},
+                f">{self._bounds[-1]}": self._counts[-1],
+            },
+        }
+
+
+class TransactionStats:
+    """Statistics about the individual Modbus transactions sent by a ModbusClient"""
+
+    def __init__(self) -> None:
+        self.round_trip_ms = Histogram()
+        self.transactions = 0
+        self.retries = 0
+        self.errors = 0
+        # Number of times that a connection was (re)opened
+        self.connects = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "transactions": self.transactions,
+            "retries": self.retries,
+            "errors": self.errors,
+            "connects": self.connects,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "round_trip_ms": self.round_trip_ms.as_dict(),
+        }
+
+
+class PollStats:
+    """Statistics about the polls performed by a ModbusController, broken down by phase"""
+
+    PHASES = ("plan", "io", "decode", "notify")
+
+    def __init__(self) -> None:
+        self.total_ms = Histogram()
+        self.phase_ms = {phase: Histogram() for phase in self.PHASES}
+        self.transactions_per_poll = Histogram(bounds=(1, 2, 5, 10, 20, 50, 100))
+        self.successful_polls = 0
+        self.failed_polls = 0
+        self.skipped_polls = 0
+
+    def record_poll(self, num_transactions: int, **phase_durations_ms: float) -> None:
+        """
+        Record a successful poll. This is called before entities are notified of the poll (so that the stats sensors
+        show this poll's figures), so the notify phase is recorded separately with record_notify, and isn't part of
+        total_ms
+        """
+        for phase, duration_ms in phase_durations_ms.items():
+            self.phase_ms[phase].record(duration_ms)
+        self.total_ms.record(sum(phase_durations_ms.values()))
+        self.transactions_per_poll.record(num_transactions)
+        self.successful_polls += 1
+
+    def record_notify(self, duration_ms: float) -> None:
+        self.phase_ms["notify"].record(duration_ms)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "successful_polls": self.successful_polls,
+            "failed_polls": self.failed_polls,
+            "skipped_polls": self.skipped_polls,
+            "transactions_per_poll": self.transactions_per_poll.as_dict(),
+            "total_ms": self.total_ms.as_dict(),
+            **{f"{phase}_ms": histogram.as_dict() for phase, histogram in self.phase_ms.items()},
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
@@ -39,8 +39,20 @@ MODBUS_TYPE = "modbus_type"  # TCP, UDP, SERIAL, RTU_OVER_TCP
 MODBUS_SERIAL_BAUD = "modbus_serial_baud"
 POLL_RATE = "poll_rate"
 MAX_READ = "max_read"
+# Number of TCP connections to open to the same host. Only some adapters / inverters accept more than one
+MAX_CONNECTIONS = "max_connections"
 ADAPTER_ID = "adapter_id"
 ROUND_SENSOR_VALUES = "round_sensor_values"
+# Number of polls which rounded sensors average over
+ROUND_SENSOR_WINDOW = "round_sensor_window"
+# Entity class -> publish filter settings, see common/publish_filter.py
+PUBLISH_FILTERS = "publish_filters"
+# Addresses of registers whose recent values the controller keeps in memory, and for how many hours
+HISTORY_REGISTERS = "history_registers"
+HISTORY_HOURS = "history_hours"
+DEFAULT_HISTORY_HOURS = 24
+# The most registers which we'll keep a history of. They're polled, and each has a buffer of history_hours of values
+MAX_HISTORY_REGISTERS = 50
 # Used as a key in the inverter config to indicate that the adapter was migrated from config version 1
 ADAPTER_WAS_MIGRATED = "adapter_was_migrated"
 
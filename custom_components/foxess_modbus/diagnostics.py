@@ -0,0 +1,25 @@
+"""Diagnostics support for FoxESS - Modbus"""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .common.types import HassData
+from .const import DOMAIN
+from .const import HOST
+
+_TO_REDACT = {HOST}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry"""
+    hass_data: HassData = hass.data[DOMAIN]
+    controllers = hass_data[entry.entry_id]["controllers"]
+
+    return {
+        "data": async_redact_data(entry.data, _TO_REDACT),
+        "options": async_redact_data(entry.options, _TO_REDACT),
+        "controllers": [controller.diagnostics() for controller in controllers],
+    }
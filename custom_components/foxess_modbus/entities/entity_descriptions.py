@@ -183,7 +183,7 @@ def _pv_entities() -> Iterable[EntityFactory]:
             models=models,
             device_class=SensorDeviceClass.ENERGY,
             native_unit_of_measurement="kWh",
-            integration_method="left",
+            integration_method="trapezoidal",
             name=name,
             source_entity=source_entity,
             unit_time=UnitOfTime.HOURS,
@@ -1818,7 +1818,7 @@ def _inverter_entities() -> Iterable[EntityFactory]:
         device_class=SensorDeviceClass.ENERGY,
         native_unit_of_measurement="kWh",
         icon="mdi:battery-arrow-up-outline",
-        integration_method="left",
+        integration_method="trapezoidal",
         name="Battery Charge Total",
         source_entity="battery_charge",
         unit_time=UnitOfTime.HOURS,
@@ -1896,7 +1896,7 @@ def _inverter_entities() -> Iterable[EntityFactory]:
         device_class=SensorDeviceClass.ENERGY,
         native_unit_of_measurement="kWh",
         icon="mdi:battery-arrow-down-outline",
-        integration_method="left",
+        integration_method="trapezoidal",
         name="Battery Discharge Total",
         source_entity="battery_discharge",
         unit_time=UnitOfTime.HOURS,
@@ -1977,7 +1977,7 @@ def _inverter_entities() -> Iterable[EntityFactory]:
         name="Feed-in Total",
         device_class=SensorDeviceClass.ENERGY,
         native_unit_of_measurement="kWh",
-        integration_method="left",
+        integration_method="trapezoidal",
         source_entity="feed_in",
         unit_time=UnitOfTime.HOURS,
         icon="mdi:transmission-tower-import",
@@ -2057,7 +2057,7 @@ def _inverter_entities() -> Iterable[EntityFactory]:
         ],
         device_class=SensorDeviceClass.ENERGY,
         native_unit_of_measurement="kWh",
-        integration_method="left",
+        integration_method="trapezoidal",
         name="Grid Consumption Total",
         source_entity="grid_consumption",
         unit_time=UnitOfTime.HOURS,
@@ -2280,7 +2280,7 @@ def _inverter_entities() -> Iterable[EntityFactory]:
         device_class=SensorDeviceClass.ENERGY,
         native_unit_of_measurement="kWh",
         icon="mdi:home-lightning-bolt-outline",
-        integration_method="left",
+        integration_method="trapezoidal",
         name="Load Energy Total",
         source_entity="load_power",
         unit_time=UnitOfTime.HOURS,
@@ -5,10 +5,12 @@ register
 
 from dataclasses import dataclass
 from typing import Any
+from typing import Mapping
 
 from homeassistant.helpers.entity import Entity
 
 from ..common.entity_controller import EntityController
+from ..common.register_decoder import RegisterDecoder
 from ..common.types import Inv
 from ..common.types import RegisterType
 from .entity_factory import ENTITY_DESCRIPTION_KWARGS
@@ -85,6 +87,16 @@ class ModbusBatterySensor(ModbusSensor):
 
         return super().native_value
 
+    def decode_value(self, registers: Mapping[int, int]) -> int | float | None:
+        if self._bms_connect_state_address is not None and registers.get(self._bms_connect_state_address) in (0, 2):
+            return None
+        return super().decode_value(registers)
+
     @property
     def addresses(self) -> list[int]:
         return self._interested_addresses
+
+    @property
+    def register_decoder(self) -> RegisterDecoder | None:
+        # We also depend on the BMS connect state, which the decoder doesn't cover
+        return None if self._bms_connect_state_address is not None else super().register_decoder
@@ -16,11 +16,14 @@ from propcache import cached_property
 
 from ..common.entity_controller import EntityController
 from ..common.entity_controller import ModbusControllerEntity
+from ..common.publish_filter import PublishFilter
+from ..common.publish_filter import create_publish_filter
 from ..const import DOMAIN
 from ..const import ENTITY_ID_PREFIX
 from ..const import FRIENDLY_NAME
 from ..const import INVERTER_CONN
 from ..const import INVERTER_MODEL
+from ..const import PUBLISH_FILTERS
 from ..const import UNIQUE_ID_PREFIX
 from .base_validator import BaseValidator
 
@@ -96,6 +99,10 @@ class ModbusEntityMixin(
         """Return a unique ID."""
         return _create_unique_id(self.entity_description.key, self._controller.inverter_details)
 
+    @property
+    def entity_key(self) -> str | None:
+        return self.entity_description.key
+
     @property
     def device_info(self) -> DeviceInfo:
         """Return device specific attributes."""
@@ -149,6 +156,12 @@ class ModbusEntityMixin(
         """Called when the controller reads an updated to any of the addresses in self.addresses"""
         self.schedule_update_ha_state()
 
+    def _create_publish_filter(self) -> PublishFilter | None:
+        """Create the publish filter which the user has configured for this sensor's class of entity, if any"""
+        return create_publish_filter(
+            self._controller.inverter_details.get(PUBLISH_FILTERS, {}), self.entity_description.device_class
+        )
+
     def _get_entity_id(self, platform: Platform) -> str:
         """Gets the entity ID"""
         return f"{platform}.{_add_entity_id_prefix(self.entity_description.key, self._controller.inverter_details)}"
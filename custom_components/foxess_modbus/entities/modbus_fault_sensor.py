@@ -1,7 +1,9 @@
 """Decodes the fault registers"""
 
 from dataclasses import dataclass
+from dataclasses import field
 from typing import Any
+from typing import Sequence
 from typing import cast
 
 from homeassistant.components.sensor import SensorEntity
@@ -25,12 +27,72 @@ class FaultSet:
     # Processed in order. If key is active, any faults in value will be removed
     masks: dict[str, list[str]]
 
+    # Compiled from faults and masks, see decode
+    _names: list[str] = field(init=False, repr=False, compare=False)
+    _byte_tables: list[tuple[list[tuple[int, ...]], list[tuple[int, ...]]]] = field(
+        init=False, repr=False, compare=False
+    )
+    _masked_by: dict[int, frozenset[int]] = field(init=False, repr=False, compare=False)
+
     def __post_init__(self) -> None:
         for assert_fault, assert_masks in self.masks.items():
             assert any(fault for fault_list in self.faults for fault in fault_list if fault == assert_fault)
             for assert_mask in assert_masks:
                 assert any(fault for fault_list in self.faults for fault in fault_list if fault == assert_mask)
 
+        # Give every fault an index, in the order that they're reported in: by register, then by bit. Then for each
+        # register, build a table from each possible value of its low byte (and its high byte) to the indices of the
+        # faults which that byte has set
+        self._names = []
+        self._byte_tables = []
+        for fault_list in self.faults:
+            bit_indices: list[int | None] = []
+            for fault in fault_list:
+                bit_indices.append(len(self._names) if fault is not None else None)
+                if fault is not None:
+                    self._names.append(fault)
+            bit_indices += [None] * (16 - len(bit_indices))
+            self._byte_tables.append((_build_byte_table(bit_indices[:8]), _build_byte_table(bit_indices[8:])))
+
+        # Fault index -> indices of the faults which it masks
+        self._masked_by = {}
+        for fault, masked in self.masks.items():
+            masked_indices = frozenset(i for i, name in enumerate(self._names) if name in masked)
+            for i, name in enumerate(self._names):
+                if name == fault:
+                    self._masked_by[i] = self._masked_by.get(i, frozenset()) | masked_indices
+
+    def decode(self, values: Sequence[int]) -> str:
+        """Turn the values of the fault registers (one per entry in faults) into a description of the active faults"""
+        active: list[int] = []
+        for (low_table, high_table), value in zip(self._byte_tables, values, strict=True):
+            if value:
+                active += low_table[value & 0xFF]
+                active += high_table[(value >> 8) & 0xFF]
+
+        if not active:
+            return "None"
+
+        if self._masked_by:
+            masked: set[int] = set()
+            for index in active:
+                masked_indices = self._masked_by.get(index)
+                if masked_indices is not None:
+                    masked |= masked_indices
+            if masked:
+                active = [x for x in active if x not in masked]
+
+        names = self._names
+        return "; ".join([names[x] for x in active])
+
+
+def _build_byte_table(bit_indices: list[int | None]) -> list[tuple[int, ...]]:
+    """For each possible value of a byte, the indices of the faults whose bits are set in it"""
+    return [
+        tuple(index for bit, index in enumerate(bit_indices) if index is not None and byte & (1 << bit))
+        for byte in range(256)
+    ]
+
 
 STANDARD_FAULTS = FaultSet(
     faults=[
@@ -278,36 +340,23 @@ class ModbusFaultSensor(ModbusEntityMixin, SensorEntity):
         self._controller = controller
         self.entity_description = entity_description
         self._addresses = addresses
+        self._fault_set = entity_description.fault_set
+        self._last_values: tuple[int | None, ...] | None = None
+        self._last_value: str | None = None
         self.entity_id = self._get_entity_id(Platform.SENSOR)
 
     @property
     def native_value(self) -> str | None:
-        entity_description = cast(ModbusFaultSensorDescription, self.entity_description)
-        fault_set = entity_description.fault_set
-
-        faults = []
-        for i, address in enumerate(self._addresses):
-            value = self._controller.read(address, signed=False)
-            if value is None:
-                return None
-            if value != 0:
-                for index, fault_code in enumerate(fault_set.faults[i]):
-                    if fault_code is not None and (value & (1 << index)) > 0:
-                        faults.append(fault_code)
-
-        if len(faults) == 0:
-            return "None"
-
-        to_remove: set[str] = set()
-        for fault in faults:
-            masks = fault_set.masks.get(fault, [])
-            for mask in masks:
-                if mask in faults:
-                    to_remove.add(mask)
-        for fault_to_remove in to_remove:
-            faults.remove(fault_to_remove)
+        registers = self._controller.register_values()
+        values = tuple([registers.get(address) for address in self._addresses])
+        # The fault registers rarely change, so most of the time we can skip decoding them entirely
+        if values == self._last_values:
+            return self._last_value
 
-        return "; ".join(faults)
+        value = None if None in values else self._fault_set.decode(cast(tuple[int, ...], values))
+        self._last_values = values
+        self._last_value = value
+        return value
 
     @property
     def addresses(self) -> list[int]:
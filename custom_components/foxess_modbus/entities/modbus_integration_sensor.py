@@ -1,33 +1,50 @@
 """Sensor"""
 
-import inspect
 import logging
 from dataclasses import dataclass
-from datetime import timedelta
+from decimal import Decimal
 from typing import Any
-from typing import cast
+from typing import Sequence
 
-from homeassistant.components.integration.sensor import DEFAULT_ROUND
-from homeassistant.components.integration.sensor import IntegrationSensor
+from homeassistant.components.sensor import RestoreSensor
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.sensor import SensorEntityDescription
+from homeassistant.components.sensor import SensorExtraStoredData
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.const import STATE_UNKNOWN
 from homeassistant.const import Platform
 from homeassistant.const import UnitOfTime
-from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import Entity
 
 from ..common.entity_controller import EntityController
+from ..common.integrator import Integrator
+from ..common.publish_filter import should_publish
 from ..common.types import Inv
 from ..common.types import RegisterType
+from ..const import POLL_RATE
 from .entity_factory import ENTITY_DESCRIPTION_KWARGS
 from .entity_factory import EntityFactory
 from .inverter_model_spec import EntitySpec
 from .modbus_entity_mixin import ModbusEntityMixin
 from .modbus_entity_mixin import get_entity_id
+from .modbus_sensor import ModbusSensor
 
 _LOGGER = logging.getLogger(__name__)
 
-MAX_SUB_INTERVAL = timedelta(minutes=1)  # Default used by integration sensor config
+_DEFAULT_ROUND_DIGITS = 3
+
+_UNIT_SECONDS = {
+    UnitOfTime.SECONDS: 1,
+    UnitOfTime.MINUTES: 60,
+    UnitOfTime.HOURS: 60 * 60,
+    UnitOfTime.DAYS: 24 * 60 * 60,
+}
+
+# If we go this many poll intervals without a sample (and at least _MIN_MAX_GAP_SECONDS), we don't know what the source
+# did in between, so we don't integrate across the gap
+_MAX_GAP_POLLS = 5
+_MIN_MAX_GAP_SECONDS = 60
 
 
 @dataclass(kw_only=True, **ENTITY_DESCRIPTION_KWARGS)
@@ -35,8 +52,10 @@ class ModbusIntegrationSensorDescription(SensorEntityDescription, EntityFactory)
     """Custom sensor description"""
 
     models: list[EntitySpec]
+    # One of the methods in common.integrator
     integration_method: str
     round_digits: int | None = None
+    # Key of the entity to integrate
     source_entity: str
     unit_time: UnitOfTime
 
@@ -57,16 +76,12 @@ class ModbusIntegrationSensorDescription(SensorEntityDescription, EntityFactory)
         if not self._supports_inverter_model(self.models, inverter_model, register_type):
             return None
 
-        source_entity = get_entity_id(controller, Platform.SENSOR, self.source_entity)
-
-        # this piggybacks on the existing factory to create IntegrationSensors
         return ModbusIntegrationSensor(
-            hass=controller.hass,
             controller=controller,
             entity_description=self,
             integration_method=self.integration_method,
             round_digits=self.round_digits,
-            source_entity=source_entity,
+            source_entity=self.source_entity,
             unit_time=self.unit_time,
         )
 
@@ -85,12 +100,16 @@ class ModbusIntegrationSensorDescription(SensorEntityDescription, EntityFactory)
         }
 
 
-class ModbusIntegrationSensor(ModbusEntityMixin, IntegrationSensor):
-    """Sensor class."""
+class ModbusIntegrationSensor(ModbusEntityMixin, RestoreSensor):
+    """
+    Integrates the value of another of the inverter's sensors over time, e.g. to turn power into energy.
+
+    The controller calls us straight after it's updated the source sensor (see source_entity_keys), and we integrate
+    its value at the time the registers were actually read, rather than listening for changes to the source's HA state.
+    """
 
     def __init__(
         self,
-        hass: HomeAssistant,
         controller: EntityController,
         entity_description: ModbusIntegrationSensorDescription,
         integration_method: str,
@@ -100,34 +119,80 @@ class ModbusIntegrationSensor(ModbusEntityMixin, IntegrationSensor):
     ) -> None:
         """Initialize the sensor."""
 
-        if round_digits is None:
-            round_digits = DEFAULT_ROUND
-
         self._controller = controller
         self.entity_description = entity_description
         self.entity_id = self._get_entity_id(Platform.SENSOR)
+        self._attr_state_class = SensorStateClass.TOTAL
+        self._attr_extra_state_attributes = {"source": get_entity_id(controller, Platform.SENSOR, source_entity)}
+
+        self._source_entity_keys = [source_entity]
+        self._round_digits = round_digits if round_digits is not None else _DEFAULT_ROUND_DIGITS
+        poll_rate = controller.inverter_details.get(POLL_RATE, 0)
+        self._integrator = Integrator(
+            integration_method,
+            unit_seconds=_UNIT_SECONDS[unit_time],
+            max_gap=max(_MAX_GAP_POLLS * poll_rate, _MIN_MAX_GAP_SECONDS),
+        )
+        self._publish_filter = self._create_publish_filter()
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+
+        # This also picks up the totals which HA's IntegrationSensor stored, before we did our own integration
+        total: Any = None
+        if (last_sensor_data := await self.async_get_last_sensor_data()) is not None:
+            total = last_sensor_data.native_value
+        elif (last_state := await self.async_get_last_state()) is not None and last_state.state not in (
+            STATE_UNKNOWN,
+            STATE_UNAVAILABLE,
+        ):
+            total = last_state.state
+
+        if total is not None:
+            try:
+                self._integrator.total = float(total)
+            except (TypeError, ValueError):
+                _LOGGER.warning("%s: unable to restore total '%s'", self.entity_id, total)
+            else:
+                self._attr_native_value = round(self._integrator.total, self._round_digits)
 
-        # HA 2025.8 added 'hass' as a parameter
-        signature = inspect.signature(IntegrationSensor.__init__)
-        positional: list[Any] = [self]
-        if "hass" in signature.parameters:
-            positional.append(hass)
-        kwargs = {
-            "integration_method": integration_method,
-            "name": cast(str, entity_description.name),
-            "round_digits": round_digits,
-            "source_entity": source_entity,
-            "unique_id": None,
-            "unit_prefix": None,
-            "unit_time": unit_time,
-            "max_sub_interval": MAX_SUB_INTERVAL,
-        }
-
-        IntegrationSensor.__init__(*positional, **kwargs)  # type: ignore[arg-type]
-
-        # Use the icon from entity_description
-        delattr(self, "_attr_icon")
+    @property
+    def extra_restore_state_data(self) -> SensorExtraStoredData:
+        # Store the total to full precision, rather than the rounded native_value
+        total = self._integrator.total if self._attr_native_value is not None else None
+        return SensorExtraStoredData(total, self.native_unit_of_measurement)
+
+    def update_callback(self, _changed_addresses: set[int]) -> None:
+        poll_time = self._controller.last_poll_time
+        if poll_time is None:
+            return
+
+        # Integrate the source's value as read at poll_time, rather than the value it publishes, which might have been
+        # rounded
+        source = self._controller.get_modbus_entity(self._source_entity_keys[0])
+        if isinstance(source, ModbusSensor):
+            value = source.decode_value(self._controller.register_values())
+        elif isinstance(source, SensorEntity):
+            value = source.native_value
+        else:
+            value = None
+        if not isinstance(value, int | float | Decimal):
+            value = None
+
+        if self._integrator.add(poll_time, float(value) if value is not None else None) or (
+            self._publish_filter is not None and self._attr_native_value is not None
+        ):
+            # The filter needs to see every poll, for its intervals
+            new_value = round(self._integrator.total, self._round_digits)
+            # As for ModbusSensor, native_value is always the latest value, and the filter only applies to HA's state
+            previous_value, self._attr_native_value = self._attr_native_value, new_value
+            if should_publish(self._publish_filter, new_value, previous_value):
+                self.schedule_update_ha_state()
 
     @property
     def addresses(self) -> list[int]:
         return []
+
+    @property
+    def source_entity_keys(self) -> Sequence[str]:
+        return self._source_entity_keys
@@ -103,6 +103,34 @@ class ModbusInverterStateSensor(ModbusEntityMixin, SensorEntity):
         return [self._address]
 
 
+# The bits of status 1 and status 3 which ModbusG2InverterStateSensor looks at
+_G2_STATUS1_MASK = 0x45
+_G2_STATUS3_MASK = 0x01
+
+
+def _g2_state(status1: int, status3: int) -> str | None:
+    # Bit 0: Standby, 2: Operation, 6: Fault
+    if (status1 & 0x40) > 0:
+        return "Fault"
+    # Bit 0: On-Grid/Off-grid (0/1)
+    if (status3 & 0x01) > 0:
+        return "Off Grid"
+    if (status1 & 0x04) > 0:
+        return "On Grid"
+    if (status1 & 0x01) > 0:
+        return "Standby"
+    return None
+
+
+# (status 1 & _G2_STATUS1_MASK, status 3 & _G2_STATUS3_MASK) -> state
+_G2_STATES = {
+    (status1, status3): _g2_state(status1, status3)
+    for status1 in range(_G2_STATUS1_MASK + 1)
+    if status1 & _G2_STATUS1_MASK == status1
+    for status3 in range(_G2_STATUS3_MASK + 1)
+}
+
+
 @dataclass(kw_only=True, **ENTITY_DESCRIPTION_KWARGS)
 class ModbusG2InverterStateSensorDescription(SensorEntityDescription, EntityFactory):  # type: ignore[misc]
     """Description for ModbusInverterStateSensor"""
@@ -157,22 +185,12 @@ class ModbusG2InverterStateSensor(ModbusEntityMixin, SensorEntity):
 
     @property
     def native_value(self) -> str | None:
-        # Bit 0: Standby, 2: Operation, 6: Fault
         status1 = self._controller.read(self._addresses[0], signed=False)
-        # Bit 0: On-Grid/Off-grid (0/1)
         status3 = self._controller.read(self._addresses[1], signed=False)
         if status1 is None or status3 is None:
             return None
 
-        if (status1 & 0x40) > 0:
-            return "Fault"
-        if (status3 & 0x01) > 0:
-            return "Off Grid"
-        if (status1 & 0x04) > 0:
-            return "On Grid"
-        if (status1 & 0x01) > 0:
-            return "Standby"
-        return None
+        return _G2_STATES[(status1 & _G2_STATUS1_MASK, status3 & _G2_STATUS3_MASK)]
 
     @property
     def addresses(self) -> list[int]:
@@ -4,6 +4,7 @@ import logging
 from dataclasses import dataclass
 from typing import Any
 from typing import Callable
+from typing import Sequence
 
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.sensor import SensorEntityDescription
@@ -14,6 +15,7 @@ from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import async_track_state_change_event
 
 from ..common.entity_controller import EntityController
+from ..common.publish_filter import should_publish
 from ..common.types import Inv
 from ..common.types import RegisterType
 from .entity_factory import ENTITY_DESCRIPTION_KWARGS
@@ -30,6 +32,7 @@ class ModbusLambdaSensorDescription(SensorEntityDescription, EntityFactory):  #
     """Entity description for ModbusLambdaSensors"""
 
     models: list[EntitySpec]
+    # Keys of other entities of this inverter, or the entity IDs (e.g. "sensor.foo") of entities from elsewhere
     sources: list[str]
     # This might have fewer inputs than there are elements in sources, if some inputs are disabled
     method: Callable[[list[float]], Any]
@@ -47,12 +50,14 @@ class ModbusLambdaSensorDescription(SensorEntityDescription, EntityFactory):  #
         if not self._supports_inverter_model(self.models, inverter_model, register_type):
             return None
 
-        source_entity_ids = [get_entity_id(controller, Platform.SENSOR, x) for x in self.sources]
+        sources: list[tuple[str | None, str]] = [
+            (None, x) if _is_entity_id(x) else (x, get_entity_id(controller, Platform.SENSOR, x)) for x in self.sources
+        ]
 
         return ModbusLambdaSensor(
             controller=controller,
             entity_description=self,
-            source_entity_ids=source_entity_ids,
+            sources=sources,
             method=self.method,
         )
 
@@ -70,31 +75,48 @@ class ModbusLambdaSensorDescription(SensorEntityDescription, EntityFactory):  #
 
 
 class ModbusLambdaSensor(ModbusEntityMixin, SensorEntity):
-    """Generates a value by applying a lambda to the values of a number of other sensors"""
+    """
+    Generates a value by applying a lambda to the values of a number of other sensors.
+
+    Sources which are entities of the same inverter are read straight from those entities, straight after the controller
+    has updated them. Only sources from elsewhere (or which haven't been added to hass yet) are read from their HA
+    state.
+    """
 
     def __init__(
         self,
         controller: EntityController,
         entity_description: ModbusLambdaSensorDescription,
-        source_entity_ids: list[str],
+        # (entity key, or None if it isn't one of ours; entity ID)
+        sources: list[tuple[str | None, str]],
         method: Callable[[list[float]], Any],
     ) -> None:
         self._controller = controller
         self.entity_description = entity_description
-        self._source_entity_ids = source_entity_ids
+        self._sources = sources
+        self._source_entity_keys = [key for key, _ in sources if key is not None]
+        self._external_entity_ids = [entity_id for key, entity_id in sources if key is None]
         self._method = method
+        self._publish_filter = self._create_publish_filter()
 
     async def async_added_to_hass(self) -> None:
         """Add update callback after being added to hass."""
         await super().async_added_to_hass()
 
-        self.async_on_remove(async_track_state_change_event(self.hass, self._source_entity_ids, self._handle_event))
+        if self._external_entity_ids:
+            self.async_on_remove(
+                async_track_state_change_event(self.hass, self._external_entity_ids, self._handle_event)
+            )
 
         self._update_value()
 
     def _handle_event(self, _event: Event[EventStateChangedData]) -> None:
         self._update_value()
 
+    def update_callback(self, _changed_addresses: set[int]) -> None:
+        # The controller calls this after it's updated all of our sources
+        self._update_value()
+
     def _update_value(self) -> None:
         inputs = []
         new_value = None
@@ -104,8 +126,17 @@ class ModbusLambdaSensor(ModbusEntityMixin, SensorEntity):
         # (e.g. we sum PV1-PV4 and the user disabled PV4), so if any input is disabled (provided we have
         # at least one enabled input), we'll keep going.
         # However, if any input isn't a float, or is unknown/unavailable, we'll abort.
-        for source in self._source_entity_ids:
-            state = self.hass.states.get(source)
+        for key, entity_id in self._sources:
+            source = self._controller.get_modbus_entity(key) if key is not None else None
+            if isinstance(source, SensorEntity):
+                value = source.native_value
+                if not isinstance(value, int | float):
+                    success = False
+                    break
+                inputs.append(float(value))
+                continue
+
+            state = self.hass.states.get(entity_id)
             if state is None:
                 # Disabled
                 continue
@@ -123,10 +154,19 @@ class ModbusLambdaSensor(ModbusEntityMixin, SensorEntity):
         if success and len(inputs) > 0:
             new_value = self._method(inputs)
 
-        if new_value != self._attr_native_value:
-            self._attr_native_value = new_value
+        # As for ModbusSensor, native_value is always the latest value, and the filter only applies to HA's state
+        previous_value, self._attr_native_value = self._attr_native_value, new_value
+        if should_publish(self._publish_filter, new_value, previous_value):
             self.schedule_update_ha_state()
 
     @property
     def addresses(self) -> list[int]:
         return []
+
+    @property
+    def source_entity_keys(self) -> Sequence[str]:
+        return self._source_entity_keys
+
+
+def _is_entity_id(source: str) -> bool:
+    return "." in source
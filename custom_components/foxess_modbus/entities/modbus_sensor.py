@@ -1,7 +1,6 @@
 """Sensor"""
 
 import logging
-from collections import deque
 from dataclasses import dataclass
 from dataclasses import field
 from datetime import date
@@ -9,6 +8,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Any
 from typing import Callable
+from typing import Mapping
 from typing import cast
 
 from homeassistant.components.sensor import SensorEntity
@@ -18,9 +18,14 @@ from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.typing import StateType
 
 from ..common.entity_controller import EntityController
+from ..common.moving_average import DEFAULT_WINDOW
+from ..common.moving_average import MovingAverage
+from ..common.publish_filter import should_publish
+from ..common.register_decoder import RegisterDecoder
 from ..common.types import Inv
 from ..common.types import RegisterType
 from ..const import ROUND_SENSOR_VALUES
+from ..const import ROUND_SENSOR_WINDOW
 from .base_validator import BaseValidator
 from .entity_factory import ENTITY_DESCRIPTION_KWARGS
 from .entity_factory import EntityFactory
@@ -52,8 +57,11 @@ class ModbusSensorDescription(SensorEntityDescription, EntityFactory):  # type:
         register_type: RegisterType,
     ) -> Entity | None:
         addresses = self._addresses_for_inverter_model(self.addresses, inverter_model, register_type)
+        if addresses is None:
+            return None
         round_to = self.round_to if controller.inverter_details.get(ROUND_SENSOR_VALUES, False) else None
-        return ModbusSensor(controller, self, addresses, round_to) if addresses is not None else None
+        round_window = controller.inverter_details.get(ROUND_SENSOR_WINDOW, DEFAULT_WINDOW)
+        return ModbusSensor(controller, self, addresses, round_to, round_window)
 
     def serialize(self, inverter_model: Inv, register_type: RegisterType) -> dict[str, Any] | None:
         addresses = self._addresses_for_inverter_model(self.addresses, inverter_model, register_type)
@@ -81,6 +89,8 @@ class ModbusSensor(ModbusEntityMixin, SensorEntity):
         # (usually high address, low address)
         addresses: list[int],
         round_to: float | None,
+        # Number of values to average over, when rounding
+        round_window: int = DEFAULT_WINDOW,
     ) -> None:
         """Initialize the sensor."""
 
@@ -88,25 +98,36 @@ class ModbusSensor(ModbusEntityMixin, SensorEntity):
         self.entity_description = entity_description
         self._addresses = addresses
         self._round_to = round_to
-        self._moving_average_filter: deque[float] | None = deque(maxlen=6) if round_to is not None else None
+        self._moving_average_filter = MovingAverage(round_window) if round_to is not None else None
+        self._decoder = RegisterDecoder(
+            addresses,
+            signed=entity_description.signed,
+            scale=entity_description.scale,
+            post_process=entity_description.post_process,
+        )
+        self._validators = tuple(x.validate for x in entity_description.validate)
+        self._publish_filter = self._create_publish_filter()
         self.entity_id = self._get_entity_id(Platform.SENSOR)
 
     def _calculate_native_value(self) -> int | float | None:
         """Return the value reported by the sensor."""
-        entity_description = cast(ModbusSensorDescription, self.entity_description)
-        original = self._controller.read(self._addresses, signed=entity_description.signed)
-
-        if original is None:
-            return None
+        return self.decode_value(self._controller.register_values())
 
-        value: float | int = original
+    def decode_value(self, registers: Mapping[int, int]) -> int | float | None:
+        """
+        Decode and validate this sensor's value from the given register values, before it's rounded. Sensors which are
+        derived from this one use this, so that they aren't affected by rounding.
+        """
+        entity_description = cast(ModbusSensorDescription, self.entity_description)
+        value = self._decoder(registers)
 
-        if entity_description.scale is not None:
-            value = value * entity_description.scale
-        if entity_description.post_process is not None:
-            value = entity_description.post_process(float(value))
-        if not self._validate(entity_description.validate, value, original):
+        if value is None:
             return None
+        for validator in self._validators:
+            if not validator(value):
+                # Go the slow way round, to log all of the rules which failed
+                self._validate(entity_description.validate, value, self._decoder.raw(registers))
+                return None
 
         return value
 
@@ -133,42 +154,45 @@ class ModbusSensor(ModbusEntityMixin, SensorEntity):
 
         if self._round_to is not None:
             assert self._moving_average_filter is not None
-            assert self._moving_average_filter.maxlen is not None
 
             if value is None or not isinstance(value, float):
                 self._moving_average_filter.clear()
             else:
-                self._moving_average_filter.append(value)
-                # If it's empty, fill it
-                while len(self._moving_average_filter) < self._moving_average_filter.maxlen:
-                    self._moving_average_filter.append(value)
-                average_value = sum(self._moving_average_filter) / len(self._moving_average_filter)
+                # If it's empty, this fills it
+                average_value = self._moving_average_filter.add(value)
 
                 if self._attr_native_value is None or not isinstance(self._attr_native_value, float):
                     value = nearest_multiple(value, self._round_to)
                 else:
                     if abs(self._attr_native_value - average_value) >= self._round_to:
                         value = nearest_multiple(value, self._round_to)
-                        for _ in range(self._moving_average_filter.maxlen):
-                            self._moving_average_filter.append(value)
+                        self._moving_average_filter.fill(value)
                     else:
                         value = self._attr_native_value
 
         return value
 
     def update_callback(self, changed_addresses: set[int]) -> None:
-        # If we're using rounding and a filter, we need to respond to every update, even if the register hasn't changed
-        if self._round_to is None:
+        # If we're using rounding or a publish filter, we need to respond to every update, even if the register hasn't
+        # changed
+        if self._round_to is None and self._publish_filter is None:
             super().update_callback(changed_addresses)
         else:
             self._address_updated()
 
     def _address_updated(self) -> None:
         new_value = self._round_native_value(self._calculate_native_value())
-        if new_value != self._attr_native_value:
-            self._attr_native_value = new_value
+        # Sensors which are derived from this one read native_value, so that always holds the latest value: the publish
+        # filter only decides whether HA's state is updated
+        previous_value, self._attr_native_value = self._attr_native_value, new_value
+        if should_publish(self._publish_filter, new_value, previous_value):
             super()._address_updated()
 
     @property
     def addresses(self) -> list[int]:
         return self._addresses
+
+    @property
+    def register_decoder(self) -> RegisterDecoder | None:
+        # Rounded sensors need to see every poll, to feed their moving average, and filtered sensors for their intervals
+        return self._decoder if self._round_to is None and self._publish_filter is None else None
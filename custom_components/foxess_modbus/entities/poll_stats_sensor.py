@@ -0,0 +1,104 @@
+"""Diagnostic sensors which expose how long polls and transactions take"""
+
+from typing import Any
+
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntityDescription
+from homeassistant.components.sensor import SensorStateClass
+from homeassistant.const import EntityCategory
+from homeassistant.const import Platform
+from homeassistant.const import UnitOfTime
+
+from ..common.entity_controller import EntityController
+from ..common.stats import PollStats
+from .modbus_entity_mixin import ModbusEntityMixin
+
+
+class PollDurationSensor(ModbusEntityMixin, SensorEntity):
+    """Median time taken by a whole poll, with a per-phase breakdown in the attributes"""
+
+    # The attributes change every poll, and would bloat the recorder database
+    _unrecorded_attributes = frozenset(
+        {
+            "successful_polls",
+            "failed_polls",
+            "skipped_polls",
+            "transactions_per_poll",
+            "total_ms",
+            *(f"{phase}_ms" for phase in PollStats.PHASES),
+        }
+    )
+
+    def __init__(self, controller: EntityController) -> None:
+        self.entity_description = SensorEntityDescription(
+            key="poll_duration",
+            name="Poll Duration",
+            icon="mdi:timer-outline",
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+        )
+        self._controller = controller
+        self.entity_id = self._get_entity_id(Platform.SENSOR)
+
+    @property
+    def native_value(self) -> float | None:
+        return self._controller.poll_stats.total_ms.percentile(50)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return self._controller.poll_stats.as_dict()
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def addresses(self) -> list[int]:
+        return []
+
+    def update_callback(self, _changed_addresses: set[int]) -> None:
+        # We're called once per successful poll, which is exactly when our value changes
+        self._address_updated()
+
+
+class TransactionLatencySensor(ModbusEntityMixin, SensorEntity):
+    """Median round-trip time of a single Modbus transaction, with retry/error/byte counters in the attributes"""
+
+    # The attributes change every poll, and would bloat the recorder database
+    _unrecorded_attributes = frozenset(
+        {"transactions", "retries", "errors", "connects", "bytes_sent", "bytes_received", "round_trip_ms"}
+    )
+
+    def __init__(self, controller: EntityController) -> None:
+        self.entity_description = SensorEntityDescription(
+            key="transaction_latency",
+            name="Transaction Latency",
+            icon="mdi:timer-sync-outline",
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+        )
+        self._controller = controller
+        self.entity_id = self._get_entity_id(Platform.SENSOR)
+
+    @property
+    def native_value(self) -> float | None:
+        return self._controller.transaction_stats.round_trip_ms.percentile(50)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return self._controller.transaction_stats.as_dict()
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def addresses(self) -> list[int]:
+        return []
+
+    def update_callback(self, _changed_addresses: set[int]) -> None:
+        self._address_updated()
@@ -1,3 +1,4 @@
+import logging
 import re
 from typing import Any
 from typing import Awaitable
@@ -8,8 +9,10 @@ from homeassistant.config_entries import ConfigFlowResult
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.selector import selector
 
+from ..client import connection_handover
 from ..client.modbus_client import ModbusClient
 from ..client.modbus_client import ModbusClientFailedError
+from ..client.modbus_client import load_pymodbus
 from ..common.exceptions import AutoconnectFailedError
 from ..common.exceptions import UnsupportedInverterError
 from ..common.types import ConnectionType
@@ -21,14 +24,17 @@ from ..inverter_adapters import ADAPTERS
 from ..inverter_adapters import InverterAdapter
 from ..inverter_adapters import InverterAdapterType
 from ..modbus_controller import ModbusController
-from ..vendor.pymodbus import ConnectionException
-from ..vendor.pymodbus import ModbusIOException
+from ..vendor import pymodbus
 from .flow_handler_mixin import FlowHandlerMixin
 from .flow_handler_mixin import ValidationFailedError
 from .inverter_data import InverterData
 
+_LOGGER = logging.getLogger(__name__)
+
 _DEFAULT_PORT = 502
 _DEFAULT_SLAVE = 247
+# Most time to spend trying to autodetect the inverter, across all of the protocols we try
+_AUTODETECT_TIMEOUT = 60
 
 
 class AdapterFlowSegment:
@@ -265,24 +271,35 @@ class AdapterFlowSegment:
         self._inverter_data
         """
 
-        if any(
-            x
-            for x in self._other_inverters
-            if x.inverter_protocol == protocol and x.host == host and x.modbus_slave == slave
-        ):
+        if self._is_duplicate(protocol, host, slave):
             raise ValidationFailedError({"base": "duplicate_connection_details"})
 
         try:
-            if protocol in [TCP, UDP, RTU_OVER_TCP]:
-                params = {"host": host.split(":")[0], "port": int(host.split(":")[1])}
-            elif protocol == SERIAL:
-                params = {"port": host, "baudrate": 9600}
-            else:
-                raise AssertionError()
-            client = ModbusClient(self._flow.hass, protocol, adapter, params)
-            base_model, full_model = await ModbusController.autodetect(
-                client, slave, adapter.config.inverter_config(protocol)
+            candidates = self._autodetect_candidates(protocol, host, slave, adapter)
+            for candidate_protocol in dict.fromkeys(x[0] for x in candidates):
+                await self._flow.hass.async_add_import_executor_job(load_pymodbus, candidate_protocol)
+            clients = [
+                ModbusClient(self._flow.hass, x_protocol, adapter, self._client_params(x_protocol, host))
+                for x_protocol, _x_slave in candidates
+            ]
+            index, base_model, full_model = await ModbusController.autodetect_first(
+                [
+                    (client, x_slave, adapter.config.inverter_config(x_protocol))
+                    for client, (x_protocol, x_slave) in zip(clients, candidates, strict=True)
+                ],
+                close_client=False,
+                timeout=_AUTODETECT_TIMEOUT,
             )
+            if index > 0:
+                _LOGGER.warning(
+                    "No answer from %s over %s, but the inverter answered over %s, so using that instead",
+                    host,
+                    protocol,
+                    candidates[index][0],
+                )
+            protocol, slave = candidates[index]
+            # Let the integration carry on using this connection once it's set up, rather than reconnecting
+            connection_handover.hand_over(self._flow.hass, protocol, host, clients[index])
 
             self.inverter_data.inverter_base_model = base_model
             self.inverter_data.inverter_model = full_model
@@ -308,7 +325,7 @@ class AdapterFlowSegment:
                     result = str(ex.__cause__)
                 return result
 
-            if isinstance(ex.__cause__, ConnectionException):
+            if isinstance(ex.__cause__, pymodbus.ConnectionException):
                 # Mainly TCP timeouts. The actual exception message dosen't contain anything interesting here
                 raise ValidationFailedError(
                     {
@@ -321,7 +338,7 @@ class AdapterFlowSegment:
                     error_placeholders={"error_details": get_details(ex, False)},
                 ) from ex
 
-            if isinstance(ex.__cause__, ModbusIOException):
+            if isinstance(ex.__cause__, pymodbus.ModbusIOException):
                 # This is for things like invalid frames. The exception message here can be useful
                 raise ValidationFailedError(
                     {
@@ -366,6 +383,38 @@ class AdapterFlowSegment:
                 error_placeholders={"error_details": get_details(ex, True)},
             ) from ex
 
+    def _is_duplicate(self, protocol: str, host: str, slave: int) -> bool:
+        return any(
+            x
+            for x in self._other_inverters
+            if x.inverter_protocol == protocol and x.host == host and x.modbus_slave == slave
+        )
+
+    def _autodetect_candidates(
+        self, protocol: str, host: str, slave: int, adapter: InverterAdapter
+    ) -> list[tuple[str, int]]:
+        """
+        Work out which (protocol, slave) combinations to try, in order. What the user gave us always comes first.
+
+        People often pick the wrong protocol, so if that doesn't answer, for network adapters we go on to try the other
+        protocols which the adapter supports. We never guess at the slave ID: if several inverters share a bus, a
+        different one could answer. Serial ports can't be opened more than once, so those only try what they were
+        given.
+        """
+        if protocol == SERIAL or adapter.network_protocols is None:
+            return [(protocol, slave)]
+
+        others = [(x, slave) for x in adapter.network_protocols if x != protocol]
+        return [(protocol, slave), *(x for x in others if not self._is_duplicate(x[0], host, x[1]))]
+
+    @staticmethod
+    def _client_params(protocol: str, host: str) -> dict[str, Any]:
+        if protocol in [TCP, UDP, RTU_OVER_TCP]:
+            return {"host": host.split(":")[0], "port": int(host.split(":")[1])}
+        if protocol == SERIAL:
+            return {"port": host, "baudrate": 9600}
+        raise AssertionError()
+
     def _validate_hostname(self, host: str) -> None:
         if not re.fullmatch(r"[a-zA-Z0-9\.\-]+", host):
             raise ValidationFailedError({"base": "invalid_hostname"}, error_placeholders={"hostname": host})
@@ -6,19 +6,32 @@ from homeassistant import config_entries
 from homeassistant.config_entries import ConfigFlowResult
 from homeassistant.helpers.selector import selector
 
+from ..common.moving_average import DEFAULT_WINDOW
+from ..common.publish_filter import ENTITY_CLASSES
+from ..common.publish_filter import FILTER_SETTINGS
 from ..const import ADAPTER_ID
 from ..const import CONFIG_ENTRY_TITLE
+from ..const import DEFAULT_HISTORY_HOURS
+from ..const import HISTORY_HOURS
+from ..const import HISTORY_REGISTERS
 from ..const import INVERTER_VERSION
 from ..const import INVERTERS
+from ..const import MAX_CONNECTIONS
+from ..const import MAX_HISTORY_REGISTERS
 from ..const import MAX_READ
 from ..const import MODBUS_TYPE
 from ..const import POLL_RATE
+from ..const import PUBLISH_FILTERS
 from ..const import ROUND_SENSOR_VALUES
+from ..const import ROUND_SENSOR_WINDOW
+from ..const import RTU_OVER_TCP
+from ..const import TCP
 from ..inverter_adapters import ADAPTERS
 from ..inverter_profiles import Version
 from ..inverter_profiles import inverter_connection_type_profile_from_config
 from .adapter_flow_segment import AdapterFlowSegment
 from .flow_handler_mixin import FlowHandlerMixin
+from .flow_handler_mixin import ValidationFailedError
 
 
 class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
@@ -27,6 +40,7 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
     def __init__(self, config: config_entries.ConfigEntry) -> None:
         self._config = config
         self._selected_inverter_id: str | None = None
+        self._selected_entity_class: str | None = None
 
         self._adapter_segment: AdapterFlowSegment | None = None
 
@@ -78,6 +92,7 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
         if len(versions) > 1:
             options.append("version_settings")
         options.append("inverter_advanced_options")
+        options.append("select_publish_filter_class")
 
         return self.async_show_menu(step_id="inverter_options_category", menu_options=options)
 
@@ -202,12 +217,43 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
             else:
                 options.pop(ROUND_SENSOR_VALUES, None)
 
+            round_sensor_window = user_input.get("round_sensor_window")
+            if round_sensor_window is not None:
+                options[ROUND_SENSOR_WINDOW] = round_sensor_window
+            else:
+                options.pop(ROUND_SENSOR_WINDOW, None)
+
             max_read = user_input.get("max_read")
             if max_read is not None:
                 options[MAX_READ] = max_read
             else:
                 options.pop(MAX_READ, None)
 
+            max_connections = user_input.get("max_connections")
+            if max_connections is not None and max_connections > 1:
+                options[MAX_CONNECTIONS] = max_connections
+            else:
+                options.pop(MAX_CONNECTIONS, None)
+
+            history_registers = _parse_register_list(user_input.get("history_registers"))
+            connection_type_profile = inverter_connection_type_profile_from_config(combined_config_options)
+            invalid_registers = [x for x in history_registers if connection_type_profile.overlaps_invalid_range(x, x)]
+            if invalid_registers:
+                raise ValidationFailedError(
+                    {"history_registers": "invalid_history_registers"},
+                    error_placeholders={"invalid_registers": _format_register_list(invalid_registers)},
+                )
+            if history_registers:
+                options[HISTORY_REGISTERS] = history_registers
+            else:
+                options.pop(HISTORY_REGISTERS, None)
+
+            history_hours = user_input.get("history_hours")
+            if history_hours is not None:
+                options[HISTORY_HOURS] = history_hours
+            else:
+                options.pop(HISTORY_HOURS, None)
+
             return self._save_selected_inverter_options(options)
 
         schema_parts: dict[Any, Any] = {}
@@ -215,6 +261,9 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
         schema_parts[vol.Required("round_sensor_values", default=options.get(ROUND_SENSOR_VALUES, False))] = selector(
             {"boolean": {}}
         )
+        schema_parts[
+            vol.Optional("round_sensor_window", description={"suggested_value": options.get(ROUND_SENSOR_WINDOW)})
+        ] = vol.Any(None, vol.All(int, vol.Range(min=1, max=60)))
         schema_parts[
             vol.Optional(
                 "poll_rate",
@@ -224,6 +273,23 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
         schema_parts[vol.Optional("max_read", description={"suggested_value": options.get(MAX_READ)})] = vol.Any(
             None, vol.All(int, vol.Range(min=1))
         )
+        # Only TCP connections can be pooled, see ModbusClient
+        if combined_config_options[MODBUS_TYPE] in [TCP, RTU_OVER_TCP]:
+            schema_parts[
+                vol.Optional("max_connections", description={"suggested_value": options.get(MAX_CONNECTIONS)})
+            ] = vol.Any(None, vol.All(int, vol.Range(min=1, max=4)))
+        history_registers = options.get(HISTORY_REGISTERS)
+        schema_parts[
+            vol.Optional(
+                "history_registers",
+                description={
+                    "suggested_value": _format_register_list(history_registers) if history_registers else None
+                },
+            )
+        ] = vol.Any(None, str)
+        schema_parts[vol.Optional("history_hours", description={"suggested_value": options.get(HISTORY_HOURS)})] = (
+            vol.Any(None, vol.All(int, vol.Range(min=1, max=168)))
+        )
 
         schema = vol.Schema(schema_parts)
 
@@ -233,6 +299,9 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
             "inverter": self._create_label_for_inverter(combined_config_options),
             "default_poll_rate": f"{inverter_config[POLL_RATE]}",
             "default_max_read": f"{inverter_config[MAX_READ]}",
+            "default_round_sensor_window": f"{DEFAULT_WINDOW}",
+            "default_history_hours": f"{DEFAULT_HISTORY_HOURS}",
+            "max_history_registers": f"{MAX_HISTORY_REGISTERS}",
         }
 
         return await self.with_default_form(
@@ -243,6 +312,76 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
             description_placeholders=description_placeholders,
         )
 
+    async def async_step_select_publish_filter_class(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Let the user pick which class of entity to configure the publish filter for"""
+
+        async def body(user_input: dict[str, Any]) -> ConfigFlowResult:
+            self._selected_entity_class = user_input["entity_class"]
+            return await self.async_step_publish_filter()
+
+        schema = vol.Schema(
+            {
+                vol.Required("entity_class"): selector(
+                    {
+                        "select": {
+                            "options": ENTITY_CLASSES,
+                            "translation_key": "publish_filter_entity_classes",
+                        }
+                    }
+                )
+            }
+        )
+
+        return await self.with_default_form(body, user_input, "select_publish_filter_class", schema)
+
+    async def async_step_publish_filter(self, user_input: dict[str, Any] | None = None) -> ConfigFlowResult:
+        """Let the user configure the publish filter for the selected class of entity"""
+
+        assert self._selected_inverter_id is not None
+        assert self._selected_entity_class is not None
+
+        _, options, combined_config_options = self._config_for_inverter(self._selected_inverter_id)
+        publish_filters = options.get(PUBLISH_FILTERS, {})
+        settings = publish_filters.get(self._selected_entity_class, {})
+
+        async def body(user_input: dict[str, Any]) -> ConfigFlowResult:
+            assert self._selected_entity_class is not None
+            new_settings = {key: user_input[key] for key in FILTER_SETTINGS if user_input.get(key) is not None}
+            if new_settings:
+                publish_filters[self._selected_entity_class] = new_settings
+            else:
+                publish_filters.pop(self._selected_entity_class, None)
+
+            if publish_filters:
+                options[PUBLISH_FILTERS] = publish_filters
+            else:
+                options.pop(PUBLISH_FILTERS, None)
+
+            return self._save_selected_inverter_options(options)
+
+        schema_parts: dict[Any, Any] = {}
+        for key in FILTER_SETTINGS:
+            schema_parts[vol.Optional(key, description={"suggested_value": settings.get(key)})] = vol.Any(
+                None, vol.All(vol.Coerce(float), vol.Range(min=0))
+            )
+
+        schema = vol.Schema(schema_parts)
+
+        description_placeholders = {
+            "inverter": self._create_label_for_inverter(combined_config_options),
+            "entity_class": self._selected_entity_class,
+        }
+
+        return await self.with_default_form(
+            body,
+            user_input,
+            "publish_filter",
+            schema,
+            description_placeholders=description_placeholders,
+        )
+
     def _save_selected_inverter_options(self, inverter_options: dict[str, Any]) -> ConfigFlowResult:
         # We must not mutate any part of self._config.options, otherwise HA thinks we haven't changed the options
         options = copy.deepcopy(dict(self._config.options))
@@ -269,3 +408,38 @@ class OptionsHandler(FlowHandlerMixin, config_entries.OptionsFlow):
             result[inverter_id] = combined
 
         return result
+
+
+def _parse_register_list(text: str | None) -> list[int]:
+    """Parses a list of register addresses such as "31000, 31002-31005" (ranges are inclusive)"""
+    addresses: set[int] = set()
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, sep, end = part.partition("-")
+            first = int(start)
+            last = int(end) if sep else first
+        except ValueError:
+            raise ValidationFailedError({"history_registers": "invalid_register_list"}) from None
+        if not (0 <= first <= last <= 0xFFFF):
+            raise ValidationFailedError({"history_registers": "invalid_register_list"})
+        # Check the size of the range before expanding it, so that e.g. "0-65535" doesn't build a huge set
+        if last - first + 1 > MAX_HISTORY_REGISTERS:
+            raise ValidationFailedError({"history_registers": "too_many_history_registers"})
+        addresses.update(range(first, last + 1))
+        if len(addresses) > MAX_HISTORY_REGISTERS:
+            raise ValidationFailedError({"history_registers": "too_many_history_registers"})
+    return sorted(addresses)
+
+
+def _format_register_list(addresses: list[int]) -> str:
+    """The reverse of _parse_register_list, collapsing runs of consecutive addresses into ranges"""
+    runs: list[list[int]] = []
+    for address in addresses:
+        if runs and address == runs[-1][1] + 1:
+            runs[-1][1] = address
+        else:
+            runs.append([address, address])
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in runs)
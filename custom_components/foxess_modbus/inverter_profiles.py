@@ -20,12 +20,17 @@ from .const import INVERTER_CONN
 from .const import INVERTER_VERSION
 from .entities.charge_period_descriptions import CHARGE_PERIODS
 from .entities.entity_descriptions import ENTITIES
+from .entities.entity_factory import EntityFactory
 from .entities.modbus_charge_period_config import ModbusChargePeriodInfo
 from .entities.modbus_remote_control_config import ModbusRemoteControlAddressConfig
 from .entities.remote_control_description import REMOTE_CONTROL_DESCRIPTION
 
 _LOGGER = logging.getLogger(__package__)
 
+_ENTITIES_BY_TYPE: dict[type[Entity], list[EntityFactory]] = {}
+for _entity_factory in ENTITIES:
+    _ENTITIES_BY_TYPE.setdefault(_entity_factory.entity_type, []).append(_entity_factory)
+
 
 @functools.total_ordering
 class Version:
@@ -151,11 +156,21 @@ class InverterModelConnectionTypeProfile:
 
         assert None in versions
 
+        # Version from config -> Inv, filled in as versions are seen
+        self._inv_for_version_str: dict[str | None, Inv] = {}
+        # (Inv, entity type, filter_depends_on_other_entites) -> the entity factories which support that Inv, filled in
+        # the first time that entities are created for that key. Whether a factory supports an Inv doesn't depend on
+        # the controller, so any further controllers for the same inverter only look at the factories they'll use.
+        self._entity_index: dict[tuple[Inv, type[Entity], bool | None], list[EntityFactory]] = {}
+
     def _get_inv(self, controller: EntityController) -> Inv:
         version_from_config = controller.inverter_details.get(INVERTER_VERSION)
 
-        inverter_version = Version.parse(version_from_config) if version_from_config is not None else None
-        return self.get_inv_for_version(inverter_version)
+        inv = self._inv_for_version_str.get(version_from_config)
+        if inv is None:
+            inverter_version = Version.parse(version_from_config) if version_from_config is not None else None
+            inv = self._inv_for_version_str[version_from_config] = self.get_inv_for_version(inverter_version)
+        return inv
 
     def get_inv_for_version(self, version: Version | None) -> Inv:
         # Used for pytests
@@ -186,22 +201,30 @@ class InverterModelConnectionTypeProfile:
     ) -> list[Entity]:
         """Create all of the entities of the given type which support this inverter/connection combination"""
 
-        result = []
-
-        for entity_factory in ENTITIES:
-            if (
-                filter_depends_on_other_entites is not None
-                and filter_depends_on_other_entites != entity_factory.depends_on_other_entities
-            ):
-                continue
-            if entity_factory.entity_type != entity_type:
-                continue
+        inv = self._get_inv(controller)
+        key = (inv, entity_type, filter_depends_on_other_entites)
+        entity_factories = self._entity_index.get(key)
+        if entity_factories is None:
+            entity_factories = [
+                x
+                for x in _ENTITIES_BY_TYPE.get(entity_type, [])
+                if filter_depends_on_other_entites is None
+                or filter_depends_on_other_entites == x.depends_on_other_entities
+            ]
+            index_entry: list[EntityFactory] | None = []
+        else:
+            index_entry = None
 
-            entity = entity_factory.create_entity_if_supported(
-                controller, self._get_inv(controller), self.register_type
-            )
+        result = []
+        for entity_factory in entity_factories:
+            entity = entity_factory.create_entity_if_supported(controller, inv, self.register_type)
             if entity is not None:
                 result.append(entity)
+                if index_entry is not None:
+                    index_entry.append(entity_factory)
+
+        if index_entry is not None:
+            self._entity_index[key] = index_entry
 
         return result
 
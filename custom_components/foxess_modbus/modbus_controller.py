@@ -1,45 +1,66 @@
 """Modbus controller"""
 
+import asyncio
 import logging
+import math
 import re
 import threading
 import time
+from collections import Counter
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from datetime import timedelta
 from enum import Enum
+from pathlib import Path
 from typing import Any
+from typing import Callable
 from typing import Iterable
 from typing import Iterator
+from typing import Mapping
+from typing import cast
 
 from homeassistant.components.logbook import async_log_entry
+from homeassistant.core import CALLBACK_TYPE
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import issue_registry
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.issue_registry import IssueSeverity
 
 from .client.modbus_client import ModbusClient
 from .client.modbus_client import ModbusClientFailedError
+from .common.bulk_decoder import BulkDecoder
 from .common.entity_controller import EntityController
 from .common.entity_controller import EntityRemoteControlManager
 from .common.entity_controller import ModbusControllerEntity
 from .common.exceptions import AutoconnectFailedError
 from .common.exceptions import UnsupportedInverterError
+from .common.register_decoder import RegisterDecoder
+from .common.register_decoder import register_decoder
+from .common.register_history import RegisterHistory
+from .common.register_scanner import ScanResult
+from .common.register_scanner import scan_register_range
+from .common.stats import Histogram
+from .common.stats import PollStats
+from .common.stats import TransactionStats
 from .common.types import RegisterPollType
 from .common.types import RegisterType
 from .common.unload_controller import UnloadController
+from .const import DEFAULT_HISTORY_HOURS
 from .const import DOMAIN
 from .const import ENTITY_ID_PREFIX
 from .const import FRIENDLY_NAME
+from .const import HISTORY_HOURS
+from .const import HISTORY_REGISTERS
 from .const import INVERTER_MODEL
+from .const import MAX_HISTORY_REGISTERS
 from .const import MAX_READ
+from .const import UDP
 from .inverter_profiles import INVERTER_PROFILES
 from .inverter_profiles import InverterModelConnectionTypeProfile
 from .remote_control_manager import RemoteControlManager
-from .vendor.pymodbus import ConnectionException
-from .vendor.pymodbus import ExceptionResponse
-from .vendor.pymodbus import ModbusExceptions
+from .vendor import pymodbus
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -54,15 +75,62 @@ _UINT16_MAX = 65535
 
 _INVERTER_WRITE_DELAY_SECS = 5
 
+# The most registers which a single FC16 (write multiple registers) request can write
+_MAX_WRITE = 123
+
+# The most registers which register subscriptions can add to the polls between them, on top of the ones which entities
+# and the history already poll
+_MAX_SUBSCRIBED_REGISTERS = 100
+
 
 @dataclass
 class RegisterValue:
     poll_type: RegisterPollType
     read_value: int | None = None
+    read_at: float | None = None  # From time.monotonic()
     written_value: int | None = None
     written_at: float | None = None  # From time.monotonic()
 
 
+class RegisterSubscription:
+    """A subscriber to the values of a set of registers, see ModbusController.subscribe_registers"""
+
+    def __init__(
+        self,
+        addresses: Iterable[int],
+        callback: Callable[[dict[int, int | None]], None],
+        on_cancel: Callable[[], None] | None = None,
+    ) -> None:
+        self.addresses: tuple[int, ...] = tuple(sorted(set(addresses)))
+        self.callback = callback
+        self.on_cancel = on_cancel
+        # The values which the subscriber has been sent. Addresses are missing until their first value is sent
+        self._sent: dict[int, int | None] = {}
+
+    def send_changes(self, registers: Mapping[int, int]) -> None:
+        """Send the subscriber any of its registers which have changed since last time"""
+        sent = self._sent
+        changes: dict[int, int | None] = {}
+        for address in self.addresses:
+            value = registers.get(address)
+            if address not in sent or sent[address] != value:
+                sent[address] = changes[address] = value
+        if changes:
+            self.callback(changes)
+
+
+@dataclass
+class WriteGroupResult:
+    """The outcome of writing one group of registers, see ModbusController.write_register_groups"""
+
+    start_address: int
+    values: list[int]
+    # None if the group was written, otherwise why not
+    error: str | None = None
+    # True if the group wasn't attempted, because an earlier group failed
+    skipped: bool = False
+
+
 class ConnectionState(Enum):
     INITIAL = 0
     DISCONNECTED = 1
@@ -96,10 +164,30 @@ class InvalidRegisterRanges:
     def __contains__(self, item: int) -> bool:
         return any(item >= x.start and item < x.start + x.count for x in self._ranges)
 
+    def as_list(self) -> list[dict[str, int]]:
+        return [{"start": x.start, "count": x.count} for x in self._ranges]
+
     def __str__(self) -> str:
         return ", ".join(f"[{x.start, x.count}]" for x in self._ranges)
 
 
+def _to_register_value(value: int) -> int:
+    value = int(value)  # Ensure that we've been given an int
+    if not (_INT16_MIN <= value <= _UINT16_MAX):
+        raise ValueError(f"Value {value} must be between {_INT16_MIN} and {_UINT16_MAX}")
+    # pymodbus doesn't like negative values
+    if value < 0:
+        value = _UINT16_MAX + value + 1
+    return value
+
+
+def _is_illegal_address(ex: ModbusClientFailedError) -> bool:
+    return (
+        isinstance(ex.response, pymodbus.ExceptionResponse)
+        and ex.response.exception_code == pymodbus.ModbusExceptions.IllegalAddress
+    )
+
+
 @contextmanager
 def _acquire_nonblocking(lock: threading.Lock) -> Iterator[bool]:
     locked = lock.acquire(False)
@@ -122,11 +210,23 @@ class ModbusController(EntityController, UnloadController):
         slave: int,
         poll_rate: int,
         max_read: int,
+        *,
+        use_numpy: bool = True,
     ) -> None:
         """Init"""
         self._hass = hass
         self._update_listeners: set[ModbusControllerEntity] = set()
+        # _update_listeners in the order to notify them in, see _notify_update. Rebuilt when entities change
+        self._ordered_listeners: list[ModbusControllerEntity] | None = None
+        self._entities_by_key: dict[str, ModbusControllerEntity] = {}
         self._data: dict[int, RegisterValue] = {}
+        # Cache of register_values(), cleared whenever _data changes
+        self._register_values: dict[int, int] | None = None
+        self._register_values_expire_at = math.inf
+        # Works out which entities need to be told about each update, see _notify_update. Rebuilt when entities change
+        self._bulk_decoder: BulkDecoder | None = None
+        self._bulk_decoded_listeners: list[ModbusControllerEntity] = []
+        self._use_numpy = use_numpy
         self._client = client
         self._connection_type_profile = connection_type_profile
         self._inverter_details = inverter_details
@@ -140,11 +240,44 @@ class ModbusController(EntityController, UnloadController):
         self._current_connection_error: str | None = None
         # Any ranges of registers which we've detected that we can't read
         self._detected_invalid_ranges = InvalidRegisterRanges()
+        # Registers which we've found we can't read, but which we only polled because a subscriber asked for them. These
+        # aren't our problem, so don't count as detected invalid ranges. Forgotten when the subscribers go
+        self._rejected_subscribed_addresses: set[int] = set()
+        self._poll_stats = PollStats()
+        self._last_poll_time: float | None = None
+        # Number of transactions made by the current poll
+        self._poll_transactions = 0
+        # Round-trip time of each (start_address, num_registers) read we've made
+        self._range_latency_ms: dict[tuple[int, int], Histogram] = {}
 
         self._inverter_capacity = connection_type_profile.inverter_model_profile.inverter_capacity(
             self.inverter_details[INVERTER_MODEL]
         )
 
+        # Recent values of the registers the user asked us to keep a history of, served by the get_history websocket
+        # command. These registers are polled whether or not any entity uses them
+        self._history: RegisterHistory | None = None
+        history_addresses: list[int] = []
+        for address in inverter_details.get(HISTORY_REGISTERS, []):
+            if connection_type_profile.overlaps_invalid_range(address, address):
+                _LOGGER.warning("Not keeping a history of register %s, as it can't be read on this inverter", address)
+                continue
+            if len(history_addresses) == MAX_HISTORY_REGISTERS:
+                _LOGGER.warning("Only keeping a history of the first %s registers", MAX_HISTORY_REGISTERS)
+                break
+            history_addresses.append(address)
+            self._data.setdefault(address, RegisterValue(poll_type=RegisterPollType.PERIODICALLY))
+        if history_addresses:
+            history_hours = inverter_details.get(HISTORY_HOURS, DEFAULT_HISTORY_HOURS)
+            self._history = RegisterHistory(history_addresses, capacity=max(history_hours * 3600 // poll_rate, 1))
+
+        self._register_subscriptions: list[RegisterSubscription] = []
+        # Number of subscriptions to each address. These addresses are polled whether or not any entity uses them
+        self._subscribed_addresses: Counter[int] = Counter()
+
+        # Stops the capture started by start_capture once its duration is up
+        self._cancel_capture_timer: CALLBACK_TYPE | None = None
+
         # Setup mixins
         EntityController.__init__(self)
         UnloadController.__init__(self)
@@ -169,6 +302,8 @@ class ModbusController(EntityController, UnloadController):
                 timedelta(seconds=self._poll_rate),
             )
         )
+        self._unload_listeners.append(self._cancel_capture)
+        self._unload_listeners.append(self._cancel_register_subscriptions)
 
     @property
     def hass(self) -> HomeAssistant:
@@ -195,48 +330,257 @@ class ModbusController(EntityController, UnloadController):
     def inverter_details(self) -> dict[str, Any]:
         return self._inverter_details
 
+    @property
+    def poll_stats(self) -> PollStats:
+        return self._poll_stats
+
+    @property
+    def transaction_stats(self) -> TransactionStats:
+        return self._client.stats
+
+    @property
+    def last_poll_time(self) -> float | None:
+        return self._last_poll_time
+
+    @property
+    def history(self) -> RegisterHistory | None:
+        """The recent values of the registers configured in HISTORY_REGISTERS, if any"""
+        return self._history
+
     def read(self, address: int | list[int], *, signed: bool) -> int | None:
+        registers = self.register_values()
+        if isinstance(address, int):
+            value = registers.get(address)
+            if value is None:
+                return None
+            return register_decoder(1, signed)((value,))
+
+        try:
+            values = [registers[x] for x in address]
+        except KeyError:
+            return None
+        return register_decoder(len(values), signed)(values)
+
+    def register_values(self) -> Mapping[int, int]:
         # There can be a delay between writing a register, and actually reading that value back (presumably the delay
         # is on the inverter somewhere). If we've recently written a value, use that value, rather than the latest-read
-        # value
+        # value.
+        # This is built once and shared by every entity until either the register store changes or a written value
+        # expires, so that decoding all of the entities after a poll doesn't have to look at each register many times
         now = time.monotonic()
+        if self._register_values is None or now >= self._register_values_expire_at:
+            registers: dict[int, int] = {}
+            expire_at = math.inf
+            for address, register_value in self._data.items():
+                if (
+                    register_value.written_value is not None
+                    and register_value.written_at is not None
+                    and now - register_value.written_at < _INVERTER_WRITE_DELAY_SECS
+                ):
+                    registers[address] = register_value.written_value
+                    expire_at = min(expire_at, register_value.written_at + _INVERTER_WRITE_DELAY_SECS)
+                elif register_value.read_value is not None:
+                    registers[address] = register_value.read_value
+            self._register_values = registers
+            self._register_values_expire_at = expire_at
+        return self._register_values
+
+    def subscribe_registers(
+        self,
+        addresses: Iterable[int],
+        callback: Callable[[dict[int, int | None]], None],
+        on_cancel: Callable[[], None] | None = None,
+    ) -> Callable[[], None]:
+        """
+        Call callback with the values of the given registers ({address: value}, None if a register doesn't have a
+        value) whenever any of them change, starting with all of their values after the next poll. Values come from
+        our polls (and writes), so this doesn't cause any extra Modbus transactions, although any registers which we
+        don't already poll are polled periodically for as long as they have subscribers.
+
+        If the controller is unloaded, the subscription ends and on_cancel is called.
 
-        def _read_value(address: int) -> int | None:
+        Raises ValueError if any of the addresses can't be read on this inverter, or if the subscriptions between
+        them would add more than _MAX_SUBSCRIBED_REGISTERS registers to the polls. Returns a function which
+        unsubscribes. This can safely be called more than once, and after the subscription has been cancelled.
+        """
+        subscription = RegisterSubscription(addresses, callback, on_cancel)
+        invalid = [x for x in subscription.addresses if self._connection_type_profile.overlaps_invalid_range(x, x)]
+        if invalid:
+            raise ValueError(f"Registers {invalid} can't be read on this inverter")
+        polled_addresses = self._polled_addresses()
+        added_addresses = {
+            x for x in [*self._subscribed_addresses, *subscription.addresses] if x not in polled_addresses
+        }
+        if len(added_addresses) > _MAX_SUBSCRIBED_REGISTERS:
+            raise ValueError(
+                f"Subscriptions can add at most {_MAX_SUBSCRIBED_REGISTERS} registers which aren't otherwise polled"
+            )
+
+        for address in subscription.addresses:
+            self._subscribed_addresses[address] += 1
             register_value = self._data.get(address)
             if register_value is None:
-                return None
+                self._data[address] = RegisterValue(poll_type=RegisterPollType.PERIODICALLY)
+                self._register_values = None
+            else:
+                register_value.poll_type = RegisterPollType.PERIODICALLY
+        self._register_subscriptions.append(subscription)
+
+        def _unsubscribe() -> None:
+            if subscription in self._register_subscriptions:
+                self._remove_register_subscription(subscription)
+
+        return _unsubscribe
+
+    def _remove_register_subscription(self, subscription: RegisterSubscription) -> None:
+        self._register_subscriptions.remove(subscription)
+        self._subscribed_addresses.subtract(subscription.addresses)
+        self._subscribed_addresses = +self._subscribed_addresses
+        self._remove_unused_addresses(subscription.addresses)
+        if self._subscribed_addresses:
+            self._rejected_subscribed_addresses.difference_update(subscription.addresses)
+        else:
+            self._rejected_subscribed_addresses.clear()
 
-            value: int | None
+        # Registers which are still polled because an entity uses them go back to being polled as that entity wants
+        for address in subscription.addresses:
+            register_value = self._data.get(address)
             if (
-                register_value.written_value is not None
-                and register_value.written_at is not None
-                and now - register_value.written_at < _INVERTER_WRITE_DELAY_SECS
+                register_value is None
+                or address in self._subscribed_addresses
+                or (self._history is not None and address in self._history.addresses)
             ):
-                value = register_value.written_value
-            else:
-                value = register_value.read_value
+                continue
+            poll_types = [x.register_poll_type for x in self._update_listeners if address in x.addresses]
+            if poll_types:
+                register_value.poll_type = max(poll_types)
+
+    def _cancel_register_subscriptions(self) -> None:
+        for subscription in list(self._register_subscriptions):
+            self._remove_register_subscription(subscription)
+            if subscription.on_cancel is not None:
+                subscription.on_cancel()
+
+    async def read_registers(
+        self, addresses: Iterable[int], register_type: RegisterType, *, max_age: float | None = None
+    ) -> dict[int, int | None]:
+        """
+        Read the given registers, used by the read_registers_service. The reads are planned in the same way as polls:
+        split into reads of at most max_read registers, which (for the inverter's own register type) don't cross the
+        invalid ranges.
 
-            return value
+        :param max_age: If given, registers which we poll and have read within this many seconds are taken from our
+            register store rather than read again
+        :returns: {address: value}. The value is None for registers which can't be read
+        """
+        requested_set = set(addresses)
+        requested = sorted(requested_set)
+        values: dict[int, int | None] = {}
+        # The invalid ranges, individual reads and register store only apply to the register type which the inverter
+        # uses
+        special_registers = register_type == self._connection_type_profile.register_type
+        if special_registers:
+            if max_age is not None:
+                now = time.monotonic()
+                registers = self.register_values()
+                for address in requested:
+                    register_value = self._data.get(address)
+                    if (
+                        register_value is not None
+                        and register_value.read_at is not None
+                        and now - register_value.read_at <= max_age
+                    ):
+                        values[address] = registers.get(address)
+            to_read = [
+                x
+                for x in requested
+                if x not in values
+                and x not in self._detected_invalid_ranges
+                and not self._connection_type_profile.overlaps_invalid_range(x, x)
+            ]
+        else:
+            to_read = requested
 
-        if isinstance(address, int):
-            address = [address]
+        for start_address, num_reads in self._plan_reads(to_read, self._max_read, special_registers=special_registers):
+            try:
+                reads = await self._client.read_registers(start_address, num_reads, register_type, self._slave)
+            except ModbusClientFailedError as ex:
+                if not _is_illegal_address(ex):
+                    raise
+                # Find out which of the registers the inverter wasn't happy with. The read can bridge gaps between
+                # the registers which were asked for, and those don't matter
+                for address in range(start_address, start_address + num_reads):
+                    if address not in requested_set:
+                        continue
+                    try:
+                        single_read = await self._client.read_registers(address, 1, register_type, self._slave)
+                    except ModbusClientFailedError as ex:
+                        if not _is_illegal_address(ex):
+                            raise
+                        values[address] = None
+                    else:
+                        values[address] = single_read[0]
+                continue
+            for i, value in enumerate(reads):
+                values[start_address + i] = value
+
+        # Reads can span registers which weren't asked for
+        return {x: values.get(x) for x in requested}
 
-        value = 0
-        for i, a in enumerate(address):
-            val = _read_value(a)
-            if val is None:
+    async def scan_registers(
+        self,
+        start_address: int,
+        end_address: int,
+        register_type: RegisterType,
+        *,
+        max_block: int | None = None,
+        confirm_invalid: bool = False,
+    ) -> ScanResult:
+        """
+        Find out which registers between start_address and end_address (inclusive) can be read, used by the
+        scan_registers service. Blocks are at most max_block registers (by default, max_read), and reads are spread
+        over all of the client's connections
+        """
+
+        async def _read(address: int, num_registers: int) -> list[int] | None:
+            try:
+                return await self._client.read_registers(address, num_registers, register_type, self._slave)
+            except ModbusClientFailedError as ex:
+                if not _is_illegal_address(ex):
+                    raise
                 return None
-            value |= (val & 0xFFFF) << (i * 16)
 
-        if signed:
-            sign_bit = 1 << (len(address) * 16 - 1)
-            value = (value & (sign_bit - 1)) - (value & sign_bit)
+        return await scan_register_range(
+            _read,
+            start_address,
+            end_address,
+            max_block=max_block if max_block is not None else self._max_read,
+            concurrency=self._client.max_connections,
+            confirm_invalid=confirm_invalid,
+        )
 
-        return value
+    async def start_capture(self, path: Path, duration: timedelta) -> None:
+        """
+        Capture all traffic on this inverter's connection for the given duration, used by the capture_traffic service.
+        This replaces any capture in progress.
+        """
+        self._cancel_capture()
+        await self._client.start_capture(path)
 
-    async def read_registers(self, start_address: int, num_registers: int, register_type: RegisterType) -> list[int]:
-        """Read one of more registers, used by the read_registers_service"""
-        return await self._client.read_registers(start_address, num_registers, register_type, self._slave)
+        async def _stop(_now: datetime) -> None:
+            self._cancel_capture_timer = None
+            await self._client.stop_capture()
+
+        self._cancel_capture_timer = async_call_later(self._hass, duration, _stop)
+
+    async def stop_capture(self) -> None:
+        self._cancel_capture()
+        await self._client.stop_capture()
+
+    def _cancel_capture(self) -> None:
+        if self._cancel_capture_timer is not None:
+            self._cancel_capture_timer()
+            self._cancel_capture_timer = None
 
     async def write_register(self, address: int, value: int) -> None:
         await self.write_registers(address, [value])
@@ -252,25 +596,11 @@ class ModbusController(EntityController, UnloadController):
         )
         try:
             for i, value in enumerate(values):
-                value = int(value)  # Ensure that we've been given an int
-                if not (_INT16_MIN <= value <= _UINT16_MAX):
-                    raise ValueError(f"Value {value} must be between {_INT16_MIN} and {_UINT16_MAX}")
-                # pymodbus doesn't like negative values
-                if value < 0:
-                    value = _UINT16_MAX + value + 1
-                values[i] = value
+                values[i] = _to_register_value(value)
 
             await self._client.write_registers(start_address, values, self._slave)
 
-            changed_addresses = set()
-            for i, value in enumerate(values):
-                address = start_address + i
-                # Only store the result of the write if it's a register we care about ourselves
-                register_value = self._data.get(address)
-                if register_value is not None:
-                    register_value.written_value = value
-                    register_value.written_at = time.monotonic()
-                    changed_addresses.add(address)
+            changed_addresses = self._record_write(start_address, values)
             if len(changed_addresses) > 0:
                 self._notify_update(changed_addresses)
         except Exception as ex:
@@ -278,6 +608,63 @@ class ModbusController(EntityController, UnloadController):
             _LOGGER.exception("Failed to write registers")
             raise ex
 
+    async def write_register_groups(self, writes: Iterable[tuple[int, list[int]]]) -> list[WriteGroupResult]:
+        """
+        Write a set of (start address, values), used by the write_registers_batch service. Writes to adjacent addresses
+        are merged, so that they're made in as few transactions as possible, and the resulting groups are written in
+        address order, back-to-back, without letting any other transactions (e.g. polls) in between, even on other
+        pooled connections. Groups of a single register are written with Write Single Register (function code 6)
+        rather than Write Multiple Registers (16). If one group fails the rest aren't attempted. Modbus has no way of
+        undoing the groups which were already written.
+
+        Raises ValueError if any address is written more than once, or any value is out of range.
+        """
+        values_by_address: dict[int, int] = {}
+        for start_address, values in writes:
+            for i, value in enumerate(values):
+                address = start_address + i
+                if address in values_by_address:
+                    raise ValueError(f"Register {address} is written more than once")
+                values_by_address[address] = _to_register_value(value)
+
+        groups: list[tuple[int, list[int]]] = []
+        for address, value in sorted(values_by_address.items()):
+            if groups and address == groups[-1][0] + len(groups[-1][1]) and len(groups[-1][1]) < _MAX_WRITE:
+                groups[-1][1].append(value)
+            else:
+                groups.append((address, [value]))
+
+        _LOGGER.debug("Writing register groups for %s %s: %s", self._client, self._slave, groups)
+        errors = await self._client.write_register_groups(groups, self._slave)
+
+        results: list[WriteGroupResult] = []
+        changed_addresses: set[int] = set()
+        for i, (start_address, values) in enumerate(groups):
+            if i >= len(errors):
+                results.append(WriteGroupResult(start_address, values, skipped=True))
+            elif errors[i] is not None:
+                _LOGGER.warning("Failed to write registers (%s, %s): %s", start_address, values, errors[i])
+                results.append(WriteGroupResult(start_address, values, error=str(errors[i])))
+            else:
+                results.append(WriteGroupResult(start_address, values))
+                changed_addresses.update(self._record_write(start_address, values))
+        if changed_addresses:
+            self._notify_update(changed_addresses)
+        return results
+
+    def _record_write(self, start_address: int, values: list[int]) -> set[int]:
+        """Record values which we've written, returning the addresses which we care about"""
+        changed_addresses = set()
+        for i, value in enumerate(values):
+            address = start_address + i
+            # Only store the result of the write if it's a register we care about ourselves
+            register_value = self._data.get(address)
+            if register_value is not None:
+                register_value.written_value = value
+                register_value.written_at = time.monotonic()
+                changed_addresses.add(address)
+        return changed_addresses
+
     async def _refresh(self, _time: datetime) -> None:
         """Refresh modbus data"""
         # Make sure that we don't do two refreshes at the same time, if one is too slow
@@ -290,11 +677,22 @@ class ModbusController(EntityController, UnloadController):
                     self._slave,
                     self._poll_rate,
                 )
+                self._poll_stats.skipped_polls += 1
                 return
 
             exception: Exception | None = None
             try:
-                read_values = await self._read_all_registers()
+                start = time.perf_counter()
+                read_ranges = list(
+                    self._create_read_ranges(
+                        self._max_read, is_initial_connection=self._connection_state != ConnectionState.CONNECTED
+                    )
+                )
+                planned = time.perf_counter()
+                self._poll_transactions = 0
+                read_values = await self._read_all_registers(read_ranges)
+                read = time.perf_counter()
+                self._last_poll_time = time.monotonic()
 
                 # If we made it to here, then all reads succeeded. Write them to _data and notify the sensors.
                 # This avoids recording reads if poll failed partway through (ensuring that we don't record potentially
@@ -307,7 +705,17 @@ class ModbusController(EntityController, UnloadController):
                         register_value = self._data.get(address)
                         if register_value is not None:
                             register_value.read_value = value
+                            register_value.read_at = self._last_poll_time
                             changed_addresses.add(address)
+                decoded = time.perf_counter()
+
+                # Record this before notifying the sensors, so that the stats sensors show this poll
+                self._poll_stats.record_poll(
+                    self._poll_transactions,
+                    plan=(planned - start) * 1000,
+                    io=(read - planned) * 1000,
+                    decode=(decoded - read) * 1000,
+                )
 
                 _LOGGER.debug(
                     "Refresh of %s %s complete - notifying sensors: %s",
@@ -316,7 +724,10 @@ class ModbusController(EntityController, UnloadController):
                     changed_addresses,
                 )
                 self._notify_update(changed_addresses)
-            except ConnectionException as ex:
+                self._poll_stats.record_notify((time.perf_counter() - decoded) * 1000)
+                if self._history is not None:
+                    self._history.record(time.time(), self.register_values())
+            except pymodbus.ConnectionException as ex:
                 exception = ex
                 _LOGGER.debug(
                     "Failed to connect to %s %s: %s",
@@ -342,6 +753,9 @@ class ModbusController(EntityController, UnloadController):
                     exc_info=True,
                 )
 
+            if exception is not None:
+                self._poll_stats.failed_polls += 1
+
             # Do this after recording new values in _data. That way the sensors show the new values when they
             # become available after a disconnection
             if exception is None:
@@ -440,20 +854,32 @@ class ModbusController(EntityController, UnloadController):
         # The problem as a whole looks like it's NP-hard (although I can't find a name for it).
         # We're therefore going to use a fairly simple algorithm which just makes each read as large as it can be.
 
-        start_address: int | None = None
-        read_size = 0
         # TODO: Do we want to cache the result of this?
-        for address, register_value in sorted(self._data.items()):
-            if register_value.poll_type == RegisterPollType.ON_CONNECTION and not is_initial_connection:
-                continue
+        # Skip registers which we've found that we can't read: don't try again.
+        addresses = (
+            address
+            for address, register_value in sorted(self._data.items())
+            if (register_value.poll_type != RegisterPollType.ON_CONNECTION or is_initial_connection)
+            and address not in self._detected_invalid_ranges
+            and address not in self._rejected_subscribed_addresses
+        )
+        return self._plan_reads(addresses, max_read)
 
-            # Have we found that we can't read this register? Don't try again.
-            if address in self._detected_invalid_ranges:
-                continue
+    def _plan_reads(
+        self, addresses: Iterable[int], max_read: int, *, special_registers: bool = True
+    ) -> Iterable[tuple[int, int]]:
+        """
+        Groups the given addresses (in ascending order) into reads, see _create_read_ranges. If special_registers is
+        False, the inverter's individual-read and invalid ranges are ignored (they're for a different register type)
 
+        :returns: Sequence of tuples of (start_address, num_registers_to_read)
+        """
+        start_address: int | None = None
+        read_size = 0
+        for address in addresses:
             # This register must be read in a single individual read. Yield any ranges we've found so far,
             # and yield just this register on its own
-            if self._connection_type_profile.is_individual_read(address):
+            if special_registers and self._connection_type_profile.is_individual_read(address):
                 if start_address is not None:
                     yield (start_address, read_size)
                     start_address, read_size = None, 0
@@ -465,7 +891,10 @@ class ModbusController(EntityController, UnloadController):
             # inside invalid ranges, tested in __init__). This also assumes that read_size != max_read here.
             elif address == start_address + 1 or (
                 address <= start_address + max_read - 1
-                and not self._connection_type_profile.overlaps_invalid_range(start_address, address - 1)
+                and not (
+                    special_registers
+                    and self._connection_type_profile.overlaps_invalid_range(start_address, address - 1)
+                )
             ):
                 # There's a previous read which we can extend
                 read_size = address - start_address + 1
@@ -483,80 +912,155 @@ class ModbusController(EntityController, UnloadController):
             yield (start_address, read_size)
 
     # List of (start address, [read values starting at that address])
-    async def _read_all_registers(self) -> list[tuple[int, Iterable[int | None]]]:
-        def _is_illegal_address(ex: ModbusClientFailedError) -> bool:
-            return (
-                isinstance(ex.response, ExceptionResponse)
-                and ex.response.exception_code == ModbusExceptions.IllegalAddress
+    async def _read_all_registers(self, read_ranges: list[tuple[int, int]]) -> list[tuple[int, Iterable[int | None]]]:
+        if self._client.max_connections <= 1:
+            read_values: list[tuple[int, Iterable[int | None]]] = []
+            for start_address, num_reads in read_ranges:
+                read_values.extend(await self._read_range(start_address, num_reads))
+            return read_values
+
+        # The client has a pool of connections, so dispatch all of the reads at once and let the pool decide how many
+        # run in parallel. Wait for all of them to finish before raising any errors, so that a failed poll doesn't leave
+        # reads running in the background when the next poll starts.
+        results = await asyncio.gather(
+            *[self._read_range(start_address, num_reads) for start_address, num_reads in read_ranges],
+            return_exceptions=True,
+        )
+        read_values = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            read_values.extend(result)
+        return read_values
+
+    async def _read_range(self, start_address: int, num_reads: int) -> list[tuple[int, Iterable[int | None]]]:
+        _LOGGER.debug(
+            "Reading addresses on %s %s: (%s, %s)",
+            self._client,
+            self._slave,
+            start_address,
+            num_reads,
+        )
+        try:
+            reads = await self._timed_read(start_address, num_reads)
+            return [(start_address, reads)]
+        except ModbusClientFailedError as ex:
+            if not _is_illegal_address(ex):
+                raise
+
+            _LOGGER.debug(
+                "IllegalAddress when polling %s %s: %s. Trying each register individually...",
+                self._client,
+                self._slave,
+                ex.response,
             )
 
+        # Right, at least one of this range failed. Find out what it wasn't happy with, and read the others.
+        # If we're only reading this range because of a subscriber, the registers it's failing on might have nothing to
+        # do with us
+        polled_addresses = self._polled_addresses()
+        for_subscribers = any(
+            x in self._subscribed_addresses and x not in polled_addresses
+            for x in range(start_address, start_address + num_reads)
+        )
         read_values: list[tuple[int, Iterable[int | None]]] = []
+        for i in range(num_reads):
+            address = start_address + i
 
-        read_ranges = self._create_read_ranges(
-            self._max_read, is_initial_connection=self._connection_state != ConnectionState.CONNECTED
-        )
-        for start_address, num_reads in read_ranges:
             _LOGGER.debug(
-                "Reading addresses on %s %s: (%s, %s)",
+                "Reading single address on %s %s: (%s)",
                 self._client,
                 self._slave,
-                start_address,
-                num_reads,
+                address,
             )
             try:
-                reads = await self._client.read_registers(
-                    start_address,
-                    num_reads,
-                    self._connection_type_profile.register_type,
-                    self._slave,
-                )
-                read_values.append((start_address, reads))
-
+                read = await self._timed_read(address, 1)
+                assert len(read) == 1
+                read_values.append((address, read))
             except ModbusClientFailedError as ex:
                 if not _is_illegal_address(ex):
                     raise
 
-                _LOGGER.debug(
-                    "IllegalAddress when polling %s %s: %s. Trying each register individually...",
-                    self._client,
-                    self._slave,
-                    ex.response,
-                )
-
-                # Right, at least one of this range failed. Find out what it wasn't happy with, and read the others
-                for i in range(num_reads):
-                    address = start_address + i
-
+                if for_subscribers and address not in polled_addresses:
                     _LOGGER.debug(
-                        "Reading single address on %s %s: (%s)",
+                        "%s %s: register %s, which a subscriber asked for, is invalid",
                         self._client,
                         self._slave,
                         address,
                     )
-                    try:
-                        read = await self._client.read_registers(
-                            address, 1, self._connection_type_profile.register_type, self._slave
-                        )
-                        assert len(read) == 1
-                        read_values.append((address, read))
-                    except ModbusClientFailedError as ex:
-                        if not _is_illegal_address(ex):
-                            raise
-
-                        _LOGGER.warning(
-                            "%s %s: register %s is invalid",
-                            self._client,
-                            self._slave,
-                            address,
-                        )
-                        self._detected_invalid_ranges.add(address)
-                        # Record None at this address, so the sensor gets an 'Unavailable' value
-                        read_values.append((address, [None]))
+                    self._rejected_subscribed_addresses.add(address)
+                else:
+                    _LOGGER.warning(
+                        "%s %s: register %s is invalid",
+                        self._client,
+                        self._slave,
+                        address,
+                    )
+                    self._detected_invalid_ranges.add(address)
+                # Record None at this address, so the sensor gets an 'Unavailable' value
+                read_values.append((address, [None]))
 
         return read_values
 
+    async def _timed_read(self, start_address: int, num_reads: int) -> list[int]:
+        self._poll_transactions += 1
+        start = time.perf_counter()
+        reads = await self._client.read_registers(
+            start_address, num_reads, self._connection_type_profile.register_type, self._slave
+        )
+        histogram = self._range_latency_ms.get((start_address, num_reads))
+        if histogram is None:
+            histogram = self._range_latency_ms[(start_address, num_reads)] = Histogram()
+        histogram.record((time.perf_counter() - start) * 1000)
+        return reads
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Snapshot of how this controller polls the inverter, and how well that is going"""
+        return {
+            "inverter_model": self.inverter_details[INVERTER_MODEL],
+            "slave": self._slave,
+            "poll_rate": self._poll_rate,
+            "max_read": self._max_read,
+            "connection_state": self._connection_state.name,
+            "current_connection_error": self._current_connection_error,
+            "register_store_size": len(self._data),
+            "listener_count": len(self._update_listeners),
+            "register_subscription_count": len(self._register_subscriptions),
+            "read_plan": list(self._create_read_ranges(self._max_read, is_initial_connection=False)),
+            "initial_read_plan": list(self._create_read_ranges(self._max_read, is_initial_connection=True)),
+            "configured_invalid_ranges": [
+                {"start": start, "end": end}
+                for start, end in self._connection_type_profile.special_registers.invalid_register_ranges
+            ],
+            "detected_invalid_ranges": self._detected_invalid_ranges.as_list(),
+            "range_latency_ms": [
+                {"start": start, "count": count, **histogram.as_dict()}
+                for (start, count), histogram in sorted(self._range_latency_ms.items())
+            ],
+            "poll_stats": self._poll_stats.as_dict(),
+            "history": (
+                {
+                    "addresses": list(self._history.addresses),
+                    "capacity": self._history.capacity,
+                    "samples": len(self._history),
+                }
+                if self._history is not None
+                else None
+            ),
+            # Shared with any other inverters on the same connection
+            "client": {
+                "protocol": self._client.protocol,
+                "max_connections": self._client.max_connections,
+                "transaction_stats": self._client.stats.as_dict(),
+            },
+        }
+
     def register_modbus_entity(self, listener: ModbusControllerEntity) -> None:
         self._update_listeners.add(listener)
+        self._ordered_listeners = None
+        self._bulk_decoder = None
+        if listener.entity_key is not None:
+            self._entities_by_key[listener.entity_key] = listener
         for address in listener.addresses:
             assert not self._connection_type_profile.overlaps_invalid_range(address, address), (
                 f"Entity {listener} address {address} overlaps an invalid range in "
@@ -564,22 +1068,92 @@ class ModbusController(EntityController, UnloadController):
             )
             if address not in self._data:
                 self._data[address] = RegisterValue(poll_type=listener.register_poll_type)
+            elif address in self._subscribed_addresses or (
+                self._history is not None and address in self._history.addresses
+            ):
+                # Registers with a history or subscribers are always polled, which is fine whatever the entity wanted
+                pass
             else:
                 # We could handle this (removing gets harder), but it shouldn't happen in practice anyway
                 assert self._data[address].poll_type == listener.register_poll_type
 
     def remove_modbus_entity(self, listener: ModbusControllerEntity) -> None:
         self._update_listeners.discard(listener)
-        # If this was the only entity listening on this address, remove it from self._data
-        other_addresses = {address for entity in self._update_listeners for address in entity.addresses}
-        for address in listener.addresses:
-            if address not in other_addresses and address in self._data:
+        self._ordered_listeners = None
+        self._bulk_decoder = None
+        if listener.entity_key is not None and self._entities_by_key.get(listener.entity_key) is listener:
+            del self._entities_by_key[listener.entity_key]
+        self._remove_unused_addresses(listener.addresses)
+
+    def _polled_addresses(self) -> set[int]:
+        """The addresses which we poll for our entities and history, leaving aside subscribers"""
+        addresses = {address for entity in self._update_listeners for address in entity.addresses}
+        if self._history is not None:
+            addresses.update(self._history.addresses)
+        return addresses
+
+    def _remove_unused_addresses(self, addresses: Iterable[int]) -> None:
+        """Remove any of the given addresses which nothing uses any more from self._data, so we stop polling them"""
+        used_addresses = self._polled_addresses()
+        used_addresses.update(self._subscribed_addresses)
+        for address in addresses:
+            if address not in used_addresses and address in self._data:
                 del self._data[address]
+        self._register_values = None
+
+    def get_modbus_entity(self, key: str) -> ModbusControllerEntity | None:
+        return self._entities_by_key.get(key)
+
+    def _order_listeners(self) -> list[ModbusControllerEntity]:
+        """
+        Orders _update_listeners so that entities which are derived from other entities (see
+        ModbusControllerEntity.source_entity_keys) come after the entities they're derived from
+        """
+        ordered: list[ModbusControllerEntity] = [x for x in self._update_listeners if not x.source_entity_keys]
+        visited = set(ordered)
+
+        def _visit(listener: ModbusControllerEntity) -> None:
+            if listener in visited:
+                return
+            visited.add(listener)
+            for key in listener.source_entity_keys:
+                source = self._entities_by_key.get(key)
+                if source is not None and source in self._update_listeners:
+                    _visit(source)
+            ordered.append(listener)
+
+        for listener in self._update_listeners:
+            _visit(listener)
+        return ordered
 
     def _notify_update(self, changed_addresses: set[int]) -> None:
         """Notify listeners"""
-        for listener in self._update_listeners:
-            listener.update_callback(changed_addresses)
+        # _data has changed, so register_values() needs rebuilding
+        self._register_values = None
+
+        # Entities with a register decoder only need to hear about it if their value has actually changed. Decode them
+        # all in one go to find out which
+        if self._bulk_decoder is None:
+            decoded_listeners = [x for x in self._update_listeners if x.register_decoder is not None]
+            self._bulk_decoder = BulkDecoder(
+                [cast(RegisterDecoder, x.register_decoder) for x in decoded_listeners], use_numpy=self._use_numpy
+            )
+            self._bulk_decoded_listeners = decoded_listeners
+        changed_decoded_listeners = {
+            self._bulk_decoded_listeners[i] for i in self._bulk_decoder.changed(self.register_values())
+        }
+
+        # Entities which are derived from other entities' values are notified after them, so they see the new values
+        if self._ordered_listeners is None:
+            self._ordered_listeners = self._order_listeners()
+        for listener in self._ordered_listeners:
+            if listener.register_decoder is None or listener in changed_decoded_listeners:
+                listener.update_callback(changed_addresses)
+
+        if self._register_subscriptions:
+            registers = self.register_values()
+            for subscription in self._register_subscriptions:
+                subscription.send_changes(registers)
 
     async def _notify_is_connected_changed(self, is_connected: bool) -> None:
         """Notify listeners that the availability states of the inverter changed"""
@@ -590,16 +1164,21 @@ class ModbusController(EntityController, UnloadController):
             await self._remote_control_manager.became_connected_callback()
 
     @staticmethod
-    async def autodetect(client: ModbusClient, slave: int, adapter_config: dict[str, Any]) -> tuple[str, str]:
+    async def autodetect(
+        client: ModbusClient, slave: int, adapter_config: dict[str, Any], *, close_client: bool = True
+    ) -> tuple[str, str]:
         """
         Attempts to auto-detect the inverter type at the other end of the given connection
 
+        :param close_client: If False, the client is left connected if autodetect succeeds, so that it can be used to
+            poll the inverter without having to reconnect. It's always closed if autodetect fails.
         :returns: Tuple of (inverter type name e.g. "H1", inverter full name e.g. "H1-3.7-E")
         """
         # Annoyingly pymodbus logs the important stuff to its logger, and doesn't add that info to the exceptions it
         # throws
         spy_handler = _SpyHandler()
         pymodbus_logger = logging.getLogger("pymodbus")
+        succeeded = False
 
         try:
             pymodbus_logger.addHandler(spy_handler)
@@ -611,18 +1190,17 @@ class ModbusController(EntityController, UnloadController):
             # are for the serial number (and there doesn't seem to be enough space to hold all models!)
             # The H3 starts the model number with a space, annoyingly.
             # Some models (H1-5.0-E-G2 and H3-PRO) pack two ASCII chars into each register.
-            register_values: list[int] = []
-            start_address = _MODEL_START_ADDRESS
-            while len(register_values) < _MODEL_LENGTH:
+            # Most adapters can read the whole block in one go. Those which can't (e.g. the W610) may not answer a
+            # larger read at all, and we'd have to wait for that to time out, so never read more than max_read.
+            max_read = adapter_config[MAX_READ]
+            register_values = []
+            end_address = _MODEL_START_ADDRESS + _MODEL_LENGTH
+            for start_address in range(_MODEL_START_ADDRESS, end_address, max_read):
                 register_values.extend(
                     await client.read_registers(
-                        start_address,
-                        min(adapter_config[MAX_READ], _MODEL_LENGTH - len(register_values)),
-                        RegisterType.HOLDING,
-                        slave,
+                        start_address, min(max_read, end_address - start_address), RegisterType.HOLDING, slave
                     )
                 )
-                start_address += adapter_config[MAX_READ]
 
             # If they've packed 2 ASCII chars into each register, unpack them
             if (register_values[0] & 0xFF00) != 0:
@@ -648,6 +1226,7 @@ class ModbusController(EntityController, UnloadController):
                     # Make sure that we can parse the capacity out
                     capacity = model.inverter_capacity(full_model)
                     _LOGGER.info("Autodetected inverter as '%s' (%s, %sW)", model.model, full_model, capacity)
+                    succeeded = True
                     return model.model, full_model
 
             # We've read the model type, but been unable to match it against a supported model
@@ -658,7 +1237,85 @@ class ModbusController(EntityController, UnloadController):
             raise AutoconnectFailedError(spy_handler.records) from ex
         finally:
             pymodbus_logger.removeHandler(spy_handler)
-            await client.close()
+            if close_client or not succeeded:
+                await client.close()
+
+    @staticmethod
+    async def autodetect_first(
+        candidates: list[tuple[ModbusClient, int, dict[str, Any]]],
+        *,
+        close_client: bool = True,
+        timeout: float | None = None,
+    ) -> tuple[int, str, str]:
+        """
+        Runs autodetect against the candidate connections, and returns the first one which matches.
+
+        Candidates which go over the same transport (e.g. TCP and RTU over TCP to the same adapter) are tried one after
+        another, in the order given, as an adapter may only handle one conversation at a time. Candidates over UDP can't
+        get in the way of those over TCP, so the two are raced. If more than one matches at once, the earliest in the
+        list wins: the first candidate is normally what the user asked for.
+
+        We give up on all of them as soon as one can't connect (they all go to the same host, so the others won't do
+        any better), or one gets an answer from an inverter which we don't support, or after timeout seconds.
+
+        :param candidates: List of (client, slave, adapter config), as passed to autodetect
+        :param close_client: As for autodetect. The clients of candidates which didn't match are always closed
+        :param timeout: Most time in seconds to spend on all of the candidates, or None to wait for them all
+        :returns: Tuple of (index of the candidate which matched, inverter type name, inverter full name)
+        :raises AutoconnectFailedError: The error which made us give up, or if none of the candidates match, whatever
+            the first one raised. If we run out of time, its cause is a TimeoutError
+        """
+        assert len(candidates) > 0
+        lanes: dict[bool, list[int]] = {}
+        for index, (client, _slave, _adapter_config) in enumerate(candidates):
+            lanes.setdefault(client.protocol == UDP, []).append(index)
+        errors: dict[int, AutoconnectFailedError] = {}
+
+        async def _try_lane(indices: list[int]) -> tuple[int, str, str] | None:
+            for index in indices:
+                client, slave, adapter_config = candidates[index]
+                try:
+                    base_model, full_model = await ModbusController.autodetect(
+                        client, slave, adapter_config, close_client=close_client
+                    )
+                except AutoconnectFailedError as ex:
+                    if isinstance(ex.__cause__, (UnsupportedInverterError, pymodbus.ConnectionException)):
+                        raise
+                    errors[index] = ex
+                    continue
+                return index, base_model, full_model
+            return None
+
+        tasks = [asyncio.create_task(_try_lane(x)) for x in lanes.values()]
+        try:
+            async with asyncio.timeout(timeout):
+                pending: set[asyncio.Task[tuple[int, str, str] | None]] = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    results = [x.result() for x in done if x.exception() is None]
+                    matches = sorted(x for x in results if x is not None)
+                    if matches:
+                        for index, _base_model, _full_model in matches[1:]:
+                            if not close_client:
+                                await candidates[index][0].close()
+                        index, base_model, full_model = matches[0]
+                        if index > 0:
+                            client, slave, _adapter_config = candidates[index]
+                            _LOGGER.info("Autodetect matched candidate %s (%s, slave %s)", index, client, slave)
+                        return index, base_model, full_model
+                    for task in done:
+                        if (ex := task.exception()) is not None:
+                            raise ex
+        except TimeoutError:
+            raise AutoconnectFailedError([]) from TimeoutError(
+                f"Autodetect didn't get an answer within {timeout} seconds"
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        raise errors[0]
 
 
 class _SpyHandler(logging.Handler):
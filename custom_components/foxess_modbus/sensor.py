@@ -10,6 +10,8 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from .common.types import HassData
 from .const import DOMAIN
 from .entities.connection_status_sensor import ConnectionStatusSensor
+from .entities.poll_stats_sensor import PollDurationSensor
+from .entities.poll_stats_sensor import TransactionLatencySensor
 from .inverter_profiles import create_entities
 
 _LOGGER = logging.getLogger(__package__)
@@ -22,9 +24,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_d
     controllers = hass_data[entry.entry_id]["controllers"]
 
     for controller in controllers:
-        async_add_devices([ConnectionStatusSensor(controller)])
-        # We have to add sensors which don't depend on other sensors, before we add the sensors which *do* depend on
-        # other sensors (like the integration sensors), otherwise HA crashes when trying to create the IntegrationSensor
-        # because it can't find the sensor it depends on. See https://github.com/nathanmarlor/foxess_modbus/issues/886
+        async_add_devices(
+            [
+                ConnectionStatusSensor(controller),
+                PollDurationSensor(controller),
+                TransactionLatencySensor(controller),
+            ]
+        )
+        # Add sensors which don't depend on other sensors, before we add the sensors which *do* depend on other sensors
+        # (like the integration sensors), so that the sensors they depend on are in the entity registry when they look
+        # up their entity IDs. See https://github.com/nathanmarlor/foxess_modbus/issues/886
         async_add_devices(create_entities(SensorEntity, controller, filter_depends_on_other_entites=False))
         async_add_devices(create_entities(SensorEntity, controller, filter_depends_on_other_entites=True))
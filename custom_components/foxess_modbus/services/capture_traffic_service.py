@@ -0,0 +1,64 @@
+"""Defines the service to capture the Modbus traffic to and from an inverter"""
+
+import logging
+import re
+from datetime import timedelta
+from pathlib import Path
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import ServiceResponse
+from homeassistant.core import SupportsResponse
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from ..const import DOMAIN
+from ..const import FRIENDLY_NAME
+from ..modbus_controller import ModbusController
+from .utils import get_controller_from_friendly_name_or_device_id
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+_CAPTURE_SCHEMA = vol.Schema(
+    {
+        # Let the value to this be omitted, instead of forcing them to specify ''
+        vol.Required("inverter", description="Inverter"): vol.Any(cv.string, None),
+        vol.Required("duration", description="Duration"): vol.All(
+            cv.time_period, vol.Range(min=timedelta(seconds=1), max=timedelta(days=1))
+        ),
+    }
+)
+
+
+def register(hass: HomeAssistant, controllers: list[ModbusController]) -> None:
+    """Register the service with hass"""
+
+    async def _callback(service_data: ServiceCall) -> ServiceResponse:
+        return await hass.async_create_task(_capture_service(controllers, service_data, hass))
+
+    hass.services.async_register(
+        DOMAIN,
+        "capture_traffic",
+        _callback,
+        _CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def _capture_service(
+    controllers: list[ModbusController],
+    service_data: ServiceCall,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    """Capture service"""
+    controller = get_controller_from_friendly_name_or_device_id(service_data.data.get("inverter"), controllers, hass)
+
+    name = re.sub(r"[^A-Za-z0-9]+", "_", controller.inverter_details[FRIENDLY_NAME] or "inverter")
+    path = Path(hass.config.path(f"{DOMAIN}_{name}_{dt_util.now().strftime('%Y%m%d_%H%M%S')}.fxcap"))
+    await controller.start_capture(path, service_data.data["duration"])
+
+    if service_data.return_response:
+        return {"path": str(path)}
+
+    return None
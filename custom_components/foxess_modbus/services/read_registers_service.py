@@ -15,15 +15,33 @@ from .utils import get_controller_from_friendly_name_or_device_id
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
+_TYPES = {"input": RegisterType.INPUT, "holding": RegisterType.HOLDING}
+
+_RANGE_SCHEMA = vol.Schema(
+    {
+        vol.Required("start_address", description="Start Address"): cv.positive_int,
+        vol.Required("count", description="Values"): cv.positive_int,
+        vol.Required("type", description="Type of register to read"): vol.In(list(_TYPES)),
+    }
+)
+
 _READ_SCHEMA = vol.Schema(
     vol.All(
         {
             # Let the value to this be omitted, instead of forcing them to specify ''
             vol.Required("inverter", description="Inverter"): vol.Any(cv.string, None),
-            vol.Required("start_address", description="Start Address"): cv.positive_int,
-            vol.Required("count", description="Values"): cv.positive_int,
-            vol.Required("type", description="Type of register to read"): vol.In(["input", "holding"]),
+            # A single range, which is returned in "values"
+            vol.Inclusive("start_address", "range", description="Start Address"): cv.positive_int,
+            vol.Inclusive("count", "range", description="Values"): cv.positive_int,
+            vol.Inclusive("type", "range", description="Type of register to read"): vol.In(list(_TYPES)),
+            # Any number of ranges, which are returned in "ranges"
+            vol.Optional("ranges", description="Ranges of registers to read"): vol.All(cv.ensure_list, [_RANGE_SCHEMA]),
+            # Registers which we've polled within this many seconds are returned without reading them again
+            vol.Optional("max_age", description="Maximum age of polled values"): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
         },
+        cv.has_at_least_one_key("start_address", "ranges"),
     )
 )
 
@@ -59,15 +77,41 @@ async def _read_service(
     response: dict[str, Any] = {}
 
     try:
-        start_address = service_data.data["start_address"]
-        num_registers = service_data.data["count"]
-        types = {"input": RegisterType.INPUT, "holding": RegisterType.HOLDING}
-        register_type = types[service_data.data["type"]]
-        values = await controller.read_registers(start_address, num_registers, register_type)
-        response_values = {}
-        for i in range(num_registers):
-            response_values[start_address + i] = values[i]
-        response["values"] = response_values
+        ranges: list[dict[str, Any]] = list(service_data.data.get("ranges", []))
+        if "start_address" in service_data.data:
+            ranges.append(service_data.data)
+
+        # Read all of the ranges of each type together, so that they're planned into as few reads as possible
+        values: dict[str, dict[int, int | None]] = {}
+        for type_name, register_type in _TYPES.items():
+            addresses = [
+                x
+                for read_range in ranges
+                if read_range["type"] == type_name
+                for x in range(read_range["start_address"], read_range["start_address"] + read_range["count"])
+            ]
+            if addresses:
+                values[type_name] = await controller.read_registers(
+                    addresses, register_type, max_age=service_data.data.get("max_age")
+                )
+
+        def _range_values(read_range: dict[str, Any]) -> dict[int, int | None]:
+            type_values = values[read_range["type"]]
+            start_address = read_range["start_address"]
+            return {x: type_values[x] for x in range(start_address, start_address + read_range["count"])}
+
+        if "start_address" in service_data.data:
+            response["values"] = _range_values(service_data.data)
+        if "ranges" in service_data.data:
+            response["ranges"] = [
+                {
+                    "start_address": x["start_address"],
+                    "count": x["count"],
+                    "type": x["type"],
+                    "values": _range_values(x),
+                }
+                for x in service_data.data["ranges"]
+            ]
     except Exception as ex:
         _LOGGER.warning(ex, exc_info=True)
         response["error"] = str(ex)
@@ -0,0 +1,98 @@
+"""Defines the service to find out which registers an inverter supports"""
+
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import ServiceResponse
+from homeassistant.core import SupportsResponse
+from homeassistant.helpers import config_validation as cv
+
+from ..common.types import RegisterType
+from ..const import DOMAIN
+from ..modbus_controller import ModbusController
+from .utils import get_controller_from_friendly_name_or_device_id
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+_TYPES = {"input": RegisterType.INPUT, "holding": RegisterType.HOLDING}
+
+_SCAN_SCHEMA = vol.Schema(
+    vol.All(
+        {
+            # Let the value to this be omitted, instead of forcing them to specify ''
+            vol.Required("inverter", description="Inverter"): vol.Any(cv.string, None),
+            vol.Required("start_address", description="Start Address"): vol.All(int, vol.Range(min=0, max=0xFFFF)),
+            vol.Required("end_address", description="End Address"): vol.All(int, vol.Range(min=0, max=0xFFFF)),
+            vol.Required("type", description="Type of register to scan"): vol.In(list(_TYPES)),
+            vol.Optional("max_block", description="Largest read to make"): vol.All(int, vol.Range(min=1, max=125)),
+            vol.Optional("confirm_invalid", description="Whether to read every unreadable register"): cv.boolean,
+            vol.Optional("include_values", description="Whether to return values"): cv.boolean,
+        },
+    )
+)
+
+
+def register(hass: HomeAssistant, controllers: list[ModbusController]) -> None:
+    """Register the service with hass"""
+
+    async def _callback(service_data: ServiceCall) -> ServiceResponse:
+        return await hass.async_create_task(_scan_service(controllers, service_data, hass))
+
+    hass.services.async_register(
+        DOMAIN,
+        "scan_registers",
+        _callback,
+        _SCAN_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+async def _scan_service(
+    controllers: list[ModbusController],
+    service_data: ServiceCall,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    """Scan service"""
+    controller = get_controller_from_friendly_name_or_device_id(service_data.data["inverter"], controllers, hass)
+
+    response: dict[str, Any] = {}
+    try:
+        start = time.perf_counter()
+        result = await controller.scan_registers(
+            service_data.data["start_address"],
+            service_data.data["end_address"],
+            _TYPES[service_data.data["type"]],
+            max_block=service_data.data.get("max_block"),
+            confirm_invalid=service_data.data.get("confirm_invalid", False),
+        )
+        include_values = service_data.data.get("include_values", True)
+        response["valid_ranges"] = [
+            {
+                "start": start_address,
+                "end": start_address + len(values) - 1,
+                **({"values": values} if include_values else {}),
+            }
+            for start_address, values in result.valid_ranges
+        ]
+        response["invalid_ranges"] = [
+            [start_address, end_address] for start_address, end_address in result.invalid_ranges
+        ]
+        response["unconfirmed_ranges"] = [
+            [start_address, end_address] for start_address, end_address in result.unconfirmed_ranges
+        ]
+        response["unknown_ranges"] = [
+            [start_address, end_address] for start_address, end_address in result.unknown_ranges
+        ]
+        response["transactions"] = result.transactions
+        response["duration_s"] = round(time.perf_counter() - start, 1)
+        if result.error is not None:
+            response["error"] = result.error
+    except Exception as ex:
+        _LOGGER.warning(ex, exc_info=True)
+        response["error"] = str(ex)
+
+    return response
@@ -1,3 +1,4 @@
+import time
 from typing import Any
 
 import voluptuous as vol
@@ -14,6 +15,8 @@ from .utils import get_controller_from_friendly_name_or_device_id
 
 def register(hass: HomeAssistant) -> None:
     websocket_api.async_register_command(hass, get_charge_periods)
+    websocket_api.async_register_command(hass, get_history)
+    websocket_api.async_register_command(hass, subscribe_registers)
 
 
 @websocket_api.websocket_command(
@@ -44,3 +47,73 @@ def get_charge_periods(hass: HomeAssistant, connection: websocket_api.ActiveConn
             "charge_periods": charge_periods,
         },
     )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "foxess_modbus/get_history",
+        vol.Required("inverter"): vol.Any(cv.string, None),
+        vol.Required("addresses"): [vol.Coerce(int)],
+        vol.Optional("start_time"): vol.Coerce(float),
+        vol.Optional("end_time"): vol.Coerce(float),
+    }
+)
+@callback
+def get_history(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]) -> None:
+    hass_data: HassData = hass.data[DOMAIN]
+    controllers = [x for entry in hass_data.values() for x in entry["controllers"]]
+    controller = get_controller_from_friendly_name_or_device_id(msg["inverter"], controllers, hass)
+    history = controller.history
+    if history is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "No history registers are configured")
+        return
+    try:
+        timestamps, values = history.query(msg["addresses"], msg.get("start_time"), msg.get("end_time"))
+    except KeyError as ex:
+        connection.send_error(msg["id"], websocket_api.ERR_INVALID_FORMAT, str(ex.args[0]))
+        return
+    connection.send_result(
+        msg["id"],
+        {
+            "friendly_name": controller.inverter_details[FRIENDLY_NAME],
+            "timestamps": timestamps,
+            # JSON object keys have to be strings
+            "values": {str(address): x for address, x in values.items()},
+        },
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "foxess_modbus/subscribe_registers",
+        vol.Required("inverter"): vol.Any(cv.string, None),
+        vol.Required("addresses"): vol.All([vol.Coerce(int)], vol.Length(min=1)),
+    }
+)
+@callback
+def subscribe_registers(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]) -> None:
+    hass_data: HassData = hass.data[DOMAIN]
+    controllers = [x for entry in hass_data.values() for x in entry["controllers"]]
+    controller = get_controller_from_friendly_name_or_device_id(msg["inverter"], controllers, hass)
+
+    @callback
+    def forward_changes(changes: dict[int, int | None]) -> None:
+        # JSON object keys have to be strings
+        values = {str(address): value for address, value in changes.items()}
+        connection.send_message(websocket_api.event_message(msg["id"], {"time": time.time(), "values": values}))
+
+    @callback
+    def cancelled() -> None:
+        # The inverter was unloaded, e.g. because the integration is reloading. Let the client know that it needs to
+        # subscribe again
+        connection.subscriptions.pop(msg["id"], None)
+        connection.send_message(websocket_api.event_message(msg["id"], {"time": time.time(), "cancelled": True}))
+
+    try:
+        connection.subscriptions[msg["id"]] = controller.subscribe_registers(
+            msg["addresses"], forward_changes, cancelled
+        )
+    except ValueError as ex:
+        connection.send_error(msg["id"], websocket_api.ERR_INVALID_FORMAT, str(ex))
+        return
+    connection.send_result(msg["id"])
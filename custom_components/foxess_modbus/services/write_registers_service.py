@@ -6,12 +6,14 @@ from typing import Any
 import voluptuous as vol
 from homeassistant.core import HomeAssistant
 from homeassistant.core import ServiceCall
+from homeassistant.core import ServiceResponse
+from homeassistant.core import SupportsResponse
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv
 
 from ..const import DOMAIN
 from ..modbus_controller import ModbusController
-from ..vendor.pymodbus import ModbusIOException
+from ..vendor import pymodbus
 from .utils import get_controller_from_friendly_name_or_device_id
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
@@ -38,6 +40,29 @@ _WRITE_SCHEMA = vol.Schema(
 )
 
 
+def _values_list(value: Any) -> list[int]:
+    # Accept the comma-separated string which write_registers takes, as well as a list
+    if isinstance(value, str):
+        value = value.split(",")
+    return [vol.Coerce(int)(x) for x in cv.ensure_list(value)]
+
+
+_WRITE_GROUP_SCHEMA = vol.Schema(
+    {
+        vol.Required("start_address", description="Start Address"): cv.positive_int,
+        vol.Required("values", description="Values"): vol.All(_values_list, vol.Length(min=1)),
+    }
+)
+
+_WRITE_BATCH_SCHEMA = vol.Schema(
+    {
+        # Let the value to this be omitted, instead of forcing them to specify ''
+        vol.Required("inverter", description="Inverter"): vol.Any(cv.string, None),
+        vol.Required("writes", description="Writes"): vol.All(cv.ensure_list, [_WRITE_GROUP_SCHEMA], vol.Length(min=1)),
+    }
+)
+
+
 def register(hass: HomeAssistant, controllers: list[ModbusController]) -> None:
     """Register the service with hass"""
 
@@ -51,6 +76,17 @@ def register(hass: HomeAssistant, controllers: list[ModbusController]) -> None:
         _WRITE_SCHEMA,
     )
 
+    async def _batch_callback(service_data: ServiceCall) -> ServiceResponse:
+        return await hass.async_create_task(_write_batch_service(controllers, service_data, hass))
+
+    hass.services.async_register(
+        DOMAIN,
+        "write_registers_batch",
+        _batch_callback,
+        _WRITE_BATCH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
 
 async def _write_service(
     controllers: list[ModbusController],
@@ -69,6 +105,43 @@ async def _write_service(
         start_address = service_data.data["start_address"]
         values = service_data.data["values"].split(",")
         await controller.write_registers(start_address, values)
-    except ModbusIOException as ex:
+    except pymodbus.ModbusIOException as ex:
         _LOGGER.warning(ex, exc_info=True)
         raise HomeAssistantError() from ex
+
+
+async def _write_batch_service(
+    controllers: list[ModbusController],
+    service_data: ServiceCall,
+    hass: HomeAssistant,
+) -> ServiceResponse:
+    """Write batch service"""
+    controller = get_controller_from_friendly_name_or_device_id(service_data.data["inverter"], controllers, hass)
+
+    try:
+        results = await controller.write_register_groups(
+            (x["start_address"], x["values"]) for x in service_data.data["writes"]
+        )
+    except ValueError as ex:
+        raise HomeAssistantError(str(ex)) from ex
+
+    failed = [x for x in results if x.error is not None]
+    if not service_data.return_response:
+        if failed:
+            raise HomeAssistantError(
+                f"Failed to write registers starting at {failed[0].start_address}: {failed[0].error}"
+            )
+        return None
+
+    return {
+        "success": not failed,
+        "groups": [
+            {
+                "start_address": x.start_address,
+                "count": len(x.values),
+                "status": "skipped" if x.skipped else "failed" if x.error is not None else "written",
+                **({"error": x.error} if x.error is not None else {}),
+            }
+            for x in results
+        ],
+    }
@@ -0,0 +1,97 @@
+"""Drives a real ModbusController against a SimulatedInverter, and measures how it performs"""
+
+import logging
+import statistics
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Any
+
+from custom_components.foxess_modbus.entities.modbus_sensor import ModbusSensor
+from custom_components.foxess_modbus.modbus_controller import ModbusController
+
+from ..controller_helpers import EntityListener
+from ..controller_helpers import poll
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    polls: int
+    polls_per_sec: float
+    transactions_per_poll: float
+    p50_poll_ms: float
+    p99_poll_ms: float
+    # CPU time spent on the event loop thread, which is what competes with the rest of HA
+    loop_cpu_ms_per_poll: float
+    # CPU time spent by the whole process, including the executor threads and the simulator
+    process_cpu_ms_per_poll: float
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+async def run_poll_benchmark(name: str, controller: ModbusController, num_polls: int) -> BenchmarkResult:
+    """Polls the given controller num_polls times back-to-back, after a warm-up poll which connects"""
+
+    # The first poll connects, and reads the registers which are only read on connection
+    await poll(controller)
+    assert controller.poll_stats.successful_polls == 1, "Warm-up poll failed"
+
+    transactions_before = controller.transaction_stats.transactions
+    durations_ms: list[float] = []
+    start = time.perf_counter()
+    loop_cpu_start = time.thread_time()
+    process_cpu_start = time.process_time()
+    for _ in range(num_polls):
+        poll_start = time.perf_counter()
+        await poll(controller)
+        durations_ms.append((time.perf_counter() - poll_start) * 1000)
+    elapsed = time.perf_counter() - start
+    loop_cpu = time.thread_time() - loop_cpu_start
+    process_cpu = time.process_time() - process_cpu_start
+
+    assert controller.poll_stats.successful_polls == num_polls + 1, "Some polls failed"
+
+    percentiles = statistics.quantiles(durations_ms, n=100, method="inclusive")
+    return BenchmarkResult(
+        name=name,
+        polls=num_polls,
+        polls_per_sec=round(num_polls / elapsed, 2),
+        transactions_per_poll=round((controller.transaction_stats.transactions - transactions_before) / num_polls, 2),
+        p50_poll_ms=round(percentiles[49], 2),
+        p99_poll_ms=round(percentiles[98], 2),
+        loop_cpu_ms_per_poll=round(loop_cpu * 1000 / num_polls, 3),
+        process_cpu_ms_per_poll=round(process_cpu * 1000 / num_polls, 3),
+    )
+
+
+def run_decode_benchmark(name: str, controller: ModbusController, num_polls: int) -> dict[str, Any]:
+    """
+    Measures how long the controller takes to notify its entities (and them to decode their values) after a poll in
+    which every register changed, without any I/O. The controller must already have polled successfully once.
+    """
+    addresses = {x for listener in controller._update_listeners for x in listener.addresses}  # noqa: SLF001
+    sensors = sum(
+        isinstance(x, EntityListener) and isinstance(x.entity, ModbusSensor)
+        for x in controller._update_listeners  # noqa: SLF001
+    )
+
+    durations_us: list[float] = []
+    # The simulator's made-up values fail some sensors' validation, and we don't want to measure logging that
+    logging.disable(logging.WARNING)
+    try:
+        for _ in range(num_polls):
+            start = time.perf_counter()
+            controller._notify_update(addresses)  # noqa: SLF001
+            durations_us.append((time.perf_counter() - start) * 1_000_000)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        "name": name,
+        "polls": num_polls,
+        "sensors": sensors,
+        "p50_notify_us": round(statistics.median(durations_us), 1),
+        "min_notify_us": round(min(durations_us), 1),
+    }
@@ -0,0 +1,200 @@
+"""Measures how a Home Assistant instance copes with the integration polling many inverters over a long period"""
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from typing import Any
+
+import psutil
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event
+from homeassistant.core import HomeAssistant
+from homeassistant.core import callback
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.foxess_modbus.common.types import ConnectionType
+from custom_components.foxess_modbus.common.types import HassData
+from custom_components.foxess_modbus.const import ADAPTER_ID
+from custom_components.foxess_modbus.const import CONFIG_SAVE_TIME
+from custom_components.foxess_modbus.const import DOMAIN
+from custom_components.foxess_modbus.const import ENTITY_ID_PREFIX
+from custom_components.foxess_modbus.const import FRIENDLY_NAME
+from custom_components.foxess_modbus.const import HOST
+from custom_components.foxess_modbus.const import INVERTER_BASE
+from custom_components.foxess_modbus.const import INVERTER_CONN
+from custom_components.foxess_modbus.const import INVERTER_MODEL
+from custom_components.foxess_modbus.const import INVERTERS
+from custom_components.foxess_modbus.const import MODBUS_SLAVE
+from custom_components.foxess_modbus.const import MODBUS_TYPE
+from custom_components.foxess_modbus.const import POLL_RATE
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.const import UNIQUE_ID_PREFIX
+from custom_components.foxess_modbus.flow.flow_handler import FlowHandler
+
+from ..simulator import ProfileSimulatorContext
+from ..simulator import SimulatedInverter
+
+# How often the lag probe wakes up. Any delay beyond this is time that the event loop was busy doing something else.
+_LAG_PROBE_INTERVAL = 0.05
+
+
+@dataclass
+class SoakSample:
+    """Measurements taken over a single sample interval"""
+
+    elapsed_s: float
+    loop_lag_p50_ms: float
+    loop_lag_p99_ms: float
+    loop_lag_max_ms: float
+    executor_queue_depth_max: int
+    executor_threads: int
+    rss_mb: float
+    state_writes_per_sec: float
+    polls_per_sec: float
+    failed_polls: int
+
+
+def create_config_entry(simulators: list[SimulatedInverter], poll_rate: int) -> MockConfigEntry:
+    """Creates a config entry with one inverter per simulator, as the config flow would"""
+    inverters = {}
+    for i, simulator in enumerate(simulators):
+        assert isinstance(simulator.context, ProfileSimulatorContext)
+        inverters[f"inverter_{i}"] = {
+            ADAPTER_ID: "elfin_ew11",
+            INVERTER_BASE: simulator.context.model,
+            INVERTER_MODEL: simulator.context.model_name,
+            INVERTER_CONN: ConnectionType.AUX,
+            MODBUS_SLAVE: 247,
+            MODBUS_TYPE: TCP,
+            HOST: simulator.host,
+            ENTITY_ID_PREFIX: f"inverter_{i}",
+            UNIQUE_ID_PREFIX: f"inverter_{i}",
+            FRIENDLY_NAME: f"Inverter {i}",
+        }
+    return MockConfigEntry(
+        domain=DOMAIN,
+        version=FlowHandler.VERSION,
+        data={INVERTERS: inverters, CONFIG_SAVE_TIME: datetime.now(UTC)},
+        options={INVERTERS: {inverter_id: {POLL_RATE: poll_rate} for inverter_id in inverters}},
+    )
+
+
+class SoakMonitor:
+    """
+    Samples the health of the event loop, executor and process at a fixed interval, while the integration runs.
+
+    Use as an async context manager around the period to be measured.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: MockConfigEntry, sample_interval: float) -> None:
+        self._hass = hass
+        self._entry = entry
+        self._sample_interval = sample_interval
+        self._process = psutil.Process()
+        self.samples: list[SoakSample] = []
+
+        self._lags_ms: list[float] = []
+        self._executor_queue_depth_max = 0
+        self._state_writes = 0
+        self._polls = 0
+        self._failed_polls = 0
+        self._tasks: list[asyncio.Task[None]] = []
+        self._remove_listener: Any = None
+
+    async def __aenter__(self) -> "SoakMonitor":
+        self._started_at = time.monotonic()
+        self._polls, self._failed_polls = self._count_polls()
+        self._remove_listener = self._hass.bus.async_listen(EVENT_STATE_CHANGED, self._on_state_changed)
+        self._tasks = [
+            asyncio.create_task(self._probe_lag()),
+            asyncio.create_task(self._sample()),
+        ]
+        return self
+
+    async def __aexit__(self, *_args: object) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._remove_listener()
+
+    def summary(self) -> dict[str, Any]:
+        """Aggregates the samples, for comparison between runs"""
+        if not self.samples:
+            return {}
+        return {
+            "duration_s": self.samples[-1].elapsed_s,
+            "polls_per_sec": round(statistics.fmean(x.polls_per_sec for x in self.samples), 2),
+            "failed_polls": sum(x.failed_polls for x in self.samples),
+            "loop_lag_p99_ms": max(x.loop_lag_p99_ms for x in self.samples),
+            "loop_lag_max_ms": max(x.loop_lag_max_ms for x in self.samples),
+            "executor_queue_depth_max": max(x.executor_queue_depth_max for x in self.samples),
+            "rss_mb_start": self.samples[0].rss_mb,
+            "rss_mb_end": self.samples[-1].rss_mb,
+            "state_writes_per_sec": round(statistics.fmean(x.state_writes_per_sec for x in self.samples), 2),
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "summary": self.summary(),
+            "samples": [asdict(x) for x in self.samples],
+        }
+
+    @callback
+    def _on_state_changed(self, _event: Event) -> None:
+        self._state_writes += 1
+
+    def _executor(self) -> ThreadPoolExecutor | None:
+        executor = self._hass.loop._default_executor  # noqa: SLF001
+        return executor if isinstance(executor, ThreadPoolExecutor) else None
+
+    def _count_polls(self) -> tuple[int, int]:
+        hass_data: HassData = self._hass.data[DOMAIN]
+        controllers = hass_data[self._entry.entry_id]["controllers"]
+        return (
+            sum(x.poll_stats.successful_polls for x in controllers),
+            sum(x.poll_stats.failed_polls for x in controllers),
+        )
+
+    async def _probe_lag(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(_LAG_PROBE_INTERVAL)
+            self._lags_ms.append(max(time.monotonic() - start - _LAG_PROBE_INTERVAL, 0) * 1000)
+
+            executor = self._executor()
+            if executor is not None:
+                depth = executor._work_queue.qsize()  # noqa: SLF001
+                self._executor_queue_depth_max = max(self._executor_queue_depth_max, depth)
+
+    async def _sample(self) -> None:
+        while True:
+            await asyncio.sleep(self._sample_interval)
+
+            lags_ms, self._lags_ms = self._lags_ms, []
+            polls, failed_polls = self._count_polls()
+            executor = self._executor()
+            quantiles = statistics.quantiles(lags_ms, n=100, method="inclusive") if len(lags_ms) > 1 else [0.0] * 99
+
+            self.samples.append(
+                SoakSample(
+                    elapsed_s=round(time.monotonic() - self._started_at, 1),
+                    loop_lag_p50_ms=round(quantiles[49], 2),
+                    loop_lag_p99_ms=round(quantiles[98], 2),
+                    loop_lag_max_ms=round(max(lags_ms, default=0), 2),
+                    executor_queue_depth_max=self._executor_queue_depth_max,
+                    executor_threads=len(executor._threads) if executor is not None else 0,  # noqa: SLF001
+                    rss_mb=round(self._process.memory_info().rss / 1024 / 1024, 1),
+                    state_writes_per_sec=round(self._state_writes / self._sample_interval, 2),
+                    polls_per_sec=round((polls - self._polls) / self._sample_interval, 2),
+                    failed_polls=failed_polls - self._failed_polls,
+                )
+            )
+
+            self._executor_queue_depth_max = 0
+            self._state_writes = 0
+            self._polls, self._failed_polls = polls, failed_polls
@@ -0,0 +1,58 @@
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+_ROOT = Path(__file__).parents[2]
+_RUNS = 5
+
+# Imports the integration, then does what setting up a TCP inverter does. Timings from -X importtime go to stderr
+_SCRIPT = """
+import time
+import custom_components.foxess_modbus
+from custom_components.foxess_modbus.client.modbus_client import load_pymodbus
+start = time.perf_counter()
+load_pymodbus("tcp")
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def _measure() -> dict[str, float]:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT], cwd=_ROOT, capture_output=True, text=True, check=True
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | imported package", and are written in the order that
+    # imports finish. Everything before load_pymodbus starts was imported by importing the integration.
+    integration_us = 0
+    pymodbus_at_import_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _cumulative_us, name = line.removeprefix("import time:").split("|")
+        name = name.strip()
+        if name.startswith("custom_components.foxess_modbus"):
+            integration_us += int(self_us)
+        elif name.startswith("pymodbus"):
+            pymodbus_at_import_us += int(self_us)
+        if name == "custom_components.foxess_modbus":
+            break
+
+    return {
+        "integration_import_ms": (integration_us + pymodbus_at_import_us) / 1000,
+        "pymodbus_at_import_ms": pymodbus_at_import_us / 1000,
+        "load_pymodbus_ms": float(result.stdout.strip()),
+    }
+
+
+def test_import(benchmark_results: list[dict[str, Any]]) -> None:
+    """Measures how long importing the integration takes, not counting Home Assistant itself"""
+    runs = [_measure() for _ in range(_RUNS)]
+    benchmark_results.append(
+        {"name": "import", "runs": _RUNS} | {key: round(statistics.median(x[key] for x in runs), 2) for key in runs[0]}
+    )
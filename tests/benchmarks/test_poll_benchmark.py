@@ -0,0 +1,141 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.foxess_modbus.client.modbus_client import ModbusClient
+from custom_components.foxess_modbus.client.traffic_capture import TrafficCapture
+from custom_components.foxess_modbus.common.types import ConnectionType
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.const import RTU_OVER_TCP
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.inverter_profiles import INVERTER_PROFILES
+from custom_components.foxess_modbus.inverter_profiles import Version
+
+from ..controller_helpers import create_client
+from ..controller_helpers import create_controller
+from ..controller_helpers import poll
+from ..simulator import ProfileSimulatorContext
+from ..simulator import SimulatedInverter
+from ..simulator import SimulatorContext
+from .harness import run_decode_benchmark
+from .harness import run_poll_benchmark
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.usefixtures("socket_enabled")]
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "connection_type" in metafunc.fixturenames:
+        inputs = []
+        for model, profile in INVERTER_PROFILES.items():
+            for connection_type, connection_type_profile in profile.connection_types.items():
+                for version in connection_type_profile.versions:
+                    v = "latest" if version is None else f"v{version}"
+                    inputs.append((model, connection_type, v))
+
+        metafunc.parametrize(("model", "connection_type", "version"), inputs)
+
+
+@pytest.mark.parametrize(
+    ("protocol", "latency_ms", "max_connections"),
+    [
+        (TCP, 0, 1),
+        (TCP, 20, 1),
+        (TCP, 20, 4),
+        (RTU_OVER_TCP, 0, 1),
+        (RTU_OVER_TCP, 20, 1),
+    ],
+)
+async def test_poll(
+    hass: HomeAssistant,
+    benchmark_polls: int,
+    benchmark_results: list[dict[str, Any]],
+    protocol: str,
+    latency_ms: int,
+    max_connections: int,
+) -> None:
+    with SimulatedInverter(SimulatorContext(latency=latency_ms / 1000), protocol) as simulator:
+        client = create_client(hass, simulator.host, protocol, max_connections)
+        controller = create_controller(hass, client)
+        try:
+            result = await run_poll_benchmark(
+                f"{protocol} latency={latency_ms}ms connections={max_connections}", controller, benchmark_polls
+            )
+        finally:
+            controller.unload()
+            await client.close()
+
+    benchmark_results.append(result.as_dict())
+
+
+async def test_poll_profile(
+    hass: HomeAssistant,
+    benchmark_polls: int,
+    benchmark_results: list[dict[str, Any]],
+    model: InverterModel,
+    connection_type: ConnectionType,
+    version: str,
+) -> None:
+    v = None if version == "latest" else Version.parse(version.lstrip("v"))
+    context = ProfileSimulatorContext(model, connection_type, v)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(
+            hass, client, model=model, model_name=context.model_name, connection_type=connection_type, version=v
+        )
+        try:
+            result = await run_poll_benchmark(f"{model}-{connection_type}-{version}", controller, benchmark_polls)
+        finally:
+            controller.unload()
+            await client.close()
+
+    benchmark_results.append(result.as_dict())
+
+
+async def test_replay(
+    hass: HomeAssistant, benchmark_polls: int, benchmark_results: list[dict[str, Any]], tmp_path: Path
+) -> None:
+    """Replays recorded traffic as fast as possible, which measures the cost of decoding and notifying entities"""
+    path = tmp_path / "capture.bin"
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client)
+        try:
+            await client.start_capture(path)
+            for _ in range(benchmark_polls + 1):
+                await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    capture = await hass.async_add_executor_job(TrafficCapture.load, path)
+    replay_client = ModbusClient.from_capture(hass, capture, speed=0)
+    replay_controller = create_controller(hass, replay_client)
+    try:
+        result = await run_poll_benchmark("replay", replay_controller, benchmark_polls)
+    finally:
+        replay_controller.unload()
+        await replay_client.close()
+
+    benchmark_results.append(result.as_dict())
+
+
+@pytest.mark.parametrize("model", [InverterModel.H1_G2, InverterModel.H3_SMART, InverterModel.H3_PRO])
+async def test_decode(
+    hass: HomeAssistant, benchmark_polls: int, benchmark_results: list[dict[str, Any]], model: InverterModel
+) -> None:
+    """Measures the CPU cost of turning a poll's registers into entity values, which is paid on every poll"""
+    context = ProfileSimulatorContext(model)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=model, model_name=context.model_name)
+        try:
+            await poll(controller)
+            result = run_decode_benchmark(f"decode {model}", controller, benchmark_polls)
+        finally:
+            controller.unload()
+            await client.close()
+
+    benchmark_results.append(result)
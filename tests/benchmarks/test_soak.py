@@ -0,0 +1,54 @@
+import asyncio
+import json
+from contextlib import ExitStack
+from typing import Any
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.foxess_modbus.common.types import InverterModel
+
+from ..simulator import ProfileSimulatorContext
+from ..simulator import SimulatedInverter
+from .soak import SoakMonitor
+from .soak import create_config_entry
+
+pytestmark = [pytest.mark.soak, pytest.mark.usefixtures("socket_enabled", "enable_custom_integrations")]
+
+
+async def test_soak(
+    hass: HomeAssistant, request: pytest.FixtureRequest, benchmark_results: list[dict[str, Any]]
+) -> None:
+    num_inverters: int = request.config.getoption("--soak-inverters")
+    duration: float = request.config.getoption("--soak-duration")
+    poll_rate: int = request.config.getoption("--soak-poll-rate")
+    sample_interval: float = request.config.getoption("--soak-sample-interval")
+
+    with ExitStack() as stack:
+        simulators = [
+            stack.enter_context(SimulatedInverter(ProfileSimulatorContext(InverterModel.H1_G2)))
+            for _ in range(num_inverters)
+        ]
+        entry = create_config_entry(simulators, poll_rate)
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        async with SoakMonitor(hass, entry, sample_interval) as monitor:
+            await asyncio.sleep(duration)
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    config = {
+        "inverters": num_inverters,
+        "duration_s": duration,
+        "poll_rate_s": poll_rate,
+        "sample_interval_s": sample_interval,
+    }
+    json_path = request.config.getoption("--soak-json")
+    if json_path is not None:
+        json_path.write_text(json.dumps({"config": config, **monitor.as_dict()}, indent=2))
+
+    benchmark_results.append({"name": f"soak inverters={num_inverters}", **monitor.summary()})
+    assert monitor.summary()["failed_polls"] == 0
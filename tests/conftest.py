@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+_BENCHMARK_RESULTS = pytest.StashKey[list[dict[str, Any]]]()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("benchmark")
+    group.addoption("--benchmark", action="store_true", help="Run the benchmarks, which are skipped by default")
+    group.addoption("--benchmark-polls", type=int, default=50, help="Number of polls to measure in each benchmark")
+    group.addoption("--benchmark-json", type=Path, help="Write the benchmark results to this file")
+
+    group = parser.getgroup("soak")
+    group.addoption("--soak", action="store_true", help="Run the soak tests, which are skipped by default")
+    group.addoption("--soak-inverters", type=int, default=10, help="Number of simulated inverters to poll")
+    group.addoption("--soak-duration", type=float, default=60, help="How long to run for, in seconds")
+    group.addoption("--soak-poll-rate", type=int, default=10, help="Poll rate of each inverter, in seconds")
+    group.addoption("--soak-sample-interval", type=float, default=10, help="How often to take a sample, in seconds")
+    group.addoption("--soak-json", type=Path, help="Write the soak samples to this file")
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "benchmark: performance benchmark, only run with --benchmark")
+    config.addinivalue_line("markers", "soak: long-running soak test, only run with --soak")
+    config.stash[_BENCHMARK_RESULTS] = []
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    for marker in ["benchmark", "soak"]:
+        if config.getoption(f"--{marker}"):
+            continue
+        skip = pytest.mark.skip(reason=f"Only run with --{marker}")
+        for item in items:
+            if marker in item.keywords:
+                item.add_marker(skip)
+
+
+@pytest.fixture
+def benchmark_polls(request: pytest.FixtureRequest) -> int:
+    return int(request.config.getoption("--benchmark-polls"))
+
+
+@pytest.fixture
+def benchmark_results(request: pytest.FixtureRequest) -> list[dict[str, Any]]:
+    """Results appended to this list are reported at the end of the run"""
+    return request.config.stash[_BENCHMARK_RESULTS]
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    results = config.stash.get(_BENCHMARK_RESULTS, [])
+    if not results:
+        return
+
+    terminalreporter.section("benchmark results")
+    # Different benchmarks measure different things, so give each set of columns its own table
+    tables: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for result in results:
+        tables.setdefault(tuple(result), []).append(result)
+    for columns, rows in tables.items():
+        widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+        terminalreporter.write_line(
+            "  ".join(column.ljust(width) for column, width in zip(columns, widths, strict=True)).rstrip()
+        )
+        for row in rows:
+            terminalreporter.write_line(
+                "  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths, strict=True)).rstrip()
+            )
+        terminalreporter.write_line("")
+
+    json_path: Path | None = config.getoption("--benchmark-json")
+    if json_path is not None:
+        json_path.write_text(json.dumps(results, indent=2))
+        terminalreporter.write_line(f"Wrote benchmark results to {json_path}")
@@ -0,0 +1,335 @@
+"""A simulated inverter, served over Modbus TCP by the vendored pymodbus server"""
+
+import asyncio
+import math
+import threading
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+from typing import Callable
+
+from custom_components.foxess_modbus.common.types import ConnectionType
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.common.types import RegisterType
+from custom_components.foxess_modbus.const import RTU_OVER_TCP
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.entities.charge_period_descriptions import CHARGE_PERIODS
+from custom_components.foxess_modbus.entities.entity_descriptions import ENTITIES
+from custom_components.foxess_modbus.entities.modbus_remote_control_config import WorkMode
+from custom_components.foxess_modbus.entities.remote_control_description import REMOTE_CONTROL_DESCRIPTION
+from custom_components.foxess_modbus.inverter_profiles import INVERTER_PROFILES
+from custom_components.foxess_modbus.inverter_profiles import Version
+from custom_components.foxess_modbus.vendor import pymodbus as vendored_pymodbus
+from custom_components.foxess_modbus.vendor.pymodbus import _load
+
+# The integration only imports the pymodbus clients. Pull in the server side from the same vendored copy, which shares
+# the modules that the integration has already loaded.
+with _load(Path(vendored_pymodbus.__file__).parent / "pymodbus-3.6.9", "pymodbus"):
+    from pymodbus.datastore import ModbusBaseSlaveContext
+    from pymodbus.datastore import ModbusServerContext
+    from pymodbus.server.async_io import ModbusTcpServer
+    from pymodbus.transaction import ModbusRtuFramer
+    from pymodbus.transaction import ModbusSocketFramer
+
+_FRAMERS = {
+    TCP: ModbusSocketFramer,
+    RTU_OVER_TCP: ModbusRtuFramer,
+}
+
+_REGISTER_TYPES = {
+    "h": RegisterType.HOLDING,
+    "i": RegisterType.INPUT,
+}
+
+_MODEL_START_ADDRESS = 30000
+
+# A model name which each profile recognises, as presented at _MODEL_START_ADDRESS
+EXAMPLE_MODEL_NAMES = {
+    InverterModel.H1_G1: "H1-5.0-E",
+    InverterModel.H1_G2: "H1-5.0-E-G2",
+    InverterModel.P1: "P1-5.0-E",
+    InverterModel.AC1: "AC1-5.0-E",
+    InverterModel.AC1_G2: "AC1-5.0-E-G2",
+    InverterModel.AIO_H1: "AIO-H1-5.0",
+    InverterModel.AIO_AC1: "AIO-AC1-5.0",
+    InverterModel.KH: "KH10.5",
+    InverterModel.H3: "H3-10.0-E",
+    InverterModel.AC3: "AC3-10.0-E",
+    InverterModel.AIO_H3: "AIO-H3-10.0-E",
+    InverterModel.KUARA_H3: "Kuara 10-3-H",
+    InverterModel.SK_HWR: "SK-HWR-10",
+    InverterModel.SK_HWR_SMART: "SK-HWR-10 SMART",
+    InverterModel.STAR_H3: "STAR-H3-10.0",
+    InverterModel.SOLAVITA_SP: "SP R10KH3",
+    InverterModel.ATRONIX_AX: "AX 10kW-3ph",
+    InverterModel.ENPAL_IX: "I-X10.0",
+    InverterModel.ONE_KOMMA_FIVE: "1K5-HI-10-V1",
+    InverterModel.H3_PRO: "H3-Pro-15.0",
+    InverterModel.H3_SMART: "H3-10.0-Smart",
+    InverterModel.P3_SMART: "P3-10.0-SH",
+    InverterModel.EVO: "EVO 10-10.0-H",
+}
+
+
+class SimulatorContext(ModbusBaseSlaveContext):
+    """
+    Register store for a simulated inverter.
+
+    Every address can be read, and returns a value which changes each time it's read. Written values are stored and
+    returned by subsequent reads.
+    """
+
+    def __init__(self, latency: float = 0) -> None:
+        """
+        :param latency: Time in seconds to wait before responding to each request. Requests on different connections
+            are delayed concurrently, as if the time were spent on the network.
+        """
+        self.latency = latency
+        self.num_requests = 0
+        # Inverters which are read through input registers are written through holding registers at the same address,
+        # so don't distinguish between register types here
+        self._written: dict[int, int] = {}
+
+    def reset(self) -> None:
+        self._written.clear()
+
+    def validate(self, fc_as_hex: int, _address: int, _count: int = 1) -> bool:
+        return fc_as_hex in self._fx_mapper and self.decode(fc_as_hex) in _REGISTER_TYPES
+
+    def getValues(self, fc_as_hex: int, address: int, count: int = 1) -> list[int]:  # noqa: N802
+        register_type = _REGISTER_TYPES[self.decode(fc_as_hex)]
+        self.num_requests += 1
+        return [self._get_value(register_type, address + i) for i in range(count)]
+
+    async def async_getValues(self, fc_as_hex: int, address: int, count: int = 1) -> list[int]:  # noqa: N802
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        return self.getValues(fc_as_hex, address, count)
+
+    def setValues(self, _fc_as_hex: int, address: int, values: list[int]) -> None:  # noqa: N802
+        for i, value in enumerate(values):
+            self._written[address + i] = value
+
+    def _get_value(self, _register_type: RegisterType, address: int) -> int:
+        written = self._written.get(address)
+        if written is not None:
+            return written
+        return (address * 31 + self.num_requests) & 0xFFFF
+
+
+class ProfileSimulatorContext(SimulatorContext):
+    """
+    Register store which behaves like a particular inverter model, as described by its profile.
+
+    The model name is presented at holding register 30000, reads which touch the profile's invalid ranges fail with
+    IllegalAddress, and registers used by the profile's sensors change over time: single-register sensors oscillate, and
+    multi-register sensors (which are usually energy totals) count upwards. The battery SoC, battery power and PV
+    voltages used by remote control change in the same way. Charge periods and the remote control settings hold fixed,
+    valid values: each charge period spans a few hours, remote control is disabled, and the max SoC is
+    100%. Other registers read as 0 until written.
+    """
+
+    def __init__(
+        self,
+        model: InverterModel,
+        connection_type: ConnectionType = ConnectionType.AUX,
+        version: Version | None = None,
+        *,
+        model_name: str | None = None,
+        latency: float = 0,
+        max_read: int | None = None,
+        ignore_large_reads: bool = False,
+        invalid_ranges: list[tuple[int, int]] | None = None,
+    ) -> None:
+        """
+        :param max_read: If set, reads of more registers than this fail with IllegalAddress, as they do through some
+            adapters
+        :param ignore_large_reads: If set, reads of more than max_read registers get no answer at all, as with some
+            other adapters
+        :param invalid_ranges: If set, used instead of the profile's invalid ranges, e.g. for an inverter which has
+            invalid ranges that the profile doesn't know about
+        """
+        super().__init__(latency)
+        self.max_read = max_read
+        self.ignore_large_reads = ignore_large_reads
+
+        connection_type_profile = INVERTER_PROFILES[model].connection_types[connection_type]
+        self.model = model
+        self.model_name = model_name if model_name is not None else EXAMPLE_MODEL_NAMES[model]
+        self.register_type = connection_type_profile.register_type
+        self._invalid_ranges = (
+            invalid_ranges
+            if invalid_ranges is not None
+            else connection_type_profile.special_registers.invalid_register_ranges
+        )
+
+        self._model_registers = [ord(x) for x in self.model_name]
+        # address -> function which takes the current tick, and returns the register value at that address
+        self._generators: dict[int, Callable[[int], int]] = {}
+        # address -> value, for settings which don't change unless written
+        self._settings: dict[int, int] = {}
+
+        inv = connection_type_profile.get_inv_for_version(version)
+        for entity_factory in ENTITIES:
+            serialized = entity_factory.serialize(inv, self.register_type)
+            if serialized is None or serialized["type"] != "sensor":
+                continue
+            addresses: list[int] = serialized["addresses"]
+            if len(addresses) == 1:
+                self._generators[addresses[0]] = _oscillating(
+                    addresses[0], serialized.get("scale"), serialized.get("signed", True)
+                )
+            else:
+                for i, address in enumerate(addresses):
+                    self._generators[address] = _counting(addresses[0], word=i)
+
+        for i, charge_period in enumerate(CHARGE_PERIODS):
+            for charge_period_spec in charge_period.address_specs:
+                charge_period_config = charge_period_spec.register_types.get(self.register_type)
+                if inv in charge_period_spec.models and charge_period_config is not None:
+                    # Period 1 is 01:00-04:00 and charges from the grid, period 2 is 13:30-16:30, etc
+                    start_hour = (1 + 12 * i) % 24
+                    self._settings[charge_period_config.period_start_address] = (start_hour << 8) | (30 * i % 60)
+                    self._settings[charge_period_config.period_end_address] = ((start_hour + 3) << 8) | (30 * i % 60)
+                    self._settings[charge_period_config.enable_charge_from_grid_address] = 1 if i == 0 else 0
+
+        for remote_control_spec in REMOTE_CONTROL_DESCRIPTION.address_specs:
+            remote_control_config = remote_control_spec.register_types.get(self.register_type)
+            if inv not in remote_control_spec.models or remote_control_config is None:
+                continue
+            self._settings[remote_control_config.remote_enable] = 0
+            self._settings[remote_control_config.timeout_set] = 0
+            for address in remote_control_config.active_power:
+                self._settings[address] = 0
+            if remote_control_config.work_mode is not None and remote_control_config.work_mode_map is not None:
+                self._settings[remote_control_config.work_mode] = remote_control_config.work_mode_map[WorkMode.SELF_USE]
+            if remote_control_config.max_soc is not None:
+                self._settings[remote_control_config.max_soc] = 100
+            for address in remote_control_config.battery_soc:
+                self._generators.setdefault(address, _oscillating(address, None, signed=False))
+            for address in remote_control_config.invbatpower:
+                self._generators.setdefault(address, _oscillating(address, 0.001, signed=True))
+            for address in remote_control_config.pwr_limit_bat_up or []:
+                self._generators.setdefault(address, _oscillating(address, 0.001, signed=False))
+            for address in remote_control_config.pv_voltages:
+                self._generators.setdefault(address, _oscillating(address, 0.1, signed=False))
+
+    @property
+    def addresses(self) -> list[int]:
+        """Addresses of the registers whose values change over time"""
+        return sorted(self._generators)
+
+    def validate(self, fc_as_hex: int, address: int, count: int = 1) -> bool:
+        if not super().validate(fc_as_hex, address, count):
+            return False
+        if self.max_read is not None and count > self.max_read and not self.ignore_large_reads:
+            return False
+        if _REGISTER_TYPES[self.decode(fc_as_hex)] != self.register_type:
+            return True
+        end_address = address + count - 1
+        return not any(start <= end_address and address <= end for start, end in self._invalid_ranges)
+
+    async def async_getValues(self, fc_as_hex: int, address: int, count: int = 1) -> list[int]:  # noqa: N802
+        if self.ignore_large_reads and self.max_read is not None and count > self.max_read:
+            # Never answer: the client gives up once it's timed out
+            await asyncio.Event().wait()
+        return await super().async_getValues(fc_as_hex, address, count)
+
+    def _get_value(self, register_type: RegisterType, address: int) -> int:
+        written = self._written.get(address)
+        if written is not None:
+            return written
+        if register_type == RegisterType.HOLDING and address >= _MODEL_START_ADDRESS:
+            offset = address - _MODEL_START_ADDRESS
+            if offset < len(self._model_registers):
+                return self._model_registers[offset]
+        if register_type == self.register_type:
+            generator = self._generators.get(address)
+            if generator is not None:
+                return generator(self.num_requests)
+            setting = self._settings.get(address)
+            if setting is not None:
+                return setting
+        return 0
+
+
+def _oscillating(address: int, scale: float | None, signed: bool) -> Callable[[int], int]:
+    """Oscillates between 0 and 100 in the sensor's units (or -50 and 50 if it's signed), with a different phase per
+    address"""
+    scale = scale if scale is not None else 1
+    offset = 0 if signed else 50
+
+    def _generate(tick: int) -> int:
+        value = offset + 50 * math.sin(2 * math.pi * (tick + address) / 100)
+        return round(value / scale) & 0xFFFF
+
+    return _generate
+
+
+def _counting(address: int, word: int) -> Callable[[int], int]:
+    """Counts upwards from a different starting point per address, split across multiple registers"""
+
+    def _generate(tick: int) -> int:
+        value = address * 1000 + tick
+        return (value >> (word * 16)) & 0xFFFF
+
+    return _generate
+
+
+class SimulatedInverter:
+    """
+    Serves a SimulatorContext on a local port, from its own thread and event loop.
+
+    Use as a context manager, and connect to `host`.
+    """
+
+    def __init__(self, context: SimulatorContext, protocol: str = TCP) -> None:
+        self.context = context
+        self._framer = _FRAMERS[protocol]
+        self._server: Any = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._port: int | None = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), name="SimulatedInverter")
+
+    @property
+    def host(self) -> str:
+        assert self._port is not None, "Simulator not started"
+        return f"127.0.0.1:{self._port}"
+
+    def start(self) -> None:
+        self._thread.start()
+        self._started.wait()
+        if self._port is None:
+            self._thread.join()
+            raise RuntimeError("Simulator failed to start")
+
+    def stop(self) -> None:
+        if self._port is not None:
+            assert self._loop is not None
+            asyncio.run_coroutine_threadsafe(self._server.shutdown(), self._loop).result()
+        self._thread.join()
+
+    def __enter__(self) -> "SimulatedInverter":
+        self.start()
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.stop()
+
+    async def _serve(self) -> None:
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._server = ModbusTcpServer(
+                ModbusServerContext(slaves=self.context, single=True),
+                framer=self._framer,
+                address=("127.0.0.1", 0),
+            )
+            if not await self._server.listen():
+                return
+            self._port = self._server.transport.sockets[0].getsockname()[1]
+        finally:
+            self._started.set()
+        await self._server.serving
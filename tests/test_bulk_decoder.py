@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from custom_components.foxess_modbus.common.bulk_decoder import BulkDecoder
+from custom_components.foxess_modbus.common.register_decoder import RegisterDecoder
+
+
+def _decoders() -> list[RegisterDecoder]:
+    return [
+        RegisterDecoder([10], signed=False),
+        RegisterDecoder([10], signed=True),
+        RegisterDecoder([12, 11], signed=True),
+        RegisterDecoder([11, 12], signed=False),
+        RegisterDecoder([13, 14, 15], signed=True),
+        RegisterDecoder([20], signed=False),
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_reports_changed_values(use_numpy: bool) -> None:
+    decoder = BulkDecoder(_decoders(), use_numpy=use_numpy)
+    registers = {10: 0x8000, 11: 1, 12: 2, 13: 3, 14: 4, 15: 5}
+
+    # Everything has changed the first time round
+    assert decoder.changed(registers) == [0, 1, 2, 3, 4, 5]
+    assert decoder.changed(registers) == []
+
+    registers[12] = 0xFFFF
+    assert sorted(decoder.changed(registers)) == [2, 3]
+
+    registers[15] = 0
+    assert decoder.changed(registers) == [4]
+
+    # Reading a register which was missing changes the entity which reads it, and so does losing it again
+    registers[20] = 0
+    assert decoder.changed(registers) == [5]
+    del registers[20]
+    assert decoder.changed(registers) == [5]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_agrees_with_register_decoder(use_numpy: bool) -> None:
+    rng = random.Random(1)  # noqa: S311
+    decoders = _decoders()
+    bulk_decoder = BulkDecoder(decoders, use_numpy=use_numpy)
+    previous: list[int | None] | None = None
+    for _ in range(200):
+        registers = {address: rng.choice([0, 0x7FFF, 0x8000, 0xFFFF]) for address in (10, 11, 12, 13, 14, 15, 20)}
+        if rng.random() < 0.2:
+            del registers[rng.choice(list(registers))]
+
+        values = [x.raw(registers) for x in decoders]
+        expected = (
+            list(range(len(decoders))) if previous is None else [i for i, x in enumerate(values) if x != previous[i]]
+        )
+        assert sorted(bulk_decoder.changed(registers)) == expected
+        previous = values
@@ -59,6 +59,25 @@ async def test_creates_all_entities(hass: HomeAssistant) -> None:
                                 )
 
 
+async def test_entity_index_matches_first_scan(hass: HomeAssistant) -> None:
+    controller = MagicMock()
+    controller.hass = hass
+
+    for profile in INVERTER_PROFILES.values():
+        for connection_type in profile.connection_types:
+            controller.inverter_details = {
+                INVERTER_BASE: profile.model,
+                INVERTER_CONN: connection_type,
+                ENTITY_ID_PREFIX: "",
+                UNIQUE_ID_PREFIX: "",
+            }
+            for entity_type in [SensorEntity, BinarySensorEntity, SelectEntity, NumberEntity]:
+                # The first call scans every entity factory and builds the index, and the second uses the index
+                first = create_entities(entity_type, controller, filter_depends_on_other_entites=False)
+                second = create_entities(entity_type, controller, filter_depends_on_other_entites=False)
+                assert [x.unique_id for x in first] == [x.unique_id for x in second]
+
+
 def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
     if "model" in metafunc.fixturenames:
         inputs = []
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from custom_components.foxess_modbus.entities.modbus_fault_sensor import H3_PRO_KH_133_FAULTS
+from custom_components.foxess_modbus.entities.modbus_fault_sensor import STANDARD_FAULTS
+from custom_components.foxess_modbus.entities.modbus_fault_sensor import FaultSet
+
+
+def _decode_slowly(fault_set: FaultSet, values: list[int]) -> str:
+    faults = []
+    for i, value in enumerate(values):
+        for index, fault_code in enumerate(fault_set.faults[i]):
+            if fault_code is not None and (value & (1 << index)) > 0:
+                faults.append(fault_code)
+
+    if len(faults) == 0:
+        return "None"
+
+    to_remove: set[str] = set()
+    for fault in faults:
+        for mask in fault_set.masks.get(fault, []):
+            if mask in faults:
+                to_remove.add(mask)
+    for fault_to_remove in to_remove:
+        faults.remove(fault_to_remove)
+
+    return "; ".join(faults)
+
+
+@pytest.mark.parametrize("fault_set", [STANDARD_FAULTS, H3_PRO_KH_133_FAULTS])
+def test_decode_matches_bit_by_bit_decode(fault_set: FaultSet) -> None:
+    rng = random.Random(len(fault_set.faults))  # noqa: S311
+    num_registers = len(fault_set.faults)
+    cases = [[0] * num_registers, [0xFFFF] * num_registers]
+    cases += [
+        [1 << bit if i == register else 0 for i in range(num_registers)]
+        for register in range(num_registers)
+        for bit in range(16)
+    ]
+    cases += [[rng.choice([0, rng.randrange(0x10000)]) for _ in range(num_registers)] for _ in range(500)]
+    for values in cases:
+        assert fault_set.decode(values) == _decode_slowly(fault_set, values), values
+
+
+def test_masks() -> None:
+    assert STANDARD_FAULTS.decode([0b111, 0, 0, 0, 0, 0, 0]) == "Grid Lost Fault"
+    assert STANDARD_FAULTS.decode([0b110, 0, 0, 0, 0, 0, 0]) == "Grid Voltage Fault; Grid Frequency Fault"
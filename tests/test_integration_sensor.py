@@ -0,0 +1,62 @@
+import pytest
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import HomeAssistant
+
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.const import ROUND_SENSOR_VALUES
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.entities.modbus_integration_sensor import ModbusIntegrationSensor
+from custom_components.foxess_modbus.entities.modbus_sensor import ModbusSensor
+from custom_components.foxess_modbus.inverter_profiles import create_entities
+
+from .controller_helpers import create_client
+from .controller_helpers import create_controller
+from .controller_helpers import poll
+from .simulator import ProfileSimulatorContext
+from .simulator import SimulatedInverter
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+
+async def test_integrates_source_at_poll_times(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        # With the source sensor rounded, which shouldn't affect the integration
+        controller = create_controller(
+            hass, client, model=InverterModel.H1_G2, model_name=context.model_name, options={ROUND_SENSOR_VALUES: True}
+        )
+        entities = {
+            x.entity_description.key: x
+            for x in create_entities(SensorEntity, controller)
+            if x.entity_description.key in ("pv1_power", "pv1_energy_total")
+        }
+        source, energy = entities["pv1_power"], entities["pv1_energy_total"]
+        assert isinstance(source, ModbusSensor)
+        assert isinstance(energy, ModbusIntegrationSensor)
+
+        # Register the integration sensor first: the controller should still update it after its source
+        for entity in (energy, source):
+            entity.hass = hass
+            monkeypatch.setattr(entity, "schedule_update_ha_state", lambda *_args, **_kwargs: None)
+            controller.register_modbus_entity(entity)
+
+        samples = []
+        rounded = []
+        try:
+            for _ in range(4):
+                await poll(controller)
+                assert controller.last_poll_time is not None
+                # The source's value before rounding
+                value = source.decode_value(controller.register_values())
+                assert isinstance(value, int | float)
+                rounded.append(source.native_value)
+                samples.append((controller.last_poll_time, value))
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert [x[1] for x in samples] != rounded
+    expected = sum((t2 - t1) * (v1 + v2) / 2 for (t1, v1), (t2, v2) in zip(samples, samples[1:])) / 3600
+    assert energy.native_value == pytest.approx(round(expected, 3))
+    assert energy.extra_restore_state_data.native_value == pytest.approx(expected)
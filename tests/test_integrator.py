@@ -0,0 +1,44 @@
+import pytest
+
+from custom_components.foxess_modbus.common.integrator import LEFT
+from custom_components.foxess_modbus.common.integrator import RIGHT
+from custom_components.foxess_modbus.common.integrator import TRAPEZOIDAL
+from custom_components.foxess_modbus.common.integrator import Integrator
+
+
+@pytest.mark.parametrize(
+    ("method", "expected"), [(LEFT, 1 * 10 + 3 * 20), (RIGHT, 3 * 10 + 2 * 20), (TRAPEZOIDAL, 2 * 10 + 2.5 * 20)]
+)
+def test_methods(method: str, expected: float) -> None:
+    integrator = Integrator(method, unit_seconds=1, max_gap=60)
+    assert not integrator.add(100, 1)
+    assert integrator.add(110, 3)
+    assert integrator.add(130, 2)
+    assert integrator.total == pytest.approx(expected)
+
+
+def test_units() -> None:
+    integrator = Integrator(TRAPEZOIDAL, unit_seconds=3600, max_gap=3600, total=5)
+    integrator.add(0, 2)
+    integrator.add(1800, 2)
+    assert integrator.total == pytest.approx(6)
+
+
+def test_gaps() -> None:
+    integrator = Integrator(TRAPEZOIDAL, unit_seconds=1, max_gap=60)
+    integrator.add(0, 1)
+    # Too long since the last sample
+    assert not integrator.add(61, 1)
+    assert integrator.add(71, 1)
+    # No value
+    assert not integrator.add(81, None)
+    assert not integrator.add(91, 1)
+    assert integrator.add(101, 1)
+    # Same sample again
+    assert not integrator.add(101, 1)
+    assert integrator.total == pytest.approx(20)
+
+
+def test_rejects_unknown_method() -> None:
+    with pytest.raises(ValueError):
+        Integrator("simpson", unit_seconds=1, max_gap=1)
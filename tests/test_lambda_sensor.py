@@ -0,0 +1,114 @@
+from typing import Any
+
+import pytest
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import HomeAssistant
+
+from custom_components.foxess_modbus.common.publish_filter import ABSOLUTE_DEADBAND
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.const import PUBLISH_FILTERS
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.entities.modbus_lambda_sensor import ModbusLambdaSensor
+from custom_components.foxess_modbus.entities.modbus_sensor import ModbusSensor
+from custom_components.foxess_modbus.inverter_profiles import create_entities
+
+from .controller_helpers import create_client
+from .controller_helpers import create_controller
+from .controller_helpers import poll
+from .simulator import ProfileSimulatorContext
+from .simulator import SimulatedInverter
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+
+async def test_lambda_sensor_reads_sources_in_process(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        entities = {
+            x.entity_description.key: x
+            for x in create_entities(SensorEntity, controller, filter_depends_on_other_entites=False)
+            if x.entity_description.key in ("pv_power_now", "pv1_power", "pv2_power")
+        }
+        pv_power, pv1, pv2 = entities["pv_power_now"], entities["pv1_power"], entities["pv2_power"]
+        assert isinstance(pv_power, ModbusLambdaSensor)
+        assert isinstance(pv1, ModbusSensor)
+        assert isinstance(pv2, ModbusSensor)
+        assert pv_power.source_entity_keys == ["pv1_power", "pv2_power"]
+
+        # Register the derived sensor first: the controller should still update it after its sources
+        for entity in (pv_power, pv1, pv2):
+            entity.hass = hass
+            monkeypatch.setattr(entity, "schedule_update_ha_state", lambda *_args, **_kwargs: None)
+            controller.register_modbus_entity(entity)
+
+        try:
+            for _ in range(3):
+                await poll(controller)
+                pv1_power = pv1.native_value
+                pv2_power = pv2.native_value
+                assert isinstance(pv1_power, int | float)
+                assert isinstance(pv2_power, int | float)
+                assert pv_power.native_value == pytest.approx(pv1_power + pv2_power)
+        finally:
+            controller.unload()
+            await client.close()
+
+    # A source which hasn't been added to hass (because it's disabled) is skipped
+    controller.remove_modbus_entity(pv2)
+    pv_power.update_callback(set())
+    assert pv_power.native_value == pytest.approx(pv1.native_value)
+
+
+async def test_lambda_sensor_reads_unfiltered_sources(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        # Power sensors only publish their first value
+        controller = create_controller(
+            hass,
+            client,
+            model=InverterModel.H1_G2,
+            model_name=context.model_name,
+            options={PUBLISH_FILTERS: {"power": {ABSOLUTE_DEADBAND: 1e9}}},
+        )
+        entities = {
+            x.entity_description.key: x
+            for x in create_entities(SensorEntity, controller, filter_depends_on_other_entites=False)
+            if x.entity_description.key in ("pv_power_now", "pv1_power", "pv2_power")
+        }
+        pv_power, pv1, pv2 = entities["pv_power_now"], entities["pv1_power"], entities["pv2_power"]
+        assert isinstance(pv_power, ModbusLambdaSensor)
+        assert isinstance(pv1, ModbusSensor)
+        assert isinstance(pv2, ModbusSensor)
+
+        published: dict[str, int] = {}
+        for entity in (pv_power, pv1, pv2):
+            entity.hass = hass
+            key = entity.entity_description.key
+            published[key] = 0
+
+            def _publish(*_args: Any, key: str = key, **_kwargs: Any) -> None:
+                published[key] += 1
+
+            monkeypatch.setattr(entity, "schedule_update_ha_state", _publish)
+            controller.register_modbus_entity(entity)
+
+        pv1_values = []
+        try:
+            for _ in range(3):
+                await poll(controller)
+                pv1_power = pv1.native_value
+                pv2_power = pv2.native_value
+                assert isinstance(pv1_power, int | float)
+                assert isinstance(pv2_power, int | float)
+                pv1_values.append(pv1_power)
+                assert pv_power.native_value == pytest.approx(pv1_power + pv2_power)
+        finally:
+            controller.unload()
+            await client.close()
+
+    # The sources' values kept changing, even though they weren't published
+    assert len(set(pv1_values)) == 3
+    assert published == {"pv_power_now": 1, "pv1_power": 1, "pv2_power": 1}
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from custom_components.foxess_modbus.common.moving_average import MovingAverage
+
+
+def test_fills_when_empty() -> None:
+    average = MovingAverage(4)
+    assert average.average is None
+    assert average.add(2.0) == 2.0
+    assert len(average) == 4
+    assert average.add(6.0) == 3.0
+
+    average.clear()
+    assert average.average is None
+    assert average.add(10.0) == 10.0
+
+
+def test_fill() -> None:
+    average = MovingAverage(3)
+    average.add(1.0)
+    average.add(2.0)
+    average.fill(5.0)
+    assert average.average == 5.0
+    assert average.add(8.0) == 6.0
+
+
+@pytest.mark.parametrize("window", [1, 2, 6, 10])
+def test_matches_naive_average(window: int) -> None:
+    rng = random.Random(window)  # noqa: S311
+    average = MovingAverage(window)
+    first = rng.uniform(-1000, 1000)
+    values = [first] * window
+    average.add(first)
+    for _ in range(1000):
+        value = rng.uniform(-1000, 1000)
+        values = [*values[1:], value]
+        assert average.add(value) == pytest.approx(sum(values) / window)
+
+
+def test_rejects_empty_window() -> None:
+    with pytest.raises(ValueError):
+        MovingAverage(0)
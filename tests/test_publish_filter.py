@@ -0,0 +1,60 @@
+from typing import Any
+
+from custom_components.foxess_modbus.common.publish_filter import ABSOLUTE_DEADBAND
+from custom_components.foxess_modbus.common.publish_filter import RELATIVE_DEADBAND
+from custom_components.foxess_modbus.common.publish_filter import PublishFilter
+from custom_components.foxess_modbus.common.publish_filter import create_publish_filter
+
+
+def test_absolute_deadband() -> None:
+    publish_filter = PublishFilter(absolute_deadband=10)
+    assert publish_filter.update(100, 0)
+    assert not publish_filter.update(109, 1)
+    assert not publish_filter.update(91, 2)
+    assert publish_filter.update(110, 3)
+    assert not publish_filter.update(101, 4)
+    # Non-numeric values always get through
+    assert publish_filter.update(None, 5)
+    assert publish_filter.update(105, 6)
+
+
+def test_relative_deadband() -> None:
+    publish_filter = PublishFilter(relative_deadband=0.1)
+    assert publish_filter.update(1000, 0)
+    assert not publish_filter.update(1099, 1)
+    assert publish_filter.update(1100, 2)
+    assert not publish_filter.update(1000, 3)
+    assert publish_filter.update(989, 4)
+
+
+def test_intervals() -> None:
+    publish_filter = PublishFilter(absolute_deadband=10, min_interval=5, max_interval=30, heartbeat=60)
+    assert publish_filter.update(100, 0)
+    # Too soon
+    assert not publish_filter.update(200, 1)
+    assert publish_filter.update(200, 5)
+    # Held back by the deadband until max_interval
+    assert not publish_filter.update(201, 10)
+    assert publish_filter.update(201, 35)
+    # Unchanged, until the heartbeat
+    assert not publish_filter.update(201, 94)
+    assert publish_filter.update(201, 95)
+
+
+def test_no_deadband_publishes_changes() -> None:
+    publish_filter = PublishFilter(min_interval=10)
+    assert publish_filter.update(1, 0)
+    assert not publish_filter.update(1, 20)
+    assert publish_filter.update(2, 21)
+
+
+def test_create_publish_filter() -> None:
+    publish_filters: dict[str, dict[str, Any]] = {"power": {ABSOLUTE_DEADBAND: 0.05}, "other": {RELATIVE_DEADBAND: 5}}
+    assert create_publish_filter(publish_filters, "power") is not None
+    assert create_publish_filter(publish_filters, "voltage") is None
+    other = create_publish_filter(publish_filters, "duration")
+    assert other is not None
+    assert other.update(100, 0)
+    assert not other.update(104, 1)
+    assert other.update(105, 2)
+    assert create_publish_filter({}, None) is None
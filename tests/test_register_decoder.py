@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from custom_components.foxess_modbus.common.register_decoder import RegisterDecoder
+from custom_components.foxess_modbus.common.register_decoder import register_decoder
+
+
+def _decode_slowly(values: list[int], signed: bool) -> int:
+    value = 0
+    for i, x in enumerate(values):
+        value |= x << (i * 16)
+    if signed:
+        sign_bit = 1 << (len(values) * 16 - 1)
+        value = (value & (sign_bit - 1)) - (value & sign_bit)
+    return value
+
+
+@pytest.mark.parametrize("num_registers", [1, 2, 3, 4])
+@pytest.mark.parametrize("signed", [True, False])
+def test_register_decoder(num_registers: int, signed: bool) -> None:
+    rng = random.Random(num_registers)  # noqa: S311
+    decode = register_decoder(num_registers, signed)
+    edges = [[0] * num_registers, [0xFFFF] * num_registers, [0] * (num_registers - 1) + [0x8000]]
+    randoms = [[rng.randrange(0x10000) for _ in range(num_registers)] for _ in range(100)]
+    for values in edges + randoms:
+        assert decode(values) == _decode_slowly(values, signed), values
+
+
+def test_entity_decoder() -> None:
+    decoder = RegisterDecoder([11, 10], signed=True, scale=0.1, post_process=lambda x: x + 1)
+    assert decoder({10: 0xFFFF, 11: 0xFFFF}) == pytest.approx(0.9)
+    assert decoder.raw({10: 0xFFFF, 11: 0xFFFF}) == -1
+    assert decoder({11: 0}) is None
+
+    decoder = RegisterDecoder([10], signed=False)
+    assert decoder({10: 0xFFFF}) == 0xFFFF
+    assert decoder({}) is None
@@ -0,0 +1,121 @@
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.foxess_modbus.common.register_history import RegisterHistory
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.const import HISTORY_REGISTERS
+from custom_components.foxess_modbus.const import MAX_HISTORY_REGISTERS
+from custom_components.foxess_modbus.const import TCP
+
+from .controller_helpers import create_client
+from .controller_helpers import create_controller
+from .controller_helpers import poll
+from .simulator import ProfileSimulatorContext
+from .simulator import SimulatedInverter
+
+
+def test_returns_samples_oldest_first() -> None:
+    history = RegisterHistory([10, 11], capacity=5)
+    for i in range(3):
+        history.record(100 + i, {10: i, 11: i * 10})
+
+    assert len(history) == 3
+    assert history.query([11, 10]) == ([100, 101, 102], {11: [0, 10, 20], 10: [0, 1, 2]})
+
+
+def test_overwrites_oldest_samples_when_full() -> None:
+    history = RegisterHistory([10], capacity=3)
+    for i in range(7):
+        history.record(i, {10: i})
+
+    assert len(history) == 3
+    assert history.query([10]) == ([4, 5, 6], {10: [4, 5, 6]})
+
+
+def test_query_time_range_is_inclusive() -> None:
+    history = RegisterHistory([10], capacity=4)
+    for i in range(6):
+        history.record(i * 10, {10: i})
+
+    assert history.query([10], start=25, end=40) == ([30, 40], {10: [3, 4]})
+    assert history.query([10], start=40) == ([40, 50], {10: [4, 5]})
+    assert history.query([10], end=20) == ([20], {10: [2]})
+    assert history.query([10], start=60) == ([], {10: []})
+
+
+def test_clock_going_backwards_keeps_timestamps_in_order() -> None:
+    history = RegisterHistory([10], capacity=3)
+    for i, timestamp in enumerate([100, 110, 50, 60, 120]):
+        history.record(timestamp, {10: i})
+
+    # The samples taken after the clock was stepped back are recorded at the time of the sample before
+    assert history.query([10]) == ([110, 110, 120], {10: [2, 3, 4]})
+    assert history.query([10], start=105, end=115) == ([110, 110], {10: [2, 3]})
+
+
+def test_missing_registers_are_none() -> None:
+    history = RegisterHistory([10, 11], capacity=2)
+    history.record(1, {10: 0xFFFF})
+
+    assert history.query([10, 11]) == ([1], {10: [0xFFFF], 11: [None]})
+
+
+def test_query_unrecorded_register_raises() -> None:
+    history = RegisterHistory([10], capacity=2)
+    with pytest.raises(KeyError):
+        history.query([10, 12])
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_controller_records_history_on_poll(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        # 39280 is PV1 power, which an entity also reads. 39281 isn't read by any entity
+        controller = create_controller(
+            hass,
+            client,
+            model=InverterModel.H1_G2,
+            model_name=context.model_name,
+            options={HISTORY_REGISTERS: [39280, 39281]},
+        )
+        try:
+            for _ in range(3):
+                await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    history = controller.history
+    assert history is not None
+    timestamps, values = history.query([39280, 39281])
+    assert len(timestamps) == 3
+    assert all(x is not None for column in values.values() for x in column)
+    registers = controller.register_values()
+    assert values[39280][-1] == registers[39280]
+    assert values[39281][-1] == registers[39281]
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_controller_caps_history_registers(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        # e.g. a config saved before the options flow checked this
+        controller = create_controller(
+            hass,
+            client,
+            model=InverterModel.H1_G2,
+            model_name=context.model_name,
+            options={HISTORY_REGISTERS: list(range(50000, 50000 + MAX_HISTORY_REGISTERS * 2))},
+        )
+        try:
+            await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    history = controller.history
+    assert history is not None
+    assert list(history.addresses) == list(range(50000, 50000 + MAX_HISTORY_REGISTERS))
+    assert 50000 + MAX_HISTORY_REGISTERS not in controller.register_values()
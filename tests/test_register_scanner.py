@@ -0,0 +1,123 @@
+import pytest
+
+from custom_components.foxess_modbus.common.register_scanner import ReadFunc
+from custom_components.foxess_modbus.common.register_scanner import scan_register_range
+
+
+def _device(
+    invalid_ranges: list[tuple[int, int]], failing_addresses: set[int] | None = None
+) -> tuple[ReadFunc, list[tuple[int, int]]]:
+    reads: list[tuple[int, int]] = []
+
+    async def _read(address: int, num_registers: int) -> list[int] | None:
+        reads.append((address, num_registers))
+        end_address = address + num_registers - 1
+        if failing_addresses is not None and any(address <= x <= end_address for x in failing_addresses):
+            raise TimeoutError("No response")
+        if any(start <= end_address and address <= end for start, end in invalid_ranges):
+            return None
+        return [x & 0xFFFF for x in range(address, address + num_registers)]
+
+    return _read, reads
+
+
+def _merge(*ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(x for y in ranges for x in y):
+        if merged and merged[-1][1] + 1 == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+async def test_finds_valid_and_invalid_ranges(concurrency: int) -> None:
+    invalid_ranges = [(1005, 1005), (1100, 1349), (1500, 1999)]
+    read, reads = _device(invalid_ranges)
+
+    result = await scan_register_range(read, 1000, 1999, max_block=50, concurrency=concurrency)
+
+    assert _merge(result.invalid_ranges, result.unconfirmed_ranges) == invalid_ranges
+    assert [(start, start + len(values) - 1) for start, values in result.valid_ranges] == [
+        (1000, 1004),
+        (1006, 1099),
+        (1350, 1499),
+    ]
+    assert all(values == list(range(start, start + len(values))) for start, values in result.valid_ranges)
+    assert result.transactions == len(reads)
+    # Large invalid ranges are skipped over, rather than probed one register at a time
+    assert len(reads) < 100
+    # ... so the registers which were skipped over are reported as unconfirmed, and only the ones which were read are
+    # reported as invalid
+    assert result.unconfirmed_ranges
+    assert (1005, 1005) in result.invalid_ranges
+    assert result.invalid_ranges[1] == (1100, 1101)
+    assert not any(start <= 1102 <= end for start, end in result.invalid_ranges)
+    assert result.error is None
+
+
+async def test_confirm_invalid_reads_every_invalid_register() -> None:
+    invalid_ranges = [(1005, 1005), (1100, 1349), (1500, 1999)]
+    read, _ = _device(invalid_ranges)
+
+    result = await scan_register_range(read, 1000, 1999, max_block=50, confirm_invalid=True)
+
+    assert result.invalid_ranges == invalid_ranges
+    assert result.unconfirmed_ranges == []
+
+
+async def test_entirely_valid_range_uses_max_block() -> None:
+    read, reads = _device([])
+
+    result = await scan_register_range(read, 0, 999, max_block=100)
+
+    assert result.valid_ranges == [(0, list(range(1000)))]
+    assert result.invalid_ranges == []
+    assert reads == [(x, 100) for x in range(0, 1000, 100)]
+
+
+async def test_readable_register_between_probes_is_unconfirmed() -> None:
+    # With max_block 1, 100 is probed, then 101, 103, 107, 115, 131 and so on. 110 sits between two of those probes
+    read, _ = _device([(100, 109), (111, 199)])
+
+    result = await scan_register_range(read, 0, 299, max_block=1)
+
+    assert _merge(result.invalid_ranges, result.unconfirmed_ranges) == [(100, 199)]
+    assert any(start <= 110 <= end for start, end in result.unconfirmed_ranges)
+    assert not any(start <= 110 <= end for start, end in result.invalid_ranges)
+    assert not any(start <= 100 <= end or start <= 199 <= end for start, end in result.unconfirmed_ranges)
+
+    result = await scan_register_range(read, 0, 299, max_block=1, confirm_invalid=True)
+
+    assert result.invalid_ranges == [(100, 109), (111, 199)]
+    assert (110, [110]) in result.valid_ranges
+
+
+async def test_other_errors_are_unknown_and_scan_carries_on() -> None:
+    # 563 is one of the probes made while skipping over the invalid range
+    read, _ = _device([(500, 599)], failing_addresses={250, 563})
+
+    result = await scan_register_range(read, 0, 999, max_block=50)
+
+    # The whole block which failed is unknown, rather than spending more time on something which may be timing out
+    assert result.unknown_ranges == [(250, 299), (563, 563)]
+    assert _merge(result.invalid_ranges, result.unconfirmed_ranges) == [(500, 562), (564, 599)]
+    assert [(start, start + len(values) - 1) for start, values in result.valid_ranges] == [
+        (0, 249),
+        (300, 499),
+        (600, 999),
+    ]
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+async def test_gives_up_after_consecutive_failures(concurrency: int) -> None:
+    # e.g. the inverter went offline part way through
+    read, reads = _device([], failing_addresses=set(range(300, 1000)))
+
+    result = await scan_register_range(read, 0, 999, max_block=50, concurrency=concurrency)
+
+    assert result.error is not None
+    assert _merge(result.unknown_ranges) == [(300, 999)]
+    # Each worker has at most one read in flight when the scan gives up
+    assert len([x for x in reads if x[0] >= 300]) < 3 + concurrency
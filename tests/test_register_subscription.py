@@ -0,0 +1,157 @@
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import issue_registry
+
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.common.types import RegisterPollType
+from custom_components.foxess_modbus.const import DOMAIN
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.modbus_controller import RegisterSubscription
+
+from .controller_helpers import EntityListener
+from .controller_helpers import create_client
+from .controller_helpers import create_controller
+from .controller_helpers import poll
+from .simulator import ProfileSimulatorContext
+from .simulator import SimulatedInverter
+
+
+def test_sends_only_changes() -> None:
+    sent: list[dict[int, int | None]] = []
+    subscription = RegisterSubscription([11, 10, 11], sent.append)
+
+    # Everything is sent the first time, including registers without a value
+    subscription.send_changes({10: 1, 12: 5})
+    subscription.send_changes({10: 1, 12: 6})
+    subscription.send_changes({10: 2, 11: 3})
+    subscription.send_changes({10: 2})
+
+    assert sent == [{10: 1, 11: None}, {10: 2, 11: 3}, {11: None}]
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_controller_sends_poll_results(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        sent: list[dict[int, int | None]] = []
+        try:
+            # The first poll also reads the registers which are only read on connection
+            await poll(controller)
+            transactions = controller.transaction_stats.transactions
+            await poll(controller)
+            transactions_per_poll = controller.transaction_stats.transactions - transactions
+
+            # 39280 is PV1 power, which an entity also reads. 39281 isn't read by any entity, but sits next to it
+            unsubscribe = controller.subscribe_registers([39280, 39281], sent.append)
+            transactions = controller.transaction_stats.transactions
+            await poll(controller)
+            assert controller.transaction_stats.transactions - transactions == transactions_per_poll
+
+            unsubscribe()
+            await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert len(sent) == 1
+    assert set(sent[0]) == {39280, 39281}
+    assert 39281 not in controller.register_values()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_unsubscribing_restores_poll_type(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        try:
+            listener = next(
+                x
+                for x in controller._update_listeners  # noqa: SLF001
+                if isinstance(x, EntityListener) and x.register_poll_type == RegisterPollType.ON_CONNECTION
+            )
+            address = listener.addresses[0]
+
+            unsubscribe = controller.subscribe_registers([address], lambda _: None)
+            assert controller._data[address].poll_type == RegisterPollType.PERIODICALLY  # noqa: SLF001
+            unsubscribe()
+            unsubscribe()
+            assert controller._data[address].poll_type == RegisterPollType.ON_CONNECTION  # noqa: SLF001
+
+            # Another entity which only wants the register on connection can use it again
+            controller.register_modbus_entity(EntityListener(listener.entity))
+        finally:
+            controller.unload()
+            await client.close()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_unload_cancels_subscriptions(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        cancelled: list[bool] = []
+        try:
+            unsubscribe = controller.subscribe_registers([39280, 39281], lambda _: None, lambda: cancelled.append(True))
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert cancelled == [True]
+    assert 39281 not in controller.register_values()
+    # The subscriber doesn't need to know that the subscription already ended
+    unsubscribe()
+    assert cancelled == [True]
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_subscriptions_cant_add_too_many_registers(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        try:
+            # Nothing else polls these
+            controller.subscribe_registers(range(50000, 50060), lambda _: None)
+            with pytest.raises(ValueError, match="at most"):
+                controller.subscribe_registers(range(50050, 50150), lambda _: None)
+            # Registers which are polled anyway don't count
+            controller.subscribe_registers([39280, *range(50060, 50100)], lambda _: None)
+        finally:
+            controller.unload()
+            await client.close()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_subscribed_register_which_cant_be_read_isnt_reported(hass: HomeAssistant) -> None:
+    # The inverter rejects 50001, which is well away from anything which an entity reads
+    context = ProfileSimulatorContext(InverterModel.H1_G2, invalid_ranges=[(50001, 50001)])
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        sent: list[dict[int, int | None]] = []
+        try:
+            await poll(controller)
+            transactions = controller.transaction_stats.transactions
+            await poll(controller)
+            transactions_per_poll = controller.transaction_stats.transactions - transactions
+
+            controller.subscribe_registers([50000, 50001], sent.append)
+            await poll(controller)
+
+            # It isn't tried again: the poll just picks up 50000
+            transactions = controller.transaction_stats.transactions
+            await poll(controller)
+            assert controller.transaction_stats.transactions - transactions == transactions_per_poll + 1
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert sent[0][50000] is not None
+    assert sent[0][50001] is None
+    # It's the subscriber's problem, not the integration's
+    assert controller.diagnostics()["detected_invalid_ranges"] == []
+    assert not any(domain == DOMAIN for domain, _issue_id in issue_registry.async_get(hass).issues)
@@ -0,0 +1,478 @@
+import asyncio
+from datetime import timedelta
+from typing import Any
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.foxess_modbus.client import connection_handover
+from custom_components.foxess_modbus.client.modbus_client import ModbusClient
+from custom_components.foxess_modbus.client.modbus_client import ModbusClientFailedError
+from custom_components.foxess_modbus.common.exceptions import AutoconnectFailedError
+from custom_components.foxess_modbus.common.exceptions import UnsupportedInverterError
+from custom_components.foxess_modbus.common.types import ConnectionType
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.common.types import RegisterType
+from custom_components.foxess_modbus.const import MAX_READ
+from custom_components.foxess_modbus.const import RTU_OVER_TCP
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.const import UDP
+from custom_components.foxess_modbus.entities.modbus_charge_period_sensors import is_time_value_valid
+from custom_components.foxess_modbus.entities.modbus_charge_period_sensors import parse_time_value
+from custom_components.foxess_modbus.inverter_profiles import INVERTER_PROFILES
+from custom_components.foxess_modbus.inverter_profiles import Version
+from custom_components.foxess_modbus.modbus_controller import ModbusController
+from custom_components.foxess_modbus.vendor import pymodbus
+from custom_components.foxess_modbus.vendor.pymodbus import ExceptionResponse
+from custom_components.foxess_modbus.vendor.pymodbus import ModbusExceptions
+
+from .controller_helpers import adapter_config
+from .controller_helpers import create_client
+from .controller_helpers import create_controller
+from .controller_helpers import poll
+from .simulator import ProfileSimulatorContext
+from .simulator import SimulatedInverter
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "connection_type" in metafunc.fixturenames:
+        inputs = []
+        for model, profile in INVERTER_PROFILES.items():
+            for connection_type, connection_type_profile in profile.connection_types.items():
+                for version in connection_type_profile.versions:
+                    v = "latest" if version is None else f"v{version}"
+                    inputs.append((model, connection_type, v))
+
+        metafunc.parametrize(("model", "connection_type", "version"), inputs)
+
+
+@pytest.mark.parametrize("model", list(INVERTER_PROFILES))
+async def test_autodetect(hass: HomeAssistant, model: InverterModel) -> None:
+    context = ProfileSimulatorContext(model)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        try:
+            result = await ModbusController.autodetect(client, 247, adapter_config(TCP))
+        finally:
+            await client.close()
+
+    assert result == (model, context.model_name)
+
+
+async def test_autodetect_reads_model_in_one_request(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        try:
+            # The model block fits into the adapter's max_read
+            result = await ModbusController.autodetect(client, 247, adapter_config(TCP))
+        finally:
+            await client.close()
+
+    assert result == (InverterModel.H1_G2, context.model_name)
+    assert client.stats.transactions == 1
+
+
+@pytest.mark.parametrize("ignore_large_reads", [False, True])
+async def test_autodetect_reads_model_in_reads_of_max_read(hass: HomeAssistant, ignore_large_reads: bool) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2, max_read=8, ignore_large_reads=ignore_large_reads)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        try:
+            # Well within the time it would take a read which gets no answer to time out
+            async with asyncio.timeout(1):
+                result = await ModbusController.autodetect(client, 247, {**adapter_config(TCP), MAX_READ: 8})
+        finally:
+            await client.close()
+
+    assert result == (InverterModel.H1_G2, context.model_name)
+    # The block was read in two halves, without first trying to read it all at once
+    assert client.stats.transactions == 2
+    assert client.stats.errors == 0
+
+
+async def test_autodetect_can_leave_client_connected(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=context.model, model_name=context.model_name)
+        try:
+            await ModbusController.autodetect(client, 247, adapter_config(TCP), close_client=False)
+            # The model block fits into a single read
+            assert client.stats.transactions == 1
+            await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    # The controller carried on using autodetect's connection
+    assert controller.poll_stats.successful_polls == 1
+    assert client.stats.connects == 1
+
+
+async def test_connection_handover(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        connection_handover.hand_over(hass, TCP, simulator.host, client)
+        assert connection_handover.take_over(hass, UDP, simulator.host, 1) is None
+        assert connection_handover.take_over(hass, TCP, simulator.host, 1) is client
+        assert connection_handover.take_over(hass, TCP, simulator.host, 1) is None
+
+        # A client with the wrong number of connections isn't handed over
+        connection_handover.hand_over(hass, TCP, simulator.host, client)
+        assert connection_handover.take_over(hass, TCP, simulator.host, 2) is None
+
+        # Nor is one which nothing took over in time
+        connection_handover.hand_over(hass, TCP, simulator.host, client)
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(hours=1))
+        await hass.async_block_till_done()
+        assert connection_handover.take_over(hass, TCP, simulator.host, 1) is None
+
+
+async def test_autodetect_first_prefers_first_candidate(hass: HomeAssistant) -> None:
+    slow_context = ProfileSimulatorContext(InverterModel.H1_G1, latency=0.2)
+    context = ProfileSimulatorContext(InverterModel.H3)
+    with SimulatedInverter(slow_context) as slow_simulator, SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        result = await ModbusController.autodetect_first(
+            [
+                (create_client(hass, slow_simulator.host, TCP), 247, adapter_config(TCP)),
+                (client, 247, adapter_config(TCP)),
+            ],
+        )
+
+    # The first candidate answered, so the second wasn't tried, even though it would have answered sooner
+    assert result == (0, InverterModel.H1_G1, slow_context.model_name)
+    assert client.stats.transactions == 0
+
+
+async def test_autodetect_first_stops_when_unable_to_connect(hass: HomeAssistant) -> None:
+    dead_context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(dead_context) as dead_simulator:
+        dead_host = dead_simulator.host
+    context = ProfileSimulatorContext(InverterModel.H3)
+    with SimulatedInverter(context) as simulator, pytest.raises(AutoconnectFailedError) as ex_info:
+        await ModbusController.autodetect_first(
+            [
+                # Nothing is listening on this any more
+                (create_client(hass, dead_host, TCP), 247, adapter_config(TCP)),
+                (create_client(hass, simulator.host, TCP), 247, adapter_config(TCP)),
+            ],
+        )
+
+    # The other candidates normally go to the same host, so wouldn't do any better
+    assert isinstance(ex_info.value.__cause__, pymodbus.ConnectionException)
+    assert context.num_requests == 0
+
+
+def _fake_autodetect(
+    monkeypatch: pytest.MonkeyPatch, delays: dict[str, float], matches: set[str]
+) -> list[tuple[str, str]]:
+    """
+    Replaces autodetect with one which takes delays[protocol] seconds, then matches if the protocol is in matches.
+    Returns a list of the (event, protocol) pairs which happen
+    """
+    events: list[tuple[str, str]] = []
+
+    async def _autodetect(
+        client: ModbusClient, _slave: int, _adapter_config: dict[str, Any], **_kwargs: Any
+    ) -> tuple[str, str]:
+        events.append(("start", client.protocol))
+        try:
+            await asyncio.sleep(delays[client.protocol])
+        except asyncio.CancelledError:
+            events.append(("cancel", client.protocol))
+            raise
+        events.append(("end", client.protocol))
+        if client.protocol in matches:
+            return InverterModel.H3, "H3-10.0-E"
+        raise AutoconnectFailedError([]) from TimeoutError("No answer")
+
+    monkeypatch.setattr(ModbusController, "autodetect", staticmethod(_autodetect))
+    return events
+
+
+async def test_autodetect_first_falls_back_in_turn(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> None:
+    events = _fake_autodetect(monkeypatch, {TCP: 0.05, RTU_OVER_TCP: 0}, {RTU_OVER_TCP})
+
+    result = await ModbusController.autodetect_first(
+        [(create_client(hass, "127.0.0.1:502", x), 247, adapter_config(x)) for x in [TCP, RTU_OVER_TCP]]
+    )
+
+    assert result == (1, InverterModel.H3, "H3-10.0-E")
+    # Both go over TCP to the same adapter, so they mustn't be tried at once
+    assert events == [("start", TCP), ("end", TCP), ("start", RTU_OVER_TCP), ("end", RTU_OVER_TCP)]
+
+
+async def test_autodetect_first_races_udp_against_tcp(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> None:
+    events = _fake_autodetect(monkeypatch, {TCP: 10, UDP: 0}, {UDP})
+
+    result = await ModbusController.autodetect_first(
+        [(create_client(hass, "127.0.0.1:502", x), 247, adapter_config(x)) for x in [TCP, UDP]]
+    )
+
+    assert result == (1, InverterModel.H3, "H3-10.0-E")
+    assert events == [("start", TCP), ("start", UDP), ("end", UDP), ("cancel", TCP)]
+
+
+async def test_autodetect_first_gives_up_after_timeout(hass: HomeAssistant, monkeypatch: pytest.MonkeyPatch) -> None:
+    events = _fake_autodetect(monkeypatch, {TCP: 10, RTU_OVER_TCP: 0}, {RTU_OVER_TCP})
+
+    with pytest.raises(AutoconnectFailedError) as ex_info:
+        await ModbusController.autodetect_first(
+            [(create_client(hass, "127.0.0.1:502", x), 247, adapter_config(x)) for x in [TCP, RTU_OVER_TCP]],
+            timeout=0.1,
+        )
+
+    assert isinstance(ex_info.value.__cause__, TimeoutError)
+    assert events == [("start", TCP), ("cancel", TCP)]
+
+
+async def test_autodetect_first_stops_at_unsupported_inverter(hass: HomeAssistant) -> None:
+    unsupported_context = ProfileSimulatorContext(InverterModel.H1_G2, model_name="XYZ-5.0")
+    context = ProfileSimulatorContext(InverterModel.H3)
+    with (
+        SimulatedInverter(unsupported_context) as unsupported_simulator,
+        SimulatedInverter(context) as simulator,
+        pytest.raises(AutoconnectFailedError) as ex_info,
+    ):
+        await ModbusController.autodetect_first(
+            [
+                (create_client(hass, unsupported_simulator.host, TCP), 247, adapter_config(TCP)),
+                (create_client(hass, simulator.host, TCP), 247, adapter_config(TCP)),
+            ],
+        )
+
+    # Something answered, so that's the inverter: don't go on to guess at others
+    assert isinstance(ex_info.value.__cause__, UnsupportedInverterError)
+    assert context.num_requests == 0
+
+
+async def test_autodetect_first_raises_first_candidates_error(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        host = simulator.host
+    # Nothing is listening on either of these any more
+    with pytest.raises(AutoconnectFailedError) as ex_info:
+        await ModbusController.autodetect_first(
+            [
+                (create_client(hass, host, TCP), 247, adapter_config(TCP)),
+                (create_client(hass, host, TCP), 1, adapter_config(TCP)),
+            ],
+        )
+
+    assert ex_info.value.__cause__ is not None
+
+
+async def test_poll(hass: HomeAssistant, model: InverterModel, connection_type: ConnectionType, version: str) -> None:
+    v = None if version == "latest" else Version.parse(version.lstrip("v"))
+    context = ProfileSimulatorContext(model, connection_type, v)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(
+            hass, client, model=model, model_name=context.model_name, connection_type=connection_type, version=v
+        )
+        try:
+            await poll(controller)
+            await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    diagnostics = controller.diagnostics()
+    assert diagnostics["poll_stats"]["successful_polls"] == 2
+    # The read plan shouldn't stray into any of the profile's invalid ranges
+    assert diagnostics["detected_invalid_ranges"] == []
+    # Every register which the simulator changes should have been read
+    assert all(controller.read(address, signed=False) is not None for address in context.addresses)
+
+
+async def test_charge_periods_hold_valid_times(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        try:
+            await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert len(controller.charge_periods) > 0
+    for charge_period in controller.charge_periods:
+        start = controller.read(charge_period.addresses.period_start_address, signed=False)
+        end = controller.read(charge_period.addresses.period_end_address, signed=False)
+        assert start is not None and end is not None
+        assert is_time_value_valid(start) and is_time_value_valid(end)
+        assert parse_time_value(start) < parse_time_value(end)
+
+
+async def test_invalid_range_returns_illegal_address(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G1, ConnectionType.AUX)
+    connection_type_profile = INVERTER_PROFILES[InverterModel.H1_G1].connection_types[ConnectionType.AUX]
+    start, _end = connection_type_profile.special_registers.invalid_register_ranges[0]
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        try:
+            # Reads which end just before the invalid range are fine, but not those which overlap it
+            assert len(await client.read_registers(start - 10, 10, context.register_type, 247)) == 10
+            with pytest.raises(ModbusClientFailedError) as ex_info:
+                await client.read_registers(start - 10, 11, context.register_type, 247)
+        finally:
+            await client.close()
+
+    assert isinstance(ex_info.value.response, ExceptionResponse)
+    assert ex_info.value.response.exception_code == ModbusExceptions.IllegalAddress
+
+
+async def test_read_registers_avoids_invalid_ranges(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G1, ConnectionType.AUX)
+    connection_type_profile = INVERTER_PROFILES[InverterModel.H1_G1].connection_types[ConnectionType.AUX]
+    start, end = connection_type_profile.special_registers.invalid_register_ranges[0]
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G1, model_name=context.model_name)
+        try:
+            transactions = controller.transaction_stats.transactions
+            values = await controller.read_registers(range(start - 100, end + 101), context.register_type)
+            transactions = controller.transaction_stats.transactions - transactions
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert list(values) == list(range(start - 100, end + 101))
+    assert all((values[x] is None) == (start <= x <= end) for x in values)
+    # The registers either side of the invalid range are read in chunks of max_read, without any failed reads
+    max_read = controller.diagnostics()["max_read"]
+    assert transactions == -(-100 // max_read) * 2
+
+
+async def test_read_registers_only_retries_requested_registers(hass: HomeAssistant) -> None:
+    # This adapter rejects reads of more than one register
+    context = ProfileSimulatorContext(InverterModel.H1_G2, max_read=1)
+    other_register_type = RegisterType.INPUT if context.register_type == RegisterType.HOLDING else RegisterType.HOLDING
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        try:
+            transactions = controller.transaction_stats.transactions
+            # These are read together, bridging the gap between them
+            values = await controller.read_registers([11000, 11005], other_register_type)
+            transactions = controller.transaction_stats.transactions - transactions
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert list(values) == [11000, 11005]
+    assert all(x is not None for x in values.values())
+    # The read which was rejected is followed by reads of just the registers which were asked for
+    assert transactions == 3
+
+
+async def test_read_registers_serves_fresh_polled_values(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H1_G2, model_name=context.model_name)
+        # 39280 is PV1 power, which is polled. 39281 isn't
+        try:
+            await poll(controller)
+            polled = controller.register_values()[39280]
+
+            transactions = controller.transaction_stats.transactions
+            cached = await controller.read_registers([39280], context.register_type, max_age=60)
+            assert controller.transaction_stats.transactions == transactions
+
+            partly_cached = await controller.read_registers([39280, 39281], context.register_type, max_age=60)
+            assert controller.transaction_stats.transactions == transactions + 1
+
+            # Values which are too old are read again
+            too_old = await controller.read_registers([39280], context.register_type, max_age=0)
+            assert controller.transaction_stats.transactions == transactions + 2
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert cached == {39280: polled}
+    assert partly_cached[39280] == polled
+    assert partly_cached[39281] is not None
+    assert too_old[39280] is not None
+
+
+async def test_write_register_groups_stops_at_first_failure(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H3)
+    connection_type_profile = INVERTER_PROFILES[InverterModel.H3].connection_types[ConnectionType.AUX]
+    start, end = connection_type_profile.special_registers.invalid_register_ranges[0]
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=InverterModel.H3, model_name=context.model_name)
+        try:
+            with pytest.raises(ValueError, match="more than once"):
+                await controller.write_register_groups([(start - 10, [1, 2]), (start - 9, [3])])
+
+            transactions = controller.transaction_stats.transactions
+            results = await controller.write_register_groups(
+                [(end + 5, [7]), (start - 8, [3]), (start - 10, [1, 2]), (start, [-1])]
+            )
+            # The adjacent writes are merged, and the write into the invalid range fails
+            assert controller.transaction_stats.transactions - transactions == 2
+
+            written = await controller.read_registers(range(start - 10, start - 7), context.register_type)
+        finally:
+            controller.unload()
+            await client.close()
+
+    assert [(x.start_address, x.values, x.error is not None, x.skipped) for x in results] == [
+        (start - 10, [1, 2, 3], False, False),
+        (start, [0xFFFF], True, False),
+        (end + 5, [7], False, True),
+    ]
+    assert written == {start - 10: 1, start - 9: 2, start - 8: 3}
+
+
+async def test_write_register_groups_holds_every_connection(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H3)
+    connection_type_profile = INVERTER_PROFILES[InverterModel.H3].connection_types[ConnectionType.AUX]
+    start, _ = connection_type_profile.special_registers.invalid_register_ranges[0]
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP, max_connections=2)
+        try:
+            # Something (e.g. a poll) is using one of the two connections. The batch mustn't go out on the other one
+            # until that's finished
+            async with client._acquire_client():  # noqa: SLF001
+                write = asyncio.create_task(client.write_register_groups([(start - 10, [1, 2])], slave=247))
+                await asyncio.sleep(0.1)
+                assert not write.done()
+            assert await write == [None]
+        finally:
+            await client.close()
+
+
+async def test_scan_registers_finds_invalid_ranges(hass: HomeAssistant) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G1, ConnectionType.AUX)
+    connection_type_profile = INVERTER_PROFILES[InverterModel.H1_G1].connection_types[ConnectionType.AUX]
+    start, end = connection_type_profile.special_registers.invalid_register_ranges[0]
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP, max_connections=2)
+        controller = create_controller(hass, client, model=InverterModel.H1_G1, model_name=context.model_name)
+        try:
+            result = await controller.scan_registers(start - 100, end + 100, context.register_type)
+        finally:
+            controller.unload()
+            await client.close()
+
+    # Only the registers which were read are reported as invalid: the rest of the range was skipped over
+    assert result.invalid_ranges[0][0] == start
+    assert result.invalid_ranges[-1][1] == end
+    assert sum(y - x + 1 for x, y in result.invalid_ranges + result.unconfirmed_ranges) == end - start + 1
+    assert result.error is None
+    assert [(x, x + len(values) - 1) for x, values in result.valid_ranges] == [
+        (start - 100, start - 1),
+        (end + 1, end + 100),
+    ]
+    assert result.transactions < 100
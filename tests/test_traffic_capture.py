@@ -0,0 +1,131 @@
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.foxess_modbus.client.modbus_client import ModbusClient
+from custom_components.foxess_modbus.client.modbus_client import ModbusClientFailedError
+from custom_components.foxess_modbus.client.traffic_capture import READ_INPUT_REGISTERS
+from custom_components.foxess_modbus.client.traffic_capture import CaptureStatus
+from custom_components.foxess_modbus.client.traffic_capture import TrafficCapture
+from custom_components.foxess_modbus.common.types import ConnectionType
+from custom_components.foxess_modbus.common.types import InverterModel
+from custom_components.foxess_modbus.common.types import RegisterType
+from custom_components.foxess_modbus.const import TCP
+from custom_components.foxess_modbus.inverter_profiles import INVERTER_PROFILES
+from custom_components.foxess_modbus.vendor.pymodbus import ExceptionResponse
+from custom_components.foxess_modbus.vendor.pymodbus import ModbusExceptions
+
+from .controller_helpers import create_client
+from .controller_helpers import create_controller
+from .controller_helpers import poll
+from .simulator import ProfileSimulatorContext
+from .simulator import SimulatedInverter
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+
+async def test_replay_into_controller(hass: HomeAssistant, tmp_path: Path) -> None:
+    path = tmp_path / "capture.bin"
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=context.model, model_name=context.model_name)
+        try:
+            await client.start_capture(path)
+            await poll(controller)
+            await poll(controller)
+        finally:
+            controller.unload()
+            await client.close()
+
+    capture = await hass.async_add_executor_job(TrafficCapture.load, path)
+    assert capture.metadata == {"protocol": TCP, "adapter_id": "elfin_ew11", "max_connections": 1}
+    assert len(capture.records) == controller.transaction_stats.transactions
+    assert all(x.status == CaptureStatus.OK for x in capture.records)
+
+    replay_client = ModbusClient.from_capture(hass, capture, speed=0)
+    replay_controller = create_controller(hass, replay_client, model=context.model, model_name=context.model_name)
+    try:
+        await poll(replay_controller)
+        await poll(replay_controller)
+    finally:
+        replay_controller.unload()
+        await replay_client.close()
+
+    assert replay_controller.poll_stats.successful_polls == 2
+    assert replay_controller.transaction_stats.transactions == len(capture.records)
+    assert all(
+        replay_controller.read(address, signed=False) == controller.read(address, signed=False)
+        for address in context.addresses
+    )
+
+
+async def test_capture_stops_after_its_duration(hass: HomeAssistant, tmp_path: Path) -> None:
+    context = ProfileSimulatorContext(InverterModel.H1_G2)
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        controller = create_controller(hass, client, model=context.model, model_name=context.model_name)
+        try:
+            await controller.start_capture(tmp_path / "first.bin", timedelta(seconds=10))
+            # Starting a new capture replaces the first one, along with its timer
+            await controller.start_capture(tmp_path / "second.bin", timedelta(seconds=30))
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=20))
+            await hass.async_block_till_done()
+            assert client.recorder is not None
+
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=40))
+            await hass.async_block_till_done()
+            assert client.recorder is None
+
+            # Unloading cancels the timer of a capture in progress
+            await controller.start_capture(tmp_path / "third.bin", timedelta(seconds=10))
+            controller.unload()
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=60))
+            await hass.async_block_till_done()
+            assert client.recorder is not None
+        finally:
+            controller.unload()
+            await client.close()
+
+
+async def test_replay_exception_and_unrecorded_reads(hass: HomeAssistant, tmp_path: Path) -> None:
+    path = tmp_path / "capture.bin"
+    context = ProfileSimulatorContext(InverterModel.H1_G1, ConnectionType.AUX)
+    connection_type_profile = INVERTER_PROFILES[InverterModel.H1_G1].connection_types[ConnectionType.AUX]
+    start, _end = connection_type_profile.special_registers.invalid_register_ranges[0]
+    with SimulatedInverter(context) as simulator:
+        client = create_client(hass, simulator.host, TCP)
+        try:
+            await client.start_capture(path)
+            values = await client.read_registers(start - 10, 10, RegisterType.INPUT, 247)
+            with pytest.raises(ModbusClientFailedError):
+                await client.read_registers(start - 10, 11, RegisterType.INPUT, 247)
+        finally:
+            await client.close()
+
+    capture = await hass.async_add_executor_job(TrafficCapture.load, path)
+    assert [(x.function_code, x.status) for x in capture.records] == [
+        (READ_INPUT_REGISTERS, CaptureStatus.OK),
+        (READ_INPUT_REGISTERS, CaptureStatus.EXCEPTION),
+    ]
+
+    replay_client = ModbusClient.from_capture(hass, capture, speed=0)
+    try:
+        # Recorded responses are served back in order, and repeat once exhausted
+        assert await replay_client.read_registers(start - 10, 10, RegisterType.INPUT, 247) == values
+        assert await replay_client.read_registers(start - 10, 10, RegisterType.INPUT, 247) == values
+        with pytest.raises(ModbusClientFailedError) as ex_info:
+            await replay_client.read_registers(start - 10, 11, RegisterType.INPUT, 247)
+        assert isinstance(ex_info.value.response, ExceptionResponse)
+        assert ex_info.value.response.exception_code == ModbusExceptions.IllegalAddress
+
+        # Requests which weren't recorded verbatim are answered from the registers which were
+        assert await replay_client.read_registers(start - 5, 5, RegisterType.INPUT, 247) == values[5:]
+        with pytest.raises(ModbusClientFailedError):
+            await replay_client.read_registers(start - 5, 6, RegisterType.INPUT, 247)
+    finally:
+        await replay_client.close()